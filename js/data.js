@@ -15,6 +15,21 @@ export const placeholderActor = 'data:image/svg+xml;base64,PHN2ZyB4bWxucz0iaHR0c
 export const MOVIE_INDEX_FILE = 'data/movies_index.json';
 /** 电视剧索引文件路径 */
 export const TVSHOW_INDEX_FILE = 'data/tvshows_index.json';
+/** 详情包目录（python/17merge_media_index.py 生成），每个媒体项目一个 JSON 文件 */
+export const DETAILS_DIR = 'data/details/';
+/** 预生成的倒排索引目录（python/17merge_media_index.py 生成），按词元前缀分片 */
+export const SEARCH_DIR = 'data/search/';
+/** 预生成的反向索引目录（python/17merge_media_index.py 生成）：人物 / 制片厂 -> 作品，及分类统计 */
+export const ENTITIES_DIR = 'data/entities/';
+/** 相似作品目录（python/17merge_media_index.py 生成），按项目 ID 分片 */
+export const SIMILAR_DIR = 'data/similar/';
+/** 按相邻两字切分的字符（平假名、片假名、汉字、韩文音节），与 python/search_index.py 中的 CJK_CHARS 一致 */
+const SEARCH_CJK_CHARS = '\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff\uac00-\ud7af';
+/** 超过该长度的词不在倒排索引中（拼音检索键截断到该长度），与 python/search_index.py 中的 MAX_TOKEN_LENGTH 一致 */
+const SEARCH_MAX_TOKEN_LENGTH = 40;
+/** 支持的倒排索引格式版本，与 python/search_index.py 中的 SEARCH_FORMAT_VERSION 一致 */
+const SEARCH_FORMAT_VERSION = 2;
+const SEARCH_TOKEN_PATTERN = new RegExp(`([${SEARCH_CJK_CHARS}]+)|((?:(?![${SEARCH_CJK_CHARS}])[\\p{L}\\p{N}])+)`, 'gu');
 /** 默认的小雅 URL 前缀，用于替换 */
 const DEFAULT_URL_PREFIX = 'http://xiaoya.host:5678';
 
@@ -39,6 +54,18 @@ export let baseUrlRoundRobinIndex = 0;
 
 /** 搜索索引是否已构建的状态 */
 export let isSearchIndexBuilt = false;
+/** 倒排索引清单：undefined 表示尚未加载，null 表示不可用 */
+let searchManifest;
+/** 已请求的倒排索引分片：文件名 -> Promise<{ postings, tokens }|null>，tokens 为排序后的词元 */
+const searchShards = new Map();
+/** 反向索引的分类统计（facets.json）：undefined 表示尚未加载，null 表示不可用 */
+let entityFacets;
+/** 已请求的反向索引分片：相对路径 -> Promise<object|null> */
+const entityShards = new Map();
+/** 相似作品清单：undefined 表示尚未加载，null 表示不可用 */
+let similarManifest;
+/** 已请求的相似作品分片：分片号 -> Promise<object|null> */
+const similarShards = new Map();
 /** 电视剧数据是否已加载的状态 */
 export let isTvShowsLoaded = false;
 /** localStorage Key: 搜索索引构建状态 */
@@ -176,6 +203,23 @@ export async function parseNFO(nfoPath) {
     }
 }
 
+/**
+ * 加载媒体项目的详情包（元数据、演员及头像、剧集的每一集），代替逐个请求 NFO。
+ * @param {object} mediaItem - 媒体对象。
+ * @returns {Promise<object|null>} 详情包；索引中没有详情包或加载失败时返回 null。
+ */
+export async function loadDetailBundle(mediaItem) {
+    if (!mediaItem.detail) return null;
+    try {
+        const response = await fetch(DETAILS_DIR + mediaItem.detail);
+        if (!response.ok) return null;
+        return await response.json();
+    } catch (error) {
+        console.warn(`加载详情包 ${mediaItem.detail} 出错:`, error);
+        return null;
+    }
+}
+
 /**
  * 解析电视剧单集的 NFO 文件。
  * @param {string} nfoPath - 剧集 NFO 文件的路径。
@@ -204,6 +248,32 @@ export async function parseEpisodeNFO(nfoPath) {
 
 // --- 区域: 数据处理与转换 ---
 
+/**
+ * 将索引中嵌入的元数据（由 python/17merge_media_index.py 从 NFO 生成）转换为搜索使用的结构。
+ * 该脚本发布的索引中每个条目都有 meta 字段，没有 NFO 的条目为空对象（元数据已嵌入，只是没有内容）；
+ * 只有旧索引的条目没有 meta 字段。拼音检索键在条目顶层的 pinyin 字段中。
+ * @param {object} rawItem - 原始条目。
+ * @returns {object|null} 元数据对象；索引未嵌入元数据时返回 null。
+ */
+function embeddedMetadata(rawItem) {
+    const meta = rawItem.meta;
+    if (!meta) return null;
+    return {
+        title: meta.title || '', year: meta.year, rating: meta.rating, runtime: meta.runtime,
+        genre: meta.genre || [], actors: meta.actors || [], studio: meta.studio || [],
+        pinyin: rawItem.pinyin || [],
+    };
+}
+
+/**
+ * 判断媒体列表中的每一项是否都已有元数据（索引中嵌入，包括没有 NFO 的条目的空 meta，或已由 buildSearchIndexAndPersist 构建）。
+ * @param {Array} mediaItems - 媒体对象数组。
+ * @returns {boolean}
+ */
+function hasFullMetadata(mediaItems) {
+    return mediaItems.length > 0 && mediaItems.every(item => item.metadata);
+}
+
 /**
  * 将从 JSON 文件读取的原始媒体数据转换为应用内部使用的数据结构。
  * @param {Array} rawMediaArray - 原始媒体对象数组。
@@ -226,14 +296,14 @@ function processRawMediaData(rawMediaArray, type) {
                     strm: `${rawItem.path}\\${file.strm}`,
                 };
             });
-            return { title, type: 'movie', path: rawItem.path, files, metadata: null };
+            return { id: rawItem.id, title, type: 'movie', path: rawItem.path, files, detail: rawItem.detail, metadata: embeddedMetadata(rawItem) };
         }
 
         if (type === 'tvshow') {
             const bestPoster = selectBestPoster(mainFile.poster_image);
             const bestFanart = selectBestFanart(mainFile.fanart_image);
             return {
-                title, type: 'tvshow', path: rawItem.path,
+                id: rawItem.id, title, type: 'tvshow', path: rawItem.path, detail: rawItem.detail,
                 files: [{
                     poster: bestPoster ? `${rawItem.path}\\${bestPoster}` : undefined,
                     fanart: bestFanart ? `${rawItem.path}\\${bestFanart}` : undefined,
@@ -241,7 +311,7 @@ function processRawMediaData(rawMediaArray, type) {
                     nfo: mainFile.nfo,
                     strm: mainFile.strm,
                 }],
-                metadata: null
+                metadata: embeddedMetadata(rawItem)
             };
         }
         return null;
@@ -326,8 +396,10 @@ export async function initializeData() {
     allPeople = await getDataWithCache(STORE_NAMES.PEOPLE_SUMMARY, 'data/people_summary.json');
     allStudios = await getDataWithCache(STORE_NAMES.STUDIOS_SUMMARY, 'data/studios_summary.json');
 
-    // 如果搜索索引已构建，则加载它
-    if (isSearchIndexBuilt) {
+    // 索引中已嵌入元数据时无需再构建；否则如果搜索索引已构建，则加载它
+    if (hasFullMetadata(fullMovies)) {
+        isSearchIndexBuilt = true;
+    } else if (isSearchIndexBuilt) {
         ui.loadingIndicator.textContent = '正在应用搜索索引...';
         loadPersistedSearchMetadata();
     }
@@ -367,6 +439,8 @@ export async function loadTvShowsData() {
         await saveToIndexedDB(STORE_NAMES.MEDIA_INDEX, fullMovies);
         isTvShowsLoaded = true;
         localStorage.setItem(TVSHOWS_LOADED_KEY, 'true');
+        // 电视剧索引未嵌入元数据时，需要重新构建搜索索引才能搜索全部内容
+        isSearchIndexBuilt = hasFullMetadata(fullMovies) || localStorage.getItem(SEARCH_INDEX_BUILT_KEY) === 'true';
 
         scroller.instance.dataArray = allMovies;
         scroller.instance.reset();
@@ -380,6 +454,8 @@ export async function loadTvShowsData() {
         localStorage.setItem(TVSHOWS_LOADED_KEY, 'false');
     } finally {
         updateSearchPlaceholder();
+        ui.buildSearchIndexButton.disabled = isSearchIndexBuilt;
+        ui.indexStatus.textContent = isSearchIndexBuilt ? '索引已建立。' : '索引未建立。';
         ui.loadTvShowsButton.disabled = isTvShowsLoaded;
         ui.tvShowsStatus.textContent = isTvShowsLoaded ? '电视剧数据已加载。' : '电视剧数据未加载。';
     }
@@ -433,6 +509,7 @@ export function getPersonImage(personName) {
 
 /**
  * 构建搜索索引（解析所有 NFO）并持久化到 localStorage。
+ * 索引文件中已嵌入元数据时不需要调用（isSearchIndexBuilt 已为 true），仅用于旧格式的索引。
  */
 export async function buildSearchIndexAndPersist() {
     if (!isTvShowsLoaded) {
@@ -497,4 +574,243 @@ export async function buildSearchIndexAndPersist() {
     } finally {
         ui.buildSearchIndexButton.disabled = isSearchIndexBuilt;
     }
-}
\ No newline at end of file
+}
+
+
+// --- 区域: 预生成的倒排索引 ---
+
+/**
+ * 把查询文本切分为检索词，切分规则与 python/search_index.py 中的 tokenize 相同：
+ * 中日韩文字按相邻两字切分（精确匹配）；单个汉字和其他文字的词按前缀匹配，输入到一半也能搜到。
+ * @param {string} text - 查询文本。
+ * @returns {Array<{token: string, prefix: boolean}>} 检索词列表。
+ */
+export function tokenizeSearchText(text) {
+    const terms = [];
+    const normalized = text.normalize('NFKC').toLowerCase();
+    for (const [, cjkRun, word] of normalized.matchAll(SEARCH_TOKEN_PATTERN)) {
+        if (cjkRun) {
+            const chars = [...cjkRun];
+            if (chars.length === 1) terms.push({ token: chars[0], prefix: true });
+            for (let i = 0; i < chars.length - 1; i++) terms.push({ token: chars[i] + chars[i + 1], prefix: false });
+        } else if ([...word].length <= SEARCH_MAX_TOKEN_LENGTH) {
+            terms.push({ token: word, prefix: true });
+        }
+    }
+    return terms;
+}
+
+/** 词元所在的分组，与 python/search_index.py 中的 shard_key 相同 */
+function searchShardKey(token, codepointBits) {
+    const first = token.codePointAt(0);
+    if (/^[0-9a-z]/.test(token)) return token[0];
+    return 'u' + (first >> codepointBits).toString(16);
+}
+
+/**
+ * 词元可能所在的分片文件名，与 python/search_index.py 中的 shard_names_for 相同。
+ * 清单中每个分组为 [[起始词元, 词元数], ...]，第 i 个分片包含 [起始词元 i, 起始词元 i+1) 范围内的词元；
+ * 前缀查找时返回与该前缀范围重叠的全部分片。
+ */
+function searchShardNames(manifest, token, prefix) {
+    const key = searchShardKey(token, manifest.shard_codepoint_bits);
+    const parts = manifest.shards[key] || [];
+    const names = [];
+    for (let i = 0; i < parts.length; i++) {
+        if (i + 1 < parts.length && parts[i + 1][0] <= token) continue;
+        const start = parts[i][0];
+        if (start > token && !(prefix && start.startsWith(token))) break;
+        names.push(i === 0 ? `${key}.json` : `${key}.${i}.json`);
+    }
+    return names;
+}
+
+/** 加载倒排索引清单；索引不存在或格式版本不一致时返回 null（之后不再请求） */
+async function loadSearchManifest() {
+    if (searchManifest === undefined) {
+        try {
+            const response = await fetch(`${SEARCH_DIR}manifest.json`);
+            const manifest = response.ok ? await response.json() : null;
+            searchManifest = manifest?.version === SEARCH_FORMAT_VERSION ? manifest : null;
+        } catch (error) {
+            searchManifest = null;
+        }
+    }
+    return searchManifest;
+}
+
+/** 加载一个分片（每个分片只请求一次），同时排好词元顺序供前缀查找 */
+function loadSearchShard(name) {
+    if (!searchShards.has(name)) {
+        searchShards.set(name, fetch(`${SEARCH_DIR}${name}`)
+            .then(response => (response.ok ? response.json() : null))
+            .then(postings => (postings ? { postings, tokens: Object.keys(postings).sort() } : null))
+            .catch(() => null));
+    }
+    return searchShards.get(name);
+}
+
+/** 排序数组中第一个不小于 token 的位置 */
+function lowerBound(sorted, token) {
+    let low = 0;
+    let high = sorted.length;
+    while (low < high) {
+        const mid = (low + high) >> 1;
+        if (sorted[mid] < token) low = mid + 1;
+        else high = mid;
+    }
+    return low;
+}
+
+/** 把差分编码的倒排列表还原为项目 ID 并加入集合 */
+function addPostings(deltas, ids) {
+    let id = 0;
+    for (const delta of deltas) {
+        id += delta;
+        ids.add(id);
+    }
+}
+
+/** 查找一组检索词（只加载用到的分片），各检索词的结果取交集 */
+async function lookupSearchTerms(terms, manifest) {
+    const termShards = await Promise.all(terms.map(({ token, prefix }) =>
+        Promise.all(searchShardNames(manifest, token, prefix).map(loadSearchShard))));
+
+    let result = null;
+    for (let i = 0; i < terms.length; i++) {
+        const { token, prefix } = terms[i];
+        const ids = new Set();
+        for (const shard of termShards[i]) {
+            if (!shard) continue;
+            if (prefix) {
+                // 排序后以该前缀开头的词元相邻，二分找到起点后顺序读取
+                for (let j = lowerBound(shard.tokens, token); j < shard.tokens.length; j++) {
+                    const candidate = shard.tokens[j];
+                    if (!candidate.startsWith(token)) break;
+                    addPostings(shard.postings[candidate], ids);
+                }
+            } else if (Object.hasOwn(shard.postings, token)) {
+                addPostings(shard.postings[token], ids);
+            }
+        }
+        result = result === null ? ids : new Set([...result].filter(id => ids.has(id)));
+        if (result.size === 0) break;
+    }
+    return result;
+}
+
+/**
+ * 用预生成的倒排索引搜索：只加载查询用到的分片，各检索词的结果取交集。
+ * 拼音检索键也是索引中的词元，输入 "lyb"、"langya" 按前缀即可找到；
+ * 带空格的拼音（如 "lang ya"）另外去掉空格整体查找一次，结果合并。
+ * 索引中的拼音键最多保留 SEARCH_MAX_TOKEN_LENGTH 个字符，更长的拼音查询按截断后的前缀查找。
+ * @param {string} query - 查询文本。
+ * @returns {Promise<Set<number>|null>} 匹配的项目 ID；没有倒排索引或查询中没有可检索的词时返回 null。
+ */
+export async function searchPrebuiltIndex(query) {
+    const terms = tokenizeSearchText(query);
+    const compact = query.normalize('NFKC').toLowerCase().replace(/\s+/g, '');
+    const isPinyin = /^[a-z0-9]+$/.test(compact);
+    if (terms.length === 0 && !isPinyin) return null;
+    const manifest = await loadSearchManifest();
+    if (!manifest) return null;
+
+    const result = terms.length ? await lookupSearchTerms(terms, manifest) : new Set();
+    if (isPinyin && (terms.length > 1 || compact.length > SEARCH_MAX_TOKEN_LENGTH)) {
+        const token = compact.slice(0, SEARCH_MAX_TOKEN_LENGTH);
+        for (const id of await lookupSearchTerms([{ token, prefix: true }], manifest)) result.add(id);
+    }
+    return result;
+}
+
+
+// --- 区域: 反向索引（人物 / 制片厂 -> 作品） ---
+
+/**
+ * 加载分类统计：各类型 / 制片厂 / 年份 / 年代的项目数、作品最多的人物（top_people）和分片清单。
+ * @returns {Promise<object|null>} 反向索引不存在时返回 null（之后不再请求）。
+ */
+export async function loadEntityFacets() {
+    if (entityFacets === undefined) {
+        try {
+            const response = await fetch(`${ENTITIES_DIR}facets.json`);
+            entityFacets = response.ok ? await response.json() : null;
+        } catch (error) {
+            entityFacets = null;
+        }
+    }
+    return entityFacets;
+}
+
+/** 加载一个反向索引分片（每个分片只请求一次） */
+function loadEntityShard(path) {
+    if (!entityShards.has(path)) {
+        entityShards.set(path, fetch(`${ENTITIES_DIR}${path}`)
+            .then(response => (response.ok ? response.json() : null))
+            .catch(() => null));
+    }
+    return entityShards.get(path);
+}
+
+/**
+ * 查找人物或制片厂的全部作品，只加载该名称所在的一个分片，与作品总数无关。
+ * @param {'people'|'studios'} kind - 实体类型。
+ * @param {string} name - 人物或制片厂名称（与 NFO 中一致）。
+ * @returns {Promise<{count: number, ids: Set<number>, roles: Map<number, string>}|null>}
+ *          作品数、作品 ID（人物包括出演和执导）和出演的角色；没有反向索引时返回 null，索引中没有该名称时 ids 为空。
+ */
+export async function lookupEntity(kind, name) {
+    const facets = await loadEntityFacets();
+    if (!facets) return null;
+    const key = searchShardKey(name.normalize('NFKC').toLowerCase(), facets.shard_codepoint_bits);
+    const shard = facets.shards[kind]?.[key] ? await loadEntityShard(`${kind}/${key}.json`) : null;
+    const entry = shard?.[name];
+    const result = { count: entry?.count ?? 0, ids: new Set(), roles: new Map() };
+    if (!entry) return result;
+
+    addPostings(entry.ids ?? [], result.ids);
+    if (entry.roles) {
+        [...result.ids].forEach((id, i) => { if (entry.roles[i]) result.roles.set(id, entry.roles[i]); });
+    }
+    if (entry.directed) addPostings(entry.directed, result.ids);
+    return result;
+}
+
+
+// --- 区域: 相似作品 ---
+
+/** 加载相似作品清单；不存在时返回 null（之后不再请求） */
+async function loadSimilarManifest() {
+    if (similarManifest === undefined) {
+        try {
+            const response = await fetch(`${SIMILAR_DIR}manifest.json`);
+            similarManifest = response.ok ? await response.json() : null;
+        } catch (error) {
+            similarManifest = null;
+        }
+    }
+    return similarManifest;
+}
+
+/**
+ * 查找与某个项目相似的作品（按演员、导演、类型和制片厂预先计算），只加载该项目所在的一个分片。
+ * @param {object} mediaItem - 媒体对象。
+ * @returns {Promise<Array<object>>} 相似的媒体对象，按相似度从高到低；尚未加载的电视剧不包括在内。
+ */
+export async function loadSimilarItems(mediaItem) {
+    if (mediaItem.id === undefined) return [];
+    const manifest = await loadSimilarManifest();
+    if (!manifest) return [];
+    const shardId = Math.floor(mediaItem.id / manifest.shard_size);
+    if (!manifest.shards.includes(shardId)) return [];
+
+    if (!similarShards.has(shardId)) {
+        similarShards.set(shardId, fetch(`${SIMILAR_DIR}${shardId}.json`)
+            .then(response => (response.ok ? response.json() : null))
+            .catch(() => null));
+    }
+    const ids = (await similarShards.get(shardId))?.[mediaItem.id] || [];
+    if (ids.length === 0) return [];
+    const rank = new Map(ids.map((id, index) => [id, index]));
+    return fullMovies.filter(m => rank.has(m.id)).sort((a, b) => rank.get(a.id) - rank.get(b.id));
+}
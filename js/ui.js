@@ -20,6 +20,7 @@ export const ui = {
         cast: document.getElementById('modal-cast'),
         studios: document.getElementById('modal-studios'),
         versions: document.getElementById('modal-versions'),
+        similar: document.getElementById('modal-similar'),
     },
     playerModal: document.getElementById('player-modal'),
     playerOptions: document.getElementById('player-options'),
@@ -56,6 +57,9 @@ let currentTvShowSeasonDataMap = new Map();
 let currentTvShowActiveSeasonName = '';
 let currentTvShowEpisodePage = 0;
 let wasSearchActive = false; // 新增：用于跟踪搜索状态，以管理历史记录
+let searchSequence = 0; // 每次搜索递增，用于丢弃已被新输入取代的异步搜索结果
+let pendingEntitySearch = null; // 点击演员 / 制片厂时设置：{ kind, name }，下一次搜索按反向索引列出其全部作品
+let currentDetailsItem = null; // 详情页当前显示的作品，用于丢弃已切换走的异步加载结果
 
 // --- 区域: UI 渲染函数 ---
 
@@ -65,27 +69,31 @@ let wasSearchActive = false; // 新增：用于跟踪搜索状态，以管理历
  */
 export function appendMovies(batch) {
     const fragment = document.createDocumentFragment();
-    const template = ui.templates.movieCard.content;
-
-    batch.forEach((mediaItem) => {
-        const mainFile = mediaItem.files[0];
-        const posterPath = mainFile?.poster || data.placeholderImage;
-
-        const clone = template.cloneNode(true);
-        const card = clone.querySelector('.card');
-        const img = clone.querySelector('img');
-        const titleOverlay = clone.querySelector('.title-overlay');
-
-        card.dataset.index = data.fullMovies.indexOf(mediaItem);
-        img.src = data.cleanPath(posterPath);
-        img.alt = mediaItem.title;
-        titleOverlay.textContent = mediaItem.title;
-
-        fragment.appendChild(clone);
-    });
+    batch.forEach((mediaItem) => fragment.appendChild(createMovieCard(mediaItem)));
     ui.movieGrid.appendChild(fragment);
 }
 
+/**
+ * 创建一张影视卡片（网格和详情页的相似作品共用）。
+ * @param {object} mediaItem - 媒体对象。
+ * @returns {DocumentFragment} 卡片节点。
+ */
+function createMovieCard(mediaItem) {
+    const mainFile = mediaItem.files[0];
+    const posterPath = mainFile?.poster || data.placeholderImage;
+
+    const clone = ui.templates.movieCard.content.cloneNode(true);
+    const card = clone.querySelector('.card');
+    const img = clone.querySelector('img');
+    const titleOverlay = clone.querySelector('.title-overlay');
+
+    card.dataset.index = data.fullMovies.indexOf(mediaItem);
+    img.src = data.cleanPath(posterPath);
+    img.alt = mediaItem.title;
+    titleOverlay.textContent = mediaItem.title;
+    return clone;
+}
+
 /**
  * 渲染指定季的剧集列表和分页。
  * @param {HTMLElement} containerElement - 剧集列表的容器元素。
@@ -262,12 +270,19 @@ async function showMovieDetails(mediaItem) {
 
     // 清理内容
     [ui.modalContent.poster, ui.modalContent.meta, ui.modalContent.directorsWriters,
-        ui.modalContent.plot, ui.modalContent.cast, ui.modalContent.studios, ui.modalContent.versions]
+        ui.modalContent.plot, ui.modalContent.cast, ui.modalContent.studios, ui.modalContent.versions,
+        ui.modalContent.similar]
         .forEach(el => { if(el) el.innerHTML = ''; });
 
-    document.body.classList.add('body-no-scroll');
-    ui.modal.style.display = 'block';
-    history.pushState({ modal: 'details' }, '', '');
+    // 在详情页中点击相似作品时直接替换内容，不再增加历史记录（后退仍然关闭详情页）
+    if (ui.modal.style.display !== 'block') {
+        document.body.classList.add('body-no-scroll');
+        ui.modal.style.display = 'block';
+        history.pushState({ modal: 'details' }, '', '');
+    }
+    ui.modal.scrollTop = 0;
+    currentDetailsItem = mediaItem;
+    renderSimilarItems(mediaItem);
 
     const mainFile = mediaItem.files[0];
     ui.modalContent.fanart.style.backgroundImage = mainFile?.fanart ? `url('${data.cleanPath(mainFile.fanart)}')` : 'none';
@@ -275,13 +290,21 @@ async function showMovieDetails(mediaItem) {
     ui.modalContent.title.textContent = mediaItem.title;
     ui.modalContent.plot.innerHTML = '<p class="error-text">正在加载详情...</p>';
 
+    // 有详情包时一次请求即可得到全部详情，否则逐个解析 NFO
+    const bundle = await data.loadDetailBundle(mediaItem);
+
     // 根据类型（电影/电视剧）渲染不同内容
     if (mediaItem.type === 'tvshow') {
-        renderTvShowDetails(mediaItem);
+        renderTvShowDetails(mediaItem, bundle);
     } else {
         renderMovieDetails(mediaItem);
     }
 
+    if (bundle) {
+        renderNfoDetails(bundle, mediaItem.path);
+        return;
+    }
+
     // 异步加载并显示NFO详细信息
     const nfoToParse = mainFile.tvshow_nfo || mainFile.nfo;
     if (nfoToParse) {
@@ -293,6 +316,17 @@ async function showMovieDetails(mediaItem) {
     }
 }
 
+/** 渲染相似作品（异步加载，不阻塞详情显示；期间已切换到其他作品时放弃） */
+async function renderSimilarItems(mediaItem) {
+    const similarItems = await data.loadSimilarItems(mediaItem);
+    if (similarItems.length === 0 || currentDetailsItem !== mediaItem) return;
+
+    ui.modalContent.similar.innerHTML = '<h3>相似作品</h3><div class="similar-list"></div>';
+    const fragment = document.createDocumentFragment();
+    similarItems.forEach(item => fragment.appendChild(createMovieCard(item)));
+    ui.modalContent.similar.querySelector('.similar-list').appendChild(fragment);
+}
+
 /** 渲染电影版本列表 */
 function renderMovieDetails(mediaItem) {
     ui.modalContent.versions.innerHTML = '<h3>可用版本</h3>';
@@ -311,8 +345,12 @@ function renderMovieDetails(mediaItem) {
     ui.modalContent.versions.appendChild(fragment);
 }
 
-/** 渲染电视剧季、集列表 */
-function renderTvShowDetails(mediaItem) {
+/**
+ * 渲染电视剧季、集列表
+ * @param {object} mediaItem - 媒体对象
+ * @param {object|null} bundle - 详情包；为 null 时逐个解析单集 NFO
+ */
+function renderTvShowDetails(mediaItem, bundle) {
     ui.modalContent.versions.innerHTML = '<h3>剧集列表</h3>';
     const seasonTabsContainer = document.createElement('div');
     seasonTabsContainer.className = 'season-tabs';
@@ -324,34 +362,42 @@ function renderTvShowDetails(mediaItem) {
     currentTvShowActiveSeasonName = '';
     currentTvShowEpisodePage = 0;
 
-    const seasonNfoGroups = mediaItem.files[0].nfo;
-    const seasonStrmGroups = mediaItem.files[0].strm;
-    if (!seasonNfoGroups || !Array.isArray(seasonNfoGroups) || seasonNfoGroups.length === 0) {
-        episodeListContainer.innerHTML = '<p class="error-text">未能加载剧集列表。</p>';
-        return;
-    }
-
     const seasonNamesOrder = [];
-    seasonNfoGroups.forEach((seasonNfoObject, seasonIndex) => {
-        const seasonName = Object.keys(seasonNfoObject)[0];
-        if (!seasonName) return;
-
-        seasonNamesOrder.push(seasonName);
-        const episodeNfoPaths = seasonNfoObject[seasonName];
-        const episodeStrmPaths = seasonStrmGroups?.[seasonIndex]?.[seasonName] || [];
-
-        const episodesPromises = episodeNfoPaths.map(async (nfoRelativePath, epIndex) => {
-            const nfoData = await data.parseEpisodeNFO(`${mediaItem.path}\\${nfoRelativePath}`);
-            return {
-                title: nfoData?.title || nfoRelativePath.split(/\\|\//).pop().replace(/\.nfo$/i, ''),
-                episode: nfoData?.episode || (epIndex + 1).toString(),
-                plot: nfoData?.plot,
-                outline: nfoData?.outline,
-                strm: episodeStrmPaths[epIndex] ? `${mediaItem.path}\\${episodeStrmPaths[epIndex]}` : null,
-            };
+    if (bundle?.seasons?.length) {
+        // 详情包中已包含每一集的标题、简介和 STRM 路径
+        bundle.seasons.forEach(season => {
+            seasonNamesOrder.push(season.name);
+            currentTvShowSeasonDataMap.set(season.name, season.episodes);
         });
-        currentTvShowSeasonDataMap.set(seasonName, Promise.all(episodesPromises));
-    });
+    } else {
+        const seasonNfoGroups = mediaItem.files[0].nfo;
+        const seasonStrmGroups = mediaItem.files[0].strm;
+        if (!seasonNfoGroups || !Array.isArray(seasonNfoGroups) || seasonNfoGroups.length === 0) {
+            episodeListContainer.innerHTML = '<p class="error-text">未能加载剧集列表。</p>';
+            return;
+        }
+
+        seasonNfoGroups.forEach((seasonNfoObject, seasonIndex) => {
+            const seasonName = Object.keys(seasonNfoObject)[0];
+            if (!seasonName) return;
+
+            seasonNamesOrder.push(seasonName);
+            const episodeNfoPaths = seasonNfoObject[seasonName];
+            const episodeStrmPaths = seasonStrmGroups?.[seasonIndex]?.[seasonName] || [];
+
+            const episodesPromises = episodeNfoPaths.map(async (nfoRelativePath, epIndex) => {
+                const nfoData = await data.parseEpisodeNFO(`${mediaItem.path}\\${nfoRelativePath}`);
+                return {
+                    title: nfoData?.title || nfoRelativePath.split(/\\|\//).pop().replace(/\.nfo$/i, ''),
+                    episode: nfoData?.episode || (epIndex + 1).toString(),
+                    plot: nfoData?.plot,
+                    outline: nfoData?.outline,
+                    strm: episodeStrmPaths[epIndex] ? `${mediaItem.path}\\${episodeStrmPaths[epIndex]}` : null,
+                };
+            });
+            currentTvShowSeasonDataMap.set(seasonName, Promise.all(episodesPromises));
+        });
+    }
 
     seasonNamesOrder.forEach((seasonName, index) => {
         const seasonButton = document.createElement('button');
@@ -401,7 +447,10 @@ function renderNfoDetails(nfoData, mediaPath) {
 
             let finalActorThumbSrc = data.placeholderActor;
 
-            if (actor.thumb) {
+            if (actor.image) {
+                // 详情包中的头像地址已由生成脚本解析好
+                finalActorThumbSrc = actor.image;
+            } else if (actor.thumb) {
                 if (actor.thumb.startsWith('http') || actor.thumb.startsWith('data:')) {
                     finalActorThumbSrc = actor.thumb;
                 } else {
@@ -413,7 +462,7 @@ function renderNfoDetails(nfoData, mediaPath) {
 
             memberDiv.querySelector('img').src = finalActorThumbSrc;
             memberDiv.querySelector('.name').textContent = cleanName;
-            memberDiv.querySelector('.role').textContent = actor.role;
+            memberDiv.querySelector('.role').textContent = actor.role || '';
             fragment.appendChild(clone);
         });
         castList.appendChild(fragment);
@@ -445,7 +494,7 @@ function renderNfoDetails(nfoData, mediaPath) {
 /** 更新搜索框的占位符文本 */
 export function updateSearchPlaceholder() {
     const placeholders = {
-        indexed: '搜索影视、演员、制片厂...',
+        indexed: '搜索影视、演员、制片厂、类型...',
         tvLoaded: '搜索影视...',
         default: '搜索电影...'
     };
@@ -457,7 +506,7 @@ export function updateSearchPlaceholder() {
 /**
  * 处理搜索框输入事件，并智能管理浏览器历史记录。
  */
-function handleSearch() {
+async function handleSearch() {
     const searchTerm = ui.searchBox.value.toLowerCase().trim();
     const isNowActive = searchTerm !== '';
 
@@ -476,15 +525,33 @@ function handleSearch() {
     wasSearchActive = isNowActive; // 更新状态
 
     // 执行过滤逻辑
+    const sequence = ++searchSequence;
+    const entitySearch = pendingEntitySearch;
+    pendingEntitySearch = null;
+    // 点击演员 / 制片厂时，反向索引中直接有其全部作品的 ID，只需加载一个分片；索引中没有时按普通搜索处理
+    const entity = searchTerm && entitySearch ? await data.lookupEntity(entitySearch.kind, entitySearch.name) : null;
+    if (sequence !== searchSequence) return;
     let filteredMovies;
     if (!searchTerm) {
         filteredMovies = data.fullMovies;
+    } else if (entity?.ids.size) {
+        filteredMovies = data.fullMovies.filter(m => entity.ids.has(m.id));
     } else {
+        // 有预生成的倒排索引时只加载查询用到的分片，否则逐项比较标题和元数据
+        const indexedIds = await data.searchPrebuiltIndex(searchTerm);
+        if (sequence !== searchSequence) return;
+        const pinyinQuery = searchTerm.replace(/\s+/g, '');
+        const isPinyinQuery = /^[a-z0-9]+$/.test(pinyinQuery);
         filteredMovies = data.fullMovies.filter(m => {
             if (m.title.toLowerCase().includes(searchTerm)) return true;
+            if (indexedIds && m.id !== undefined) return indexedIds.has(m.id);
             if (data.isSearchIndexBuilt && m.metadata) {
+                if (m.metadata.title?.toLowerCase().includes(searchTerm)) return true;
                 if (m.metadata.actors.some(name => name.toLowerCase().includes(searchTerm))) return true;
                 if (m.metadata.studio.some(name => name.toLowerCase().includes(searchTerm))) return true;
+                if (m.metadata.genre?.some(name => name.toLowerCase().includes(searchTerm))) return true;
+                // 拼音检索键（全拼 / 首字母）按前缀匹配
+                if (isPinyinQuery && m.metadata.pinyin?.some(key => key.startsWith(pinyinQuery))) return true;
             }
             return false;
         });
@@ -539,6 +606,13 @@ export function setupEventListeners() {
         }
     });
 
+    ui.modalContent.similar.addEventListener('click', e => {
+        const card = e.target.closest('.card.movie-card[data-index]');
+        if (card) {
+            showMovieDetails(data.fullMovies[card.dataset.index]);
+        }
+    });
+
     ui.closeModalBtn.addEventListener('click', () => hideAllOverlays());
     ui.modal.addEventListener('click', e => { if (e.target === ui.modal) hideAllOverlays(); });
     ui.closePlayerModalBtn.addEventListener('click', () => hideAllOverlays());
@@ -583,17 +657,18 @@ export function setupEventListeners() {
         }
     });
 
-    const createSearchClickHandler = (selector, key) => (e) => {
+    const createSearchClickHandler = (selector, key, kind) => (e) => {
         const element = e.target.closest(selector);
         if (element && element.dataset[key]) {
             hideAllOverlays();
             ui.searchBox.value = element.dataset[key];
+            pendingEntitySearch = { kind, name: element.dataset[key] };
             handleSearch();
             window.scrollTo({ top: 0, behavior: 'smooth' });
         }
     };
-    ui.modalContent.cast.addEventListener('click', createSearchClickHandler('.cast-member', 'actorName'));
-    ui.modalContent.studios.addEventListener('click', createSearchClickHandler('img', 'studioName'));
+    ui.modalContent.cast.addEventListener('click', createSearchClickHandler('.cast-member', 'actorName', 'people'));
+    ui.modalContent.studios.addEventListener('click', createSearchClickHandler('img', 'studioName', 'studios'));
 
     ui.settingsButton.addEventListener('click', () => toggleSettingsPanel(true));
     ui.settingsCloseButton.addEventListener('click', () => hideAllOverlays());
@@ -1,30 +1,195 @@
 import os
 import re
+import sys
 import json
-import collections
-import shutil # 导入 shutil 模块用于文件复制
+import time
+import argparse
+import socket
+import media_walker # 并发目录遍历
+from scan_snapshot import ScanSnapshot # 增量扫描快照
+from media_index_io import NdjsonIndexWriter, iter_media_index, is_ndjson_path, MEDIA_TYPE_KEYS # 逐行索引读写
+from media_shard import ShardSpec # 分片扫描
+from media_model import MediaEntry, json_default, natural_sort_key # 紧凑的媒体条目，与合并脚本相同的自然排序
+from ignore_rules import IgnoreRules, add_ignore_arguments, ignore_rules_from_args # 忽略规则
+import io_throttle # 按挂载点节流
+import fs_trace # 文件系统操作耗时追踪
+import media_watch # 监视模式
+from copy_engine import CopyEngine, COPY_MODES # 并发复制
+
+# --- 媒体识别规则 ---
+MAX_MOVIES = 50000
+MAX_TV_SHOWS = 50000
+
+# 剧集根目录的常见文件指示器（优先级更高）
+TVSHOW_NFO_NAME = 'tvshow.nfo'
+# 剧集季目录的正则匹配
+SEASON_DIR_PATTERN = re.compile(r"^season\s*\d+$", re.IGNORECASE)
+
+# 电影根目录的常见文件指示器
+MOVIE_NFO_NAME = 'movie.nfo'
+# 电影根目录可能有的图片文件，结合nfo文件进行判断
+MOVIE_IMAGE_INDICATORS = {'poster.jpg', 'fanart.jpg', 'cover.jpg', 'folder.jpg', 'movie.jpg'}
+
+# --- 增量扫描 ---
+# 目录快照文件名（保存在脚本目录下）。再次扫描时只重新列举发生变化的目录，
+# 扫描中断后也会从检查点继续。设置为 None 则每次都完整扫描。逐行格式下默认不使用，见 NDJSON_USE_SNAPSHOT。
+SCAN_SNAPSHOT_FILENAME = "media_index.snapshot.json"
+
+# --- 符号链接 ---
+# 是否进入媒体库中指向目录的符号链接（例如用链接组织的合集目录）。
+# 开启后按 (st_dev, st_ino) 识别物理目录：同一目录经由多个链接到达时只扫描一次，链接形成的环路也会被切断。
+# 识别需要对每个目录额外 stat 一次（增量扫描中复用快照的目录也不例外），因此默认关闭，用 --follow-links 开启。
+FOLLOW_SYMLINKS = False
+
+# --- 索引输出格式 ---
+# "json": 扫描结束后一次性写入 media_index.json。
+# "ndjson": 边扫描边逐行写入 media_index.ndjson，内存占用不随媒体库增长，
+#           扫描中途或被中断时的索引也可以被下游脚本直接读取。
+INDEX_OUTPUT_FORMAT = "json"
+# 逐行格式下是否使用增量扫描快照。快照在内存中保存整棵目录树的列举结果和全部媒体条目，
+# 与逐行写入“内存占用不随媒体库增长”的目的相悖，因此默认不使用（可用 --ndjson-snapshot 开启）。
+NDJSON_USE_SNAPSHOT = False
+
+# --- 监视模式 ---
+# 无法使用 inotify 时（网络挂载盘、AList 后端、非 Linux 系统）的轮询间隔（秒）
+WATCH_POLL_INTERVAL = 300
+
+def classify_media_directory(dirnames, filenames_lower):
+    """
+    根据目录内容判断该目录是电影根目录、剧集根目录还是普通目录。
+
+    Args:
+        dirnames (list): 当前目录下的子目录名列表。
+        filenames_lower (set): 当前目录下的文件名（小写）集合。
+
+    Returns:
+        str | None: "movie"、"tv_show"，无法识别时返回 None。
+    """
+    # 尝试识别为剧集
+    # 1. 检查 tvshow.nfo
+    if TVSHOW_NFO_NAME in filenames_lower:
+        return "tv_show"
+    # 2. 检查是否存在 'Season X' 子目录
+    for d in dirnames:
+        if SEASON_DIR_PATTERN.match(d):
+            return "tv_show"
+
+    # 尝试识别为电影（仅在未识别为剧集的情况下）
+    # 1. 检查 movie.nfo
+    if MOVIE_NFO_NAME in filenames_lower:
+        return "movie"
+    # 2. 检查 *.nfo 结合常见电影图片文件
+    for f in filenames_lower:
+        # 排除 tvshow.nfo 和 season.nfo，只考虑电影可能的主NFO
+        if f.endswith('.nfo') and f != TVSHOW_NFO_NAME and f != 'season.nfo':
+            if not MOVIE_IMAGE_INDICATORS.isdisjoint(filenames_lower):
+                return "movie"
+            break
+    return None
+
+def _new_media_item(media_type, media_root_path_abs, library_root_abs):
+    """
+    为新识别的媒体项目创建文件收集状态。
+    遍历过程中，该项目根目录下的所有子目录都会被归入这个状态，而不会再被单独识别。
+    """
+    # 获取相对于媒体库根目录的相对路径
+    media_root_path_relative = os.path.relpath(media_root_path_abs, start=library_root_abs)
+    # 转换路径分隔符，以匹配用户示例中的Windows风格
+    media_root_path_relative = media_root_path_relative.replace(os.sep, '\\')
+
+    return {
+        "type": media_type,
+        "root_abs": media_root_path_abs,
+        # 以分隔符结尾的前缀，用于 O(1) 判断后续目录是否属于该项目
+        "root_prefix": os.path.join(media_root_path_abs, ''),
+        "path": media_root_path_relative,
+        # 按目录收集的文件（见 media_model.MediaEntry），也就是最终的索引条目
+        "entry": MediaEntry(media_type, media_root_path_relative),
+        # 子树中是否有目录的内容可能发生了变化（仅增量扫描时使用）
+        "changed": False,
+    }
+
+def _collect_media_files(media_item, dirpath, filenames):
+    """
+    将一个目录（媒体项目根目录或其子目录）中的文件归入媒体项目。
+    文件的分类在 media_model 中完成，这里只确定目录前缀和剧集 NFO/STRM 的分组名。
+    """
+    if dirpath == media_item["root_abs"]:
+        relative_prefix = ''
+    else:
+        # 子目录一定以 root_prefix 开头，直接截取即可得到相对路径，统一为 Windows 风格分隔符
+        relative_prefix = dirpath[len(media_item["root_prefix"]):].replace(os.sep, '\\') + '\\'
+    # 以文件所在目录的名称作为分组键（文件直接在媒体项目根目录时即为媒体项目目录名）
+    media_item["entry"].add_dir(relative_prefix, os.path.basename(dirpath), filenames)
+
+def _add_media_entry(media_type, media_entry, media_index_data, index_writer=None):
+    """
+    将媒体条目加入索引。提供 index_writer 时直接逐行写出，不在内存中保留。
+    """
+    if index_writer is not None:
+        index_writer.write(media_type, media_entry)
+    elif media_type == "movie":
+        media_index_data["movies"].append(media_entry)
+    elif media_type == "tv_show":
+        media_index_data["tv_shows"].append(media_entry)
+
+    if media_type == "movie":
+        print(f"  [电影 Found]: {media_entry['path']}")
+    elif media_type == "tv_show":
+        print(f"  [剧集 Found]: {media_entry['path']}")
+
+def _found_count(media_type, media_index_data, index_writer=None):
+    """
+    返回已找到的某类媒体数量。
+    """
+    if index_writer is not None:
+        return index_writer.counts[media_type]
+    return len(media_index_data["movies" if media_type == "movie" else "tv_shows"])
 
-# --- 自然排序键函数 ---
-def natural_sort_key(s):
+def _finish_media_item(media_item, media_index_data, snapshot=None, index_writer=None):
     """
-    为包含数字的字符串返回一个自然排序的键。
-    例如，"file10.txt" 会排在 "file2.txt" 之后。
-    在比较非数字部分时，会转换为小写以实现不区分大小写的排序。
+    媒体项目的子树遍历完毕后，生成条目并加入索引。
+    增量扫描时，若子树内没有任何目录发生变化，则直接复用快照中的条目。
     """
-    def convert(text):
-        return int(text) if text.isdigit() else text.lower()
-    # 使用正则表达式将字符串分割成数字和非数字部分
-    # `([0-9]+)` 捕获一个或多个数字，re.split 会在捕获组处分割，并保留捕获组
-    # 例如："Day10.nfo" -> ["Day", "10", ".nfo"]
-    return [convert(c) for c in re.split('([0-9]+)', s)]
-
-def scan_media_library_and_index(start_directory):
+    media_entry = None
+    if snapshot is not None and not media_item["changed"]:
+        media_entry = snapshot.cached_media_entry(media_item["path"], media_item["type"])
+    if media_entry is None:
+        media_entry = media_item["entry"]
+    if snapshot is not None:
+        snapshot.record_media(media_item["path"], media_item["type"], media_entry)
+
+    _add_media_entry(media_item["type"], media_entry, media_index_data, index_writer)
+
+def _report_walk_error(error):
+    print(f"  [无法列出目录]: {error}")
+
+def _report_duplicate_dir(dirpath, first_path):
+    print(f"  [跳过重复目录]: {dirpath}（与 {first_path} 为同一目录）")
+
+def scan_media_library_and_index(start_directory, snapshot_path=None, index_writer=None, ignore_rules=None,
+                                 followlinks=None, lister=None, library_root=None, shard=None):
     """
     扫描指定目录及其子目录，识别电影和剧集，并建立分类文件索引。
-    在找到5个电影和5部剧集后停止。
+    在找到 MAX_MOVIES 个电影和 MAX_TV_SHOWS 部剧集后停止。
+
+    采用单次遍历：一个目录被识别为电影/剧集根目录后，不再对其子目录做识别，
+    而是在同一次遍历中直接把子目录里的文件归入该项目。每个目录只被列出一次。
 
     Args:
         start_directory (str): 开始扫描的根目录。
+        snapshot_path (str): 目录快照文件路径。提供时进行增量扫描，并定期写入检查点。
+        index_writer (NdjsonIndexWriter): 提供时每找到一个媒体项目就立即写出，
+            返回的字典中不再保留条目。
+        ignore_rules (IgnoreRules): 忽略规则，默认读取起始目录下的 .mhignore。
+            被忽略的目录不会被列举，被忽略的文件不会出现在索引中。
+        followlinks (bool): 是否进入指向目录的符号链接，默认为 FOLLOW_SYMLINKS。
+        lister (callable): 列目录后端（例如 alist_backend.AListLister），默认直接读取本地文件系统。
+            使用远程后端时 start_directory 只作为路径映射的根，不需要在本地存在；
+            目录快照和符号链接跟随依赖本地 stat，此时不会启用。
+        library_root (str): 媒体库根目录，条目路径和忽略规则都相对于它，默认为 start_directory。
+            只重扫媒体库中的一个子目录时（例如监视模式）传入。
+        shard (ShardSpec): 分片规则。只收录属于本分片的媒体项目，不属于本分片的子树不会被列举。
 
     Returns:
         dict: 包含电影和剧集索引的字典。
@@ -36,330 +201,504 @@ def scan_media_library_and_index(start_directory):
         "tv_shows": []
     }
 
-    # 用于存储已经识别的媒体项目的绝对根路径，避免重复处理其子目录
-    processed_media_roots = set()
-
-    MAX_MOVIES = 50000
-    MAX_TV_SHOWS = 50000
-
-    # 剧集根目录的常见文件指示器（优先级更高）
-    TVSHOW_NFO_NAME = 'tvshow.nfo'
-    # 剧集季目录的正则匹配
-    SEASON_DIR_PATTERN = re.compile(r"^season\s*\d+$", re.IGNORECASE)
-
-    # 电影根目录的常见文件指示器
-    MOVIE_NFO_NAME = 'movie.nfo'
-    # 电影根目录可能有的图片文件，结合nfo文件进行判断
-    MOVIE_IMAGE_INDICATORS = {'poster.jpg', 'fanart.jpg', 'cover.jpg', 'folder.jpg', 'movie.jpg'}
-
-    if not os.path.isdir(start_directory):
+    if lister is None and not os.path.isdir(start_directory):
         print(f"错误: '{start_directory}' 不是一个有效的目录。")
         return media_index_data
 
     # 将起始目录标准化为绝对路径，用于后续的相对路径计算和根目录判断
     start_directory_abs = os.path.abspath(start_directory)
+    library_root_abs = os.path.abspath(library_root) if library_root else start_directory_abs
+
+    if ignore_rules is None:
+        ignore_rules = IgnoreRules.load(library_root_abs)
+    if followlinks is None:
+        followlinks = FOLLOW_SYMLINKS
+    if lister is not None:
+        followlinks = False
+        snapshot_path = None
 
     print(f"开始扫描目录: {start_directory_abs}")
+    if ignore_rules:
+        print(f"忽略规则: {', '.join(rule.pattern for rule in ignore_rules.rules)}")
     print("-" * 30)
 
-    # os.walk 会返回 (当前目录路径, 子目录列表, 文件列表)
-    for dirpath, dirnames, filenames in os.walk(start_directory_abs):
-        # 检查是否已达到查找限制
-        if len(media_index_data["movies"]) >= MAX_MOVIES and \
-           len(media_index_data["tv_shows"]) >= MAX_TV_SHOWS:
-            print("\n已达到查找限制，停止扫描。")
-            break
-
-        # 检查当前目录是否已包含在已识别的媒体项目根路径下（即是某个已识别项目的子目录）
-        is_child_of_processed_root = False
-        for root_path in processed_media_roots:
-            # os.path.normpath 用于处理不同操作系统的路径分隔符问题
-            if os.path.normpath(dirpath).startswith(os.path.normpath(root_path) + os.sep):
-                is_child_of_processed_root = True
+    snapshot = None
+    if lister is None:
+        lister = media_walker.scandir_listing
+    if snapshot_path:
+        snapshot = ScanSnapshot.load(snapshot_path, start_directory_abs,
+                                     ignore_patterns=[rule.pattern for rule in ignore_rules.rules])
+        lister = snapshot.list_dir
+
+    # 当前正在收集文件的媒体项目。
+    # 遍历按自顶向下的深度优先顺序进行，一个媒体项目的子树是连续产出的，
+    # 因此同一时刻最多只有一个未完成的媒体项目。
+    current_media_item = None
+
+    try:
+        # media_walker.walk 与 os.walk 一样返回 (当前目录路径, 子目录列表, 文件列表)，但会并发列目录
+        for dirpath, dirnames, filenames in media_walker.walk(start_directory_abs, lister=lister, ignore=ignore_rules,
+                                                            ignore_root=library_root_abs,
+                                                            followlinks=followlinks, onerror=_report_walk_error,
+                                                            onduplicate=_report_duplicate_dir):
+            if snapshot is not None:
+                snapshot.maybe_checkpoint()
+
+            if current_media_item is not None:
+                # 当前目录位于正在处理的媒体项目内部：直接归类文件，不再识别
+                if dirpath.startswith(current_media_item["root_prefix"]):
+                    _collect_media_files(current_media_item, dirpath, filenames)
+                    if snapshot is not None and snapshot.is_changed(dirpath):
+                        current_media_item["changed"] = True
+                    continue
+                # 已离开该媒体项目的子树，生成其条目
+                _finish_media_item(current_media_item, media_index_data, snapshot, index_writer)
+                current_media_item = None
+
+            # 检查是否已达到查找限制
+            if _found_count("movie", media_index_data, index_writer) >= MAX_MOVIES and \
+               _found_count("tv_show", media_index_data, index_writer) >= MAX_TV_SHOWS:
+                print("\n已达到查找限制，停止扫描。")
                 break
-        if is_child_of_processed_root:
-            continue # 跳过已处理媒体项目内部的子目录
-
-        # 将文件名转换为小写集合以便进行不区分大小写的比较
-        filenames_lower = {f.lower() for f in filenames}
-
-        # --- 识别当前目录是电影还是剧集根目录 ---
-        current_media_type = None
-
-        # 尝试识别为剧集
-        # 1. 检查 tvshow.nfo
-        if TVSHOW_NFO_NAME.lower() in filenames_lower:
-            current_media_type = "tv_show"
-        # 2. 检查是否存在 'Season X' 子目录 (如果还没有被 tvshow.nfo 识别为剧集)
-        if current_media_type is None:
-            for d in dirnames:
-                if SEASON_DIR_PATTERN.match(d):
-                    current_media_type = "tv_show"
-                    break
-
-        # 尝试识别为电影（仅在未识别为剧集的情况下）
-        if current_media_type is None:
-            # 1. 检查 movie.nfo
-            if MOVIE_NFO_NAME.lower() in filenames_lower:
-                current_media_type = "movie"
-            else:
-                # 2. 检查 *.nfo 结合常见电影图片文件
-                found_nfo_in_root = False
-                for f in filenames_lower:
-                    # 排除 tvshow.nfo 和 season.nfo，只考虑电影可能的主NFO
-                    if f.endswith('.nfo') and f != TVSHOW_NFO_NAME.lower() and f != 'season.nfo':
-                        found_nfo_in_root = True
-                        break
-
-                if found_nfo_in_root:
-                    for img_indicator in MOVIE_IMAGE_INDICATORS:
-                        if img_indicator in filenames_lower:
-                            current_media_type = "movie"
-                            break
-
-        # 如果当前目录被识别为媒体项目，并且未达到该类型的上限
-        if current_media_type:
-            if (current_media_type == "movie" and len(media_index_data["movies"]) >= MAX_MOVIES) or \
-               (current_media_type == "tv_show" and len(media_index_data["tv_shows"]) >= MAX_TV_SHOWS):
-                continue # 达到该类型的上限，跳过
-
-            media_root_path_abs = dirpath # 绝对路径
-            processed_media_roots.add(media_root_path_abs) # 将此路径标记为已处理的媒体根
-
-            # 获取相对于 start_directory 的相对路径
-            media_root_path_relative = os.path.relpath(media_root_path_abs, start=start_directory_abs)
-            # 转换路径分隔符，以匹配用户示例中的Windows风格
-            media_root_path_relative = media_root_path_relative.replace(os.sep, '\\')
-
-            # 用于存储各类文件的原始列表
-            categorized_files_raw = collections.defaultdict(list)
-            # 专门用于存储剧集内部按目录分组的NFO文件和STRM文件
-            tv_episode_nfo_grouped = collections.defaultdict(list)
-            tv_episode_strm_grouped = collections.defaultdict(list)
-
-            # 遍历当前媒体项目目录及其所有子目录，收集文件信息
-            for sub_dirpath, _, sub_filenames in os.walk(media_root_path_abs):
-                for sub_filename in sub_filenames:
-                    full_file_path = os.path.join(sub_dirpath, sub_filename)
-                    # 文件相对于媒体项目根目录的路径
-                    relative_file_path_in_media_item = os.path.relpath(full_file_path, start=media_root_path_abs)
-                    # 统一路径分隔符为 Windows 风格
-                    relative_file_path_in_media_item = relative_file_path_in_media_item.replace(os.sep, '\\')
-
-                    filename_lower = sub_filename.lower()
-
-                    # 获取父目录名用于分组。如果文件直接在媒体项目根目录，则使用媒体项目根目录的名称作为分组键。
-                    parent_dir_relative_to_media_item_root = os.path.dirname(relative_file_path_in_media_item)
-                    dir_group_name = os.path.basename(parent_dir_relative_to_media_item_root)
-                    if not dir_group_name and media_root_path_relative == ".": # 如果文件在扫描的根目录，且此目录是媒体根
-                        dir_group_name = os.path.basename(os.path.abspath(media_root_path_abs))
-                    elif not dir_group_name: # 如果文件在子媒体根目录，直接用其名称作为分组键
-                         dir_group_name = os.path.basename(media_root_path_abs)
-
-
-                    # --- NFO 文件处理 ---
-                    if filename_lower == TVSHOW_NFO_NAME.lower():
-                        categorized_files_raw['tvshow_nfo'].append(relative_file_path_in_media_item)
-                    elif filename_lower == MOVIE_NFO_NAME.lower():
-                        categorized_files_raw['movie_nfo'].append(relative_file_path_in_media_item)
-                    elif filename_lower == 'season.nfo':
-                        categorized_files_raw['season_nfo'].append(relative_file_path_in_media_item)
-                    elif filename_lower.endswith('.nfo'): # 处理其他所有 .nfo 文件
-                        if current_media_type == "tv_show":
-                            tv_episode_nfo_grouped[dir_group_name].append(relative_file_path_in_media_item)
-                        else: # 对于电影，非 movie.nfo 的其他NFO文件
-                            categorized_files_raw['nfo'].append(relative_file_path_in_media_item)
-
-                    # --- STRM 文件处理 ---
-                    elif filename_lower.endswith('.strm'):
-                        if current_media_type == "tv_show":
-                            tv_episode_strm_grouped[dir_group_name].append(relative_file_path_in_media_item)
-                        else: # 对于电影，STRM 文件也可能存在，不做特殊分组
-                            categorized_files_raw['strm'].append(relative_file_path_in_media_item)
-
-                    # --- 图像文件处理 (统一归类) ---
-                    elif filename_lower in {'folder.jpg', 'cover.jpg', 'movie.jpg', 'poster.jpg'}:
-                        categorized_files_raw['poster_image'].append(relative_file_path_in_media_item)
-                    elif filename_lower in {'banner.jpg', 'fanart.jpg'}:
-                        categorized_files_raw['fanart_image'].append(relative_file_path_in_media_item)
-                    # 特定季的图像
-                    elif re.match(r"season\d+-banner\.jpg", filename_lower):
-                        categorized_files_raw['season_banner_images'].append(relative_file_path_in_media_item)
-                    elif re.match(r"season\d+-poster\.jpg", filename_lower):
-                        categorized_files_raw['season_poster_images'].append(relative_file_path_in_media_item)
-
-                    # --- 其他已知文件类型处理 ---
-                    elif filename_lower.endswith('.ass'):
-                        categorized_files_raw['ass'].append(relative_file_path_in_media_item)
-                    elif filename_lower.endswith('-mediainfo.json'):
-                        categorized_files_raw['mediainfo_json'].append(relative_file_path_in_media_item)
-                    else:
-                        # 对于不符合任何已知模式的文件，归入 'other_files'
-                        categorized_files_raw['other_files'].append(relative_file_path_in_media_item)
-
-            # --- 构建最终的 'files' 字典 ---
-            final_files_data = {}
-
-            # 将原始列表转换为单字符串或列表
-            for key, value_list in categorized_files_raw.items():
-                if value_list: # 仅当列表非空时才添加
-                    if len(value_list) == 1:
-                        final_files_data[key] = value_list[0]
-                    else:
-                        final_files_data[key] = value_list
-
-            # 添加特别分组的剧集NFO (如果有的话)
-            if current_media_type == "tv_show" and tv_episode_nfo_grouped:
-                grouped_nfo_output_list = []
-                for dir_name, nfo_paths in tv_episode_nfo_grouped.items():
-                    # 在这里应用自然排序
-                    grouped_nfo_output_list.append({dir_name: sorted(nfo_paths, key=natural_sort_key)})
-                final_files_data['nfo'] = grouped_nfo_output_list
-
-            # 添加特别分组的剧集STRM (如果有的话)
-            if current_media_type == "tv_show" and tv_episode_strm_grouped:
-                grouped_strm_output_list = []
-                for dir_name, strm_paths in tv_episode_strm_grouped.items():
-                    # 在这里应用自然排序
-                    grouped_strm_output_list.append({dir_name: sorted(strm_paths, key=natural_sort_key)})
-                final_files_data['strm'] = grouped_strm_output_list
-
-            # 构建媒体条目
-            media_entry = {
-                "path": media_root_path_relative,
-                "files": [final_files_data] # 'files' 键是一个包含一个字典的列表
-            }
-
-            if current_media_type == "movie":
-                media_index_data["movies"].append(media_entry)
-                print(f"  [电影 Found]: {media_root_path_relative}")
-            elif current_media_type == "tv_show":
-                media_index_data["tv_shows"].append(media_entry)
-                print(f"  [剧集 Found]: {media_root_path_relative}")
+
+            # 中断前已完成的媒体项目：直接复用条目并跳过整棵子树
+            if snapshot is not None:
+                dirpath_relative = os.path.relpath(dirpath, start=start_directory_abs)
+                resumed = snapshot.resumed_media_entry(dirpath_relative.replace(os.sep, '\\'))
+                if resumed is not None:
+                    snapshot.record_resumed_media(resumed["entry"]["path"], dirpath)
+                    _add_media_entry(resumed["type"], resumed["entry"], media_index_data, index_writer)
+                    dirnames[:] = []
+                    continue
+
+            # 将文件名转换为小写集合以便进行不区分大小写的比较
+            filenames_lower = {f.lower() for f in filenames}
+
+            # --- 识别当前目录是电影还是剧集根目录 ---
+            current_media_type = classify_media_directory(dirnames, filenames_lower)
+
+            if shard is not None:
+                dirpath_relative = os.path.relpath(dirpath, start=library_root_abs)
+                dir_parts = [] if dirpath_relative == '.' else dirpath_relative.split(os.sep)
+                if current_media_type and not shard.owns(dir_parts):
+                    # 属于其他分片的媒体项目，整棵子树都不需要访问
+                    dirnames[:] = []
+                    continue
+                if not current_media_type:
+                    dirnames[:] = [d for d in dirnames if shard.may_contain(dir_parts + [d])]
+
+            # 如果当前目录被识别为媒体项目，并且未达到该类型的上限
+            if current_media_type:
+                if (current_media_type == "movie" and _found_count("movie", media_index_data, index_writer) >= MAX_MOVIES) or \
+                   (current_media_type == "tv_show" and _found_count("tv_show", media_index_data, index_writer) >= MAX_TV_SHOWS):
+                    continue # 达到该类型的上限，跳过
+
+                current_media_item = _new_media_item(current_media_type, dirpath, library_root_abs)
+                _collect_media_files(current_media_item, dirpath, filenames)
+                if snapshot is not None and snapshot.is_changed(dirpath):
+                    current_media_item["changed"] = True
+
+        # 处理遍历结束时仍未完成的最后一个媒体项目
+        if current_media_item is not None:
+            _finish_media_item(current_media_item, media_index_data, snapshot, index_writer)
+    except BaseException:
+        # 扫描被中断（例如 Ctrl+C 或挂载盘出错）时保存检查点，下次运行可从此处继续
+        if snapshot is not None:
+            snapshot.save(complete=False)
+        raise
+
+    if snapshot is not None:
+        snapshot.save(complete=True)
+        print(f"增量扫描：重新列举 {len(snapshot.relisted)} 个目录，其余 {len(snapshot.dirs) - len(snapshot.relisted)} 个目录复用了快照。")
+
+    for throttle in io_throttle.active_throttles():
+        print(throttle.summary())
 
     print("-" * 30)
     print("\n扫描完成。")
 
     return media_index_data
 
-def copy_indexed_files(media_data, original_scan_root, copy_destination_dir_name="copyFile"):
+def _shard_index_meta(shard, start_directory_abs):
+    """分片扫描时写入索引的元信息，供 17merge_media_index.py 检查分片是否齐全；不分片时返回 None。"""
+    if shard is None:
+        return None
+    return {"shard": shard.meta(), "host": socket.gethostname(), "scan_root": start_directory_abs}
+
+def _index_entries(media_data):
+    """把扫描结果转换为 路径 -> (类型, 条目) 的字典，便于按路径替换条目。"""
+    entries = {}
+    for media_type, media_type_key in MEDIA_TYPE_KEYS.items():
+        for media_entry in media_data[media_type_key]:
+            entries[media_entry["path"]] = (media_type, media_entry)
+    return entries
+
+def _write_index_atomic(entries, output_path, meta=None):
+    """
+    先写入临时文件再替换索引，读取方不会看到写了一半的文件。
+    条目按路径自然排序后写出：监视模式中重扫的条目会被追加到 entries 末尾，排序后索引顺序与完整扫描一致。
+    """
+    ordered = [entries[path] for path in sorted(entries, key=lambda p: (natural_sort_key(p), p))]
+    temp_path = output_path + ".tmp"
+    try:
+        if is_ndjson_path(output_path):
+            with NdjsonIndexWriter(temp_path, meta=meta) as index_writer:
+                for media_type, media_entry in ordered:
+                    index_writer.write(media_type, media_entry)
+        else:
+            media_data = {"_meta": meta} if meta else {}
+            media_data.update({"movies": [], "tv_shows": []})
+            for media_type, media_entry in ordered:
+                media_data[MEDIA_TYPE_KEYS[media_type]].append(media_entry)
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump(media_data, f, ensure_ascii=False, indent=4, default=json_default)
+        os.replace(temp_path, output_path)
+    except IOError as e:
+        print(f"错误: 无法写入文件 {output_path}: {e}")
+
+def _index_path(path, library_root_abs):
+    """本地路径 -> 索引中的相对路径（Windows 风格分隔符，媒体库根目录为空字符串）。"""
+    relative_path = os.path.relpath(path, start=library_root_abs)
+    return '' if relative_path == '.' else relative_path.replace(os.sep, '\\')
+
+def _is_under(index_path, ancestor):
+    return not ancestor or index_path == ancestor or index_path.startswith(ancestor + '\\')
+
+def _enclosing_media_root(entries, index_path):
+    """返回包含该路径的已索引媒体根目录（可能就是它本身），没有则返回 None。"""
+    while True:
+        if index_path in entries:
+            return index_path
+        if not index_path:
+            return None
+        index_path = index_path.rpartition('\\')[0]
+
+def _plan_watch_rescan(changes, entries, library_root_abs):
+    """
+    根据一批目录变化，确定需要重扫的子目录和需要移除条目的子目录。
+
+    目录的识别结果只取决于它自己的列举内容，因此：
+    - 媒体项目内部的任何变化，只需重扫该项目；
+    - 普通目录中的变化，若使该目录本身变成了媒体项目则重扫该目录，
+      否则只需处理发生变化的子目录（新增的重扫，消失的移除）。
+
+    Returns:
+        tuple: (需要重扫的路径集合, 需要移除的路径集合)，均为索引中的相对路径。
+    """
+    rescan = set()
+    removed = set()
+    for dirpath, name, is_dir in changes:
+        dir_index_path = _index_path(dirpath, library_root_abs)
+        media_root = _enclosing_media_root(entries, dir_index_path)
+        if media_root is not None:
+            rescan.add(media_root)
+            continue
+
+        try:
+            listing = media_walker.scandir_listing(dirpath)
+        except OSError:
+            # 目录本身已被删除，其父目录会收到相应的事件
+            continue
+        if classify_media_directory(listing.dirnames, {f.lower() for f in listing.filenames}):
+            rescan.add(dir_index_path)
+        elif is_dir:
+            child_index_path = f"{dir_index_path}\\{name}" if dir_index_path else name
+            if os.path.isdir(os.path.join(dirpath, name)):
+                rescan.add(child_index_path)
+            else:
+                removed.add(child_index_path)
+    return rescan, removed
+
+def _apply_watch_changes(changes, entries, library_root_abs, ignore_rules, followlinks, shard=None):
+    """
+    只重扫受影响的子目录，就地更新 entries。返回索引是否可能发生了变化。
+    """
+    rescan, removed = _plan_watch_rescan(changes, entries, library_root_abs)
+
+    # 去掉被其他目标包含的目标，每棵子树只处理一次
+    targets = []
+    for target in sorted(rescan | removed, key=len):
+        if not any(_is_under(target, kept) for kept in targets):
+            targets.append(target)
+
+    for target in targets:
+        for index_path in [p for p in entries if _is_under(p, target)]:
+            del entries[index_path]
+        if target in rescan:
+            subtree = os.path.join(library_root_abs, target.replace('\\', os.sep)) if target else library_root_abs
+            media_data = scan_media_library_and_index(subtree, ignore_rules=ignore_rules, followlinks=followlinks,
+                                                      library_root=library_root_abs, shard=shard)
+            entries.update(_index_entries(media_data))
+        print(f"  [已更新]: {target or '.'}")
+    return bool(targets)
+
+def watch_media_library(start_directory, output_path, snapshot_path=None, ignore_rules=None, followlinks=None,
+                        lister=None, shard=None):
+    """
+    监视模式：先扫描一次，之后持续保持索引文件为最新，按 Ctrl+C 退出。
+
+    本地目录通过 inotify 订阅变化，每批变化只重扫受影响的媒体项目；
+    网络挂载盘、AList 后端或不支持 inotify 的系统上，每隔 WATCH_POLL_INTERVAL 秒做一次
+    增量扫描（配合目录快照，只重新列举 mtime 变化的目录）。
+    索引总是先写入临时文件再替换。
+
+    Args:
+        start_directory (str): 媒体库根目录。
+        output_path (str): 索引文件路径，扩展名为 .ndjson 时写入逐行格式。
+        其余参数与 scan_media_library_and_index 相同。
+    """
+    start_directory_abs = os.path.abspath(start_directory)
+    if ignore_rules is None:
+        ignore_rules = IgnoreRules.load(start_directory_abs)
+    if followlinks is None:
+        followlinks = FOLLOW_SYMLINKS
+
+    def full_scan():
+        return _index_entries(scan_media_library_and_index(
+            start_directory_abs, snapshot_path=snapshot_path, ignore_rules=ignore_rules,
+            followlinks=followlinks, lister=lister, shard=shard))
+
+    meta = _shard_index_meta(shard, start_directory_abs)
+    entries = full_scan()
+    _write_index_atomic(entries, output_path, meta)
+    print(f"\n索引已保存到: {output_path}")
+
+    watcher = None
+    if lister is None and media_watch.inotify_available() and not media_watch.is_network_mount(start_directory_abs):
+        try:
+            watcher = media_watch.InotifyWatcher(start_directory_abs, ignore=ignore_rules, followlinks=followlinks)
+        except OSError as e:
+            print(f"警告: 无法通过 inotify 监视目录（{e}），改为轮询。")
+
+    if watcher is None:
+        print(f"\n进入监视模式：每 {WATCH_POLL_INTERVAL} 秒增量扫描一次（Ctrl+C 退出）。")
+        while True:
+            time.sleep(WATCH_POLL_INTERVAL)
+            new_entries = full_scan()
+            if new_entries != entries:
+                entries = new_entries
+                _write_index_atomic(entries, output_path, meta)
+                print(f"索引已更新: {output_path}")
+
+    print(f"\n进入监视模式：通过 inotify 监视 {len(watcher.paths)} 个目录（Ctrl+C 退出）。")
+    try:
+        while True:
+            changes, overflow = watcher.wait()
+            if overflow:
+                print("信息: 监视事件溢出，重新扫描整个媒体库。")
+                entries = full_scan()
+                changed = True
+            else:
+                changed = _apply_watch_changes(changes, entries, start_directory_abs, ignore_rules, followlinks, shard)
+            if changed:
+                _write_index_atomic(entries, output_path, meta)
+                print(f"索引已更新: {output_path}")
+    finally:
+        watcher.close()
+
+def _iter_item_files(media_type_key, media_item):
+    """产出媒体项目中所有已索引文件相对于项目目录的路径（索引中的格式，以 '\\' 分隔）。"""
+    # 获取文件信息（是files列表中的第一个字典）
+    if not media_item["files"]: # 检查 files 列表是否为空
+        return
+    for category_key, file_paths_or_grouped_list in media_item["files"][0].items():
+        if category_key in ['nfo', 'strm'] and media_type_key == 'tv_shows' and isinstance(file_paths_or_grouped_list, list) and file_paths_or_grouped_list and isinstance(file_paths_or_grouped_list[0], dict):
+            # 处理按目录分组的NFO或STRM文件 (TV Shows 特有)
+            for group_dict in file_paths_or_grouped_list:
+                for files_in_group_list in group_dict.values():
+                    yield from files_in_group_list
+        elif isinstance(file_paths_or_grouped_list, str):
+            # 处理其他所有扁平的文件列表（包括电影的nfo/strm，或所有图像文件等）
+            yield file_paths_or_grouped_list
+        elif isinstance(file_paths_or_grouped_list, list):
+            yield from file_paths_or_grouped_list
+
+def _iter_copy_pairs(media_items, original_scan_root, copy_root_dir):
+    """把索引条目展开为 (源文件绝对路径, 目标文件绝对路径) 序列。"""
+    for media_type_key, media_item in media_items:
+        # 获取媒体项目在原始扫描目录下的相对路径（索引中统一以 '\\' 分隔）
+        media_item_relative_path = media_item["path"].replace('\\', os.sep)
+        for file_relative_path_in_item in _iter_item_files(media_type_key, media_item):
+            # 目标文件的相对路径（相对于 copy_root_dir）
+            relative_path = os.path.join(media_item_relative_path, file_relative_path_in_item.replace('\\', os.sep))
+            yield os.path.join(original_scan_root, relative_path), os.path.join(copy_root_dir, relative_path)
+
+def copy_indexed_files(media_data, original_scan_root, copy_destination_dir_name="copyFile",
+                       mode="copy", verify=False, workers=None):
     """
     根据索引数据将文件复制到指定的目标目录。
 
+    复制由 copy_engine 并发完成；目标文件的大小和修改时间与源文件一致时跳过，
+    因此重复运行只会复制新增或修改过的文件。
+
     Args:
-        media_data (dict): 包含电影和剧集索引的字典。
+        media_data (dict | iterable): 包含电影和剧集索引的字典，或 (分组键, 条目) 序列。
         original_scan_root (str): 原始扫描的根目录（绝对路径），用于构建源文件路径。
         copy_destination_dir_name (str): 目标复制目录的名称，将在脚本目录下创建。
+        mode (str): 复制方式，见 copy_engine.COPY_MODES（copy/hardlink/symlink/reflink）。
+        verify (bool): 复制完成后是否校验源文件与目标文件内容一致。
+        workers (int): 并发线程数，默认为 copy_engine.COPY_WORKERS。
     """
     script_dir = os.path.dirname(os.path.abspath(__file__))
     copy_root_dir = os.path.join(script_dir, copy_destination_dir_name)
 
-    print(f"\n开始复制文件到: {copy_root_dir}")
+    print(f"\n开始复制文件到: {copy_root_dir}（方式: {mode}）")
     print("-" * 30)
 
-    copied_count = 0
-
     # 确保目标复制目录存在
     os.makedirs(copy_root_dir, exist_ok=True)
 
-    # 遍历电影和剧集
-    for media_type_key in ["movies", "tv_shows"]:
-        for media_item in media_data[media_type_key]:
-            # 获取媒体项目在原始扫描目录下的相对路径
-            media_item_relative_path_from_scan_root = media_item["path"]
-            # 构建媒体项目在原始扫描目录下的绝对路径
-            original_media_item_abs_path = os.path.join(original_scan_root, media_item_relative_path_from_scan_root)
-
-            # 获取文件信息（是files列表中的第一个字典）
-            if not media_item["files"]: # 检查 files 列表是否为空
-                continue
-
-            file_category_dict = media_item["files"][0]
-
-            for category_key, file_paths_or_grouped_list in file_category_dict.items():
-                if category_key in ['nfo', 'strm'] and media_type_key == 'tv_shows' and isinstance(file_paths_or_grouped_list, list) and file_paths_or_grouped_list and isinstance(file_paths_or_grouped_list[0], dict):
-                    # 处理按目录分组的NFO或STRM文件 (TV Shows 特有)
-                    for group_dict in file_paths_or_grouped_list:
-                        for group_name, files_in_group_list in group_dict.items():
-                            for file_relative_path_in_item in files_in_group_list:
-                                source_abs_file_path = os.path.join(original_media_item_abs_path, file_relative_path_in_item)
-                                # 目标文件的相对路径（相对于 copy_root_dir）
-                                destination_relative_path = os.path.join(media_item_relative_path_from_scan_root, file_relative_path_in_item)
-                                destination_abs_file_path = os.path.join(copy_root_dir, destination_relative_path)
-
-                                try:
-                                    os.makedirs(os.path.dirname(destination_abs_file_path), exist_ok=True)
-                                    shutil.copy2(source_abs_file_path, destination_abs_file_path)
-                                    copied_count += 1
-                                    # print(f"  复制: {file_relative_path_in_item} -> {destination_abs_file_path}") # 复制成功日志可以根据需要取消注释
-                                except FileNotFoundError:
-                                    print(f"  警告: 源文件不存在，无法复制: {source_abs_file_path}")
-                                except Exception as e:
-                                    print(f"  错误: 复制文件失败 {source_abs_file_path} -> {destination_abs_file_path}: {e}")
-                else:
-                    # 处理其他所有扁平的文件列表（包括电影的nfo/strm，或所有图像文件等）
-                    files_to_copy = []
-                    if isinstance(file_paths_or_grouped_list, str):
-                        files_to_copy.append(file_paths_or_grouped_list)
-                    elif isinstance(file_paths_or_grouped_list, list):
-                        files_to_copy.extend(file_paths_or_grouped_list)
-
-                    for file_relative_path_in_item in files_to_copy:
-                        source_abs_file_path = os.path.join(original_media_item_abs_path, file_relative_path_in_item)
-                        # 目标文件的相对路径（相对于 copy_root_dir）
-                        destination_relative_path = os.path.join(media_item_relative_path_from_scan_root, file_relative_path_in_item)
-                        destination_abs_file_path = os.path.join(copy_root_dir, destination_relative_path)
-
-                        try:
-                            os.makedirs(os.path.dirname(destination_abs_file_path), exist_ok=True)
-                            shutil.copy2(source_abs_file_path, destination_abs_file_path)
-                            copied_count += 1
-                            # print(f"  复制: {file_relative_path_in_item} -> {destination_abs_file_path}") # 复制成功日志可以根据需要取消注释
-                        except FileNotFoundError:
-                            print(f"  警告: 源文件不存在，无法复制: {source_abs_file_path}")
-                        except Exception as e:
-                            print(f"  错误: 复制文件失败 {source_abs_file_path} -> {destination_abs_file_path}: {e}")
+    # media_data 可以是索引字典，也可以是 iter_media_index 产出的 (分组键, 条目) 序列
+    if isinstance(media_data, dict):
+        media_items = ((key, item) for key in ["movies", "tv_shows"] for item in media_data.get(key, []))
+    else:
+        media_items = media_data
+
+    engine = CopyEngine(mode=mode, workers=workers, verify=verify)
+    start_time = time.monotonic()
+    stats = engine.run(_iter_copy_pairs(media_items, original_scan_root, copy_root_dir))
+    elapsed = time.monotonic() - start_time
 
     print("-" * 30)
-    print(f"复制完成。总共复制了 {copied_count} 个文件。")
+    print(f"复制完成，用时 {elapsed:.1f} 秒。复制/链接了 {stats['copied']} 个文件，"
+          f"跳过 {stats['skipped']} 个未变化的文件。")
+    if stats['fallback']:
+        print(f"  其中 {stats['fallback']} 个文件无法使用 {mode}，已改为普通复制。")
+    if stats['missing'] or stats['failed']:
+        print(f"  源文件不存在: {stats['missing']}，复制失败: {stats['failed']}")
+    if verify:
+        print(f"  校验失败: {stats['verify_failed']}")
 
 # --- 使用示例 ---
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="扫描媒体库，生成媒体索引并可选复制已索引的文件。")
+    parser.add_argument('start_path', nargs='?', help="媒体库根目录；不提供时交互输入。")
+    add_ignore_arguments(parser)
+    io_throttle.add_throttle_arguments(parser)
+    fs_trace.add_trace_arguments(parser)
+    parser.add_argument('--follow-links', dest='followlinks', action='store_true', default=FOLLOW_SYMLINKS,
+                        help="进入指向目录的符号链接（每个目录额外 stat 一次，用于识别重复目录和环路）。")
+    parser.add_argument('--no-follow-links', dest='followlinks', action='store_false',
+                        help="不进入指向目录的符号链接（默认）。")
+    parser.add_argument('--alist', metavar='URL', default=os.environ.get("MEDIAHUB_ALIST_URL", ""),
+                        help="通过 AList 的 fs/list 接口扫描（例如 http://127.0.0.1:5244），此时 start_path 为 AList 中的路径。")
+    parser.add_argument('--alist-token', default=None, help="AList 令牌，默认读取环境变量 MEDIAHUB_ALIST_TOKEN。")
+    parser.add_argument('--alist-password', default="", help="AList 目录访问密码。")
+    parser.add_argument('--ndjson-snapshot', action='store_true', default=NDJSON_USE_SNAPSHOT,
+                        help="逐行格式下也使用增量扫描快照（内存占用会随媒体库增长）。")
+    parser.add_argument('--watch', action='store_true',
+                        help="扫描后持续监视媒体库，有变化时只重扫受影响的媒体项目并更新索引（Ctrl+C 退出）。")
+    parser.add_argument('--shard', metavar='i/N',
+                        help="只扫描第 i 个哈希分片（共 N 个，i 从 0 开始），输出分片索引，之后用 17merge_media_index.py 合并。")
+    parser.add_argument('--shard-dirs', nargs='+', metavar='DIR',
+                        help="只扫描列出的顶级目录（例如本机磁盘上的目录），输出分片索引。")
+    parser.add_argument('--copy-mode', choices=COPY_MODES, default="copy",
+                        help="复制已索引文件的方式：copy（复制，默认）、hardlink（硬链接）、symlink（符号链接）、"
+                             "reflink（写时复制克隆，不支持时退回到复制）。")
+    parser.add_argument('--copy-verify', action='store_true', help="复制完成后校验源文件与目标文件的内容。")
+    parser.add_argument('--copy-workers', type=int, default=None, help="复制文件的并发线程数。")
+    args = parser.parse_args()
+    io_throttle.configure_from_args(args)
+    fs_trace.configure_from_args(args, root=args.start_path)
+
+    shard = None
+    if args.shard or args.shard_dirs:
+        try:
+            shard = ShardSpec.parse(args.shard, top_dirs=args.shard_dirs)
+        except ValueError as e:
+            parser.error(str(e))
+
     # 请将此路径替换为你的媒体库根目录
     # start_path = r"C:\media\all"
     # 或者留空让用户输入
-    start_path = input("请输入要扫描的根目录路径（例如 C:\\media\\all）：").strip()
+    start_path = args.start_path
+    if start_path is None:
+        start_path = input("请输入要扫描的根目录路径（例如 C:\\media\\all）：").strip()
+        fs_trace.set_root(start_path)
 
     if not start_path:
         print("未输入路径，程序退出。")
     else:
+        lister = None
+        if args.alist:
+            # 仅在使用 AList 时才需要 requests
+            from alist_backend import AListLister
+            lister = AListLister(args.alist, remote_root=start_path, local_root=start_path,
+                                 token=args.alist_token, password=args.alist_password)
+
         # 验证路径是否存在
-        if not os.path.exists(start_path):
+        if lister is None and not os.path.exists(start_path):
             print(f"错误: 指定的路径 '{start_path}' 不存在。")
         else:
-            media_data = scan_media_library_and_index(start_path)
-
-            output_filename = "media_index.json"
             script_dir = os.path.dirname(os.path.abspath(__file__))
-            output_full_path = os.path.join(script_dir, output_filename)
-
-            try:
-                with open(output_full_path, 'w', encoding='utf-8') as f:
-                    json.dump(media_data, f, ensure_ascii=False, indent=4)
+            ignore_rules = ignore_rules_from_args(start_path, args)
+            snapshot_path = os.path.join(script_dir, SCAN_SNAPSHOT_FILENAME) if SCAN_SNAPSHOT_FILENAME else None
+
+            # 分片扫描时输出 media_index.shard-<标签>.json，快照也按分片分开保存
+            output_basename = "media_index"
+            if shard is not None:
+                output_basename = f"media_index.shard-{shard.label()}"
+                if snapshot_path:
+                    snapshot_path = f"{os.path.splitext(snapshot_path)[0]}.shard-{shard.label()}.json"
+                print(f"分片扫描: {shard}")
+            index_meta = _shard_index_meta(shard, os.path.abspath(start_path))
+
+            if args.watch:
+                output_filename = output_basename + (".ndjson" if INDEX_OUTPUT_FORMAT == "ndjson" else ".json")
+                try:
+                    watch_media_library(start_path, os.path.join(script_dir, output_filename), snapshot_path=snapshot_path,
+                                        ignore_rules=ignore_rules, followlinks=args.followlinks, lister=lister,
+                                        shard=shard)
+                except KeyboardInterrupt:
+                    print("\n监视已停止。")
+                sys.exit(0)
+
+            if INDEX_OUTPUT_FORMAT == "ndjson":
+                # 边扫描边写入，扫描过程中不在内存中保留条目（快照默认不使用，见 NDJSON_USE_SNAPSHOT）
+                output_full_path = os.path.join(script_dir, output_basename + ".ndjson")
+                if not args.ndjson_snapshot:
+                    snapshot_path = None
+                with NdjsonIndexWriter(output_full_path, meta=index_meta) as index_writer:
+                    scan_media_library_and_index(start_path, snapshot_path=snapshot_path, index_writer=index_writer,
+                                                 ignore_rules=ignore_rules, followlinks=args.followlinks, lister=lister,
+                                                 shard=shard)
                 print(f"\n索引已保存到: {output_full_path}")
-            except IOError as e:
-                print(f"错误: 无法写入文件 {output_full_path}: {e}")
+                movie_count = index_writer.counts["movie"]
+                tv_show_count = index_writer.counts["tv_show"]
+                media_data = None
+            else:
+                media_data = scan_media_library_and_index(start_path, snapshot_path=snapshot_path, ignore_rules=ignore_rules,
+                                                          followlinks=args.followlinks, lister=lister, shard=shard)
+                movie_count = len(media_data['movies'])
+                tv_show_count = len(media_data['tv_shows'])
+
+                output_full_path = os.path.join(script_dir, output_basename + ".json")
+                try:
+                    with open(output_full_path, 'w', encoding='utf-8') as f:
+                        json.dump({"_meta": index_meta, **media_data} if index_meta else media_data,
+                                  f, ensure_ascii=False, indent=4, default=json_default)
+                    print(f"\n索引已保存到: {output_full_path}")
+                except IOError as e:
+                    print(f"错误: 无法写入文件 {output_full_path}: {e}")
 
             # 打印摘要
             print(f"\n--- 扫描结果摘要 ---")
-            print(f"找到的电影数量: {len(media_data['movies'])}")
-            print(f"找到的剧集数量: {len(media_data['tv_shows'])}")
+            print(f"找到的电影数量: {movie_count}")
+            print(f"找到的剧集数量: {tv_show_count}")
+
+            if lister is not None:
+                print(f"AList 请求次数: {lister.request_count}")
 
             # --- 修改部分：默认不复制文件，通过用户确认来决定是否复制 ---
-            perform_copy_choice = input("\n是否要复制已索引的文件？(y/N): ").strip().lower()
+            # 通过 AList 扫描时文件不在本地，无法复制
+            perform_copy_choice = 'n' if lister is not None else input("\n是否要复制已索引的文件？(y/N): ").strip().lower()
             if perform_copy_choice == 'y':
                 print("\n用户选择复制文件。")
                 # original_scan_root 必须是扫描时使用的绝对路径，以便正确构建源路径
-                copy_indexed_files(media_data, os.path.abspath(start_path), "copyFile")
+                if media_data is None:
+                    # 逐行索引：从刚写出的文件中按需读取条目
+                    media_data = iter_media_index(output_full_path, follow=False)
+                copy_indexed_files(media_data, os.path.abspath(start_path), "copyFile", mode=args.copy_mode,
+                                   verify=args.copy_verify, workers=args.copy_workers)
             else:
                 print("\n未选择复制文件，跳过文件复制步骤。")
\ No newline at end of file
@@ -1,10 +1,12 @@
 import json
 import os
 import requests
-import xml.etree.ElementTree as ET # 用于解析XML (NFO) 文件
 from concurrent.futures import ThreadPoolExecutor, as_completed
 import threading # 用于锁，防止多线程写入共享数据时冲突
 import re # 用于文件名安全处理
+from media_index_io import find_media_index # 索引读取（支持逐行格式）
+from nfo_cache import cache_summary # NFO 字段缓存
+from nfo_pipeline import collect_nfo_paths, scan_nfo_files # 单次读取的 NFO 扫描
 
 # --- 配置信息 ---
 # 请替换为您的TMDb API Key
@@ -163,43 +165,6 @@ def fetch_studio_logo(studio_name: str) -> tuple[str, str | None]:
 
     return studio_name, downloaded_path
 
-# --- NFO 文件解析辅助函数 (针对制片厂) ---
-def parse_nfo_for_studios(nfo_file_path: str) -> set[str]:
-    """
-    解析NFO文件，提取制片厂的名称。
-    Args:
-        nfo_file_path: NFO文件的完整路径。
-    Returns:
-        一个包含制片厂名称字符串的集合。
-    """
-    studios_info = set()
-    if not os.path.exists(nfo_file_path):
-        # print(f"警告：NFO文件不存在：{nfo_file_path}") # Suppress for common cases
-        return studios_info
-
-    try:
-        # 尝试以UTF-8编码解析，如果失败则尝试GBK或其他常用编码
-        tree = ET.parse(nfo_file_path)
-        root = tree.getroot()
-    except ET.ParseError as e:
-        try: # 尝试不同的编码
-            with open(nfo_file_path, 'r', encoding='gbk', errors='ignore') as f: # Added errors='ignore'
-                content = f.read()
-            root = ET.fromstring(content)
-            # print(f"信息：NFO文件 '{nfo_file_path}' 以GBK编码解析成功。") # Suppress for common cases
-        except Exception as e_gbk:
-            print(f"错误：无法解析NFO文件 '{nfo_file_path}'：{e}. 尝试GBK失败：{e_gbk}")
-            return studios_info
-    except Exception as e:
-        print(f"错误：读取NFO文件 '{nfo_file_path}' 时发生未知错误：{e}")
-        return studios_info
-
-    # 查找所有 <studio> 标签
-    for studio_elem in root.findall('studio'):
-        if studio_elem is not None and studio_elem.text:
-            studios_info.add(studio_elem.text.strip())
-    return studios_info
-
 # --- 主处理函数 ---
 def process_media_index(input_file: str = "media_index.json", output_file: str = "studios_summary.json"):
     """
@@ -209,9 +174,11 @@ def process_media_index(input_file: str = "media_index.json", output_file: str =
         input_file: 输入的media_index.json文件路径。
         output_file: 输出的studios_summary.json文件路径。
     """
+    input_file = find_media_index(input_file)
+    print("--- 正在收集NFO路径 ---")
     try:
-        with open(input_file, 'r', encoding='utf-8') as f:
-            media_data = json.load(f)
+        # 按需逐个读取索引条目（同时支持 media_index.json 和逐行格式的 media_index.ndjson），结果已去重并排序
+        unique_nfo_paths = collect_nfo_paths(input_file)
     except FileNotFoundError:
         print(f"错误：输入文件 '{input_file}' 未找到。")
         return
@@ -219,105 +186,18 @@ def process_media_index(input_file: str = "media_index.json", output_file: str =
         print(f"错误：无法从文件 '{input_file}' 解析JSON。请检查文件格式。")
         return
 
-    all_nfo_paths = []
-
-    # --- 收集所有电影的NFO路径 ---
-    if "movies" in media_data:
-        print("--- 正在收集电影NFO路径 ---")
-        for movie in media_data["movies"]:
-            movie_base_path = movie["path"]
-            if not movie.get("files"):
-                print(f"警告：电影 '{movie_base_path}' 没有找到 'files' 信息，跳过。")
-                continue
-            for file_info in movie["files"]:
-                if "nfo" in file_info and file_info["nfo"]:
-                    nfo_data = file_info["nfo"] # 'nfo' field can be a string or a list
-                    if isinstance(nfo_data, list):
-                        for nfo_filename in nfo_data:
-                            if nfo_filename: # Ensure path is not empty
-                                full_nfo_path = os.path.normpath(os.path.join(movie_base_path, nfo_filename))
-                                all_nfo_paths.append(full_nfo_path)
-                    elif isinstance(nfo_data, str):
-                        full_nfo_path = os.path.normpath(os.path.join(movie_base_path, nfo_data))
-                        all_nfo_paths.append(full_nfo_path)
-                    else:
-                        print(f"警告：电影 '{movie_base_path}' 的 'nfo' 字段类型未知 ({type(nfo_data).__name__}), 跳过。")
-
-
-    # --- 收集所有电视剧的NFO路径 ---
-    if "tv_shows" in media_data:
-        print("\n--- 正在收集电视剧NFO路径 ---")
-        for tv_show in media_data["tv_shows"]:
-            tv_show_base_path = tv_show["path"]
-            if not tv_show.get("files"):
-                print(f"警告：电视剧 '{tv_show_base_path}' 没有找到 'files' 信息，跳过。")
-                continue
-
-            # 假设每个tv_show的'files'列表中只有一个字典，包含了所有NFO信息
-            files_data = tv_show["files"][0]
-
-            # 添加剧集NFO (tvshow_nfo)
-            if "tvshow_nfo" in files_data and files_data["tvshow_nfo"]:
-                tvshow_nfo_data = files_data["tvshow_nfo"]
-                if isinstance(tvshow_nfo_data, list):
-                    for tvshow_nfo_rel_path in tvshow_nfo_data:
-                        if tvshow_nfo_rel_path:
-                            full_tvshow_nfo_path = os.path.normpath(os.path.join(tv_show_base_path, tvshow_nfo_rel_path))
-                            all_nfo_paths.append(full_tvshow_nfo_path)
-                elif isinstance(tvshow_nfo_data, str):
-                    full_tvshow_nfo_path = os.path.normpath(os.path.join(tv_show_base_path, tvshow_nfo_data))
-                    all_nfo_paths.append(full_tvshow_nfo_path)
-                else:
-                    print(f"警告：电视剧 '{tv_show_base_path}' 的 'tvshow_nfo' 类型未知 ({type(tvshow_nfo_data).__name__})，跳过。")
-
-
-            # 添加季NFO (season_nfo)
-            if "season_nfo" in files_data and files_data["season_nfo"]:
-                season_nfo_data = files_data["season_nfo"]
-                if isinstance(season_nfo_data, list):
-                    for season_nfo_rel_path in season_nfo_data:
-                        if season_nfo_rel_path:
-                            full_season_nfo_path = os.path.normpath(os.path.join(tv_show_base_path, season_nfo_rel_path))
-                            all_nfo_paths.append(full_season_nfo_path)
-                elif isinstance(season_nfo_data, str):
-                     full_season_nfo_path = os.path.normpath(os.path.join(tv_show_base_path, season_nfo_data))
-                     all_nfo_paths.append(full_season_nfo_path)
-                else:
-                    print(f"警告：电视剧 '{tv_show_base_path}' 的 'season_nfo' 类型未知 ({type(season_nfo_data).__name__})，跳过。")
-
-
-            # 添加单集NFO (nfo)
-            if "nfo" in files_data and files_data["nfo"]:
-                episode_nfo_data = files_data["nfo"]
-                if isinstance(episode_nfo_data, list):
-                    for season_dict in episode_nfo_data:
-                        if isinstance(season_dict, dict):
-                            for season_folder, episode_nfo_list in season_dict.items():
-                                if isinstance(episode_nfo_list, list):
-                                    for episode_nfo_rel_path in episode_nfo_list:
-                                        if episode_nfo_rel_path:
-                                            full_episode_nfo_path = os.path.normpath(os.path.join(tv_show_base_path, episode_nfo_rel_path))
-                                            all_nfo_paths.append(full_episode_nfo_path)
-                                else:
-                                    print(f"警告：电视剧 '{tv_show_base_path}' 中季 '{season_folder}' 的集NFO格式异常（应为列表），跳过。")
-                        else:
-                            print(f"警告：电视剧 '{tv_show_base_path}' 的 'nfo' 字段中的季字典格式异常（应为字典），跳过。")
-                else:
-                    print(f"警告：电视剧 '{tv_show_base_path}' 的 'nfo' 字段类型未知（应为列表），跳过。")
-
-    # 对所有NFO路径进行去重
-    unique_nfo_paths = sorted(list(set(all_nfo_paths)))
-
     print("\n--- 收集到的独特NFO文件路径 ---")
     for path in unique_nfo_paths:
         print(path)
     print(f"\n总共找到 {len(unique_nfo_paths)} 个独特的NFO文件路径。\n")
 
-    # --- 从NFO文件中解析所有制片厂信息 ---
-    all_studios_to_fetch = set() # 存储待处理的制片厂名称，用于去重
-    for nfo_path in unique_nfo_paths:
-        studios_in_nfo = parse_nfo_for_studios(nfo_path)
-        all_studios_to_fetch.update(studios_in_nfo)
+    # --- 从NFO文件中解析所有制片厂信息（每个NFO只读取一次）---
+    metadata = scan_nfo_files(unique_nfo_paths)
+    for nfo_path, error in metadata.errors:
+        print(f"错误：无法解析NFO文件 '{nfo_path}'：{error}")
+    all_studios_to_fetch = metadata.studios # 待处理的制片厂名称，已去重
+    if cache_summary():
+        print(cache_summary())
 
     print(f"从NFO文件中解析到 {len(all_studios_to_fetch)} 个独特的制片厂信息。\n")
 
@@ -1,5 +1,10 @@
 import os
+import argparse
 from PIL import Image
+import media_walker # 并发目录遍历
+from ignore_rules import add_ignore_arguments, ignore_rules_from_args # 忽略规则
+import io_throttle # 按挂载点节流
+import fs_trace # 文件系统操作耗时追踪
 
 # --- !!! 警告 !!! ---
 # 请注意，此脚本会直接覆盖你的原始图片文件。
@@ -106,8 +111,18 @@ def compress_image(image_path, target_height):
 def main():
     """
     主函数，遍历当前目录及其子目录，查找并压缩所有名为 TARGET_FILENAME 的文件。
+    当前目录下的 .mhignore 和命令行 --ignore 给出的目录/文件会被跳过。
     """
+    parser = argparse.ArgumentParser(description=f"压缩当前目录及其子目录中所有名为 '{TARGET_FILENAME}' 的图片。")
+    add_ignore_arguments(parser)
+    io_throttle.add_throttle_arguments(parser)
+    fs_trace.add_trace_arguments(parser)
+    args = parser.parse_args()
+    io_throttle.configure_from_args(args)
+    fs_trace.configure_from_args(args)
+
     current_dir = os.getcwd()
+    ignore_rules = ignore_rules_from_args(current_dir, args)
 
     print(f"--- !!! 警告 !!! ---")
     print(f"此脚本将直接压缩并覆盖在当前目录 '{current_dir}' 及其所有子目录中找到的所有名为 '{TARGET_FILENAME}' 的文件。")
@@ -122,7 +137,7 @@ def main():
     files_found_count = 0
 
     # 遍历当前目录及其所有子目录
-    for root, _, files in os.walk(current_dir):
+    for root, _, files in media_walker.walk(current_dir, ignore=ignore_rules):
         for file in files:
             # 检查文件名是否与 TARGET_FILENAME 匹配 (不区分大小写)
             if file.lower() == TARGET_FILENAME.lower():
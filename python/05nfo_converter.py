@@ -1,105 +1,171 @@
 import os
-import chardet
+import sys
 import codecs # 用于处理BOM
-
-def convert_nfo_to_gbk(filepath):
+import shutil
+import argparse
+import tempfile
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from encoding_detect import EncodingVerdict, VerdictCache, detect_file # 编码检测（BOM > UTF-8 > chardet）
+
+# --- 配置信息 ---
+# 转换的目标编码，以及需要转换的源编码
+TARGET_ENCODING = 'gbk'
+SOURCE_ENCODINGS = ('utf-8', 'utf-8-sig')
+# 并发处理的线程数。大部分文件只需读取和 UTF-8 检查，瓶颈在文件读写（尤其是网络挂载）上
+CONVERT_WORKERS = int(os.environ.get("MEDIAHUB_CONVERT_WORKERS", "8"))
+# 编码检测结果缓存（保存在脚本目录下）：再次运行时，没有变化的文件不需要读取。
+# 可以用环境变量 MEDIAHUB_ENCODING_CACHE 指定其他路径，设置为空字符串则不保存。
+ENCODING_CACHE_FILENAME = "nfo_encoding_cache.json"
+ENCODING_CACHE_PATH = os.environ.get("MEDIAHUB_ENCODING_CACHE",
+                                     os.path.join(os.path.dirname(os.path.abspath(__file__)), ENCODING_CACHE_FILENAME))
+# 每处理多少个文件刷新一次控制台进度
+PROGRESS_EVERY = 200
+
+def write_atomic(filepath, data):
     """
-    检查NFO文件的编码，如果是UTF-8则转换为GBK。
-    尝试修复转换过程中可能出现的乱码。
+    先写入同目录下的临时文件再替换原文件：中途出错或被中断时原文件保持不变，不会留下写了一半的 NFO。
+    保留原文件的权限位。
     """
-    print(f"\n--- 处理文件: {filepath} ---")
+    directory, filename = os.path.split(filepath)
+    fd, temp_path = tempfile.mkstemp(prefix=f".{filename}.", suffix=".tmp", dir=directory or '.')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        shutil.copymode(filepath, temp_path)
+        os.replace(temp_path, filepath)
+    except BaseException:
+        try:
+            os.remove(temp_path)
+        except OSError:
+            pass
+        raise
+
+def convert_nfo_to_gbk(filepath, cache=None, dry_run=False):
+    """
+    检查NFO文件的编码，如果是UTF-8则转换为GBK。
+    对于GBK无法表示的字符，替换为问号。
 
+    Returns:
+        tuple: (状态, 说明)。状态为 "converted"、"skipped" 或 "failed"。
+    """
     try:
-        # 1. 读取文件内容为字节
+        # 1. 检测编码（缓存中有结果且文件未变时不读取文件）
+        verdict = detect_file(filepath, cache=cache)
+        if verdict.encoding not in SOURCE_ENCODINGS:
+            return "skipped", f"编码为 {verdict.encoding}（{verdict.method}），无需转换。"
+
+        # 2. 读取并以UTF-8解码
         with open(filepath, 'rb') as f:
             raw_content = f.read()
+        notes = []
+        # 移除UTF-8 BOM，如果存在的话
+        if raw_content.startswith(codecs.BOM_UTF8):
+            raw_content = raw_content[len(codecs.BOM_UTF8):]
+            notes.append("已移除UTF-8 BOM。")
+        try:
+            content_str = raw_content.decode('utf-8')
+        except UnicodeDecodeError as e:
+            return "failed", f"检测为UTF-8，但实际解码失败（文件可能在检测后被修改）。文件未被修改。{e}"
+
+        # 3. 编码为GBK
+        try:
+            converted_content_bytes = content_str.encode(TARGET_ENCODING)
+        except UnicodeEncodeError:
+            # 'replace' 会将无法编码的字符替换为问号
+            converted_content_bytes = content_str.encode(TARGET_ENCODING, errors='replace')
+            notes.append("部分UTF-8字符无法映射到GBK，已被替换为问号。")
+
+        if dry_run:
+            return "converted", " ".join(notes + ["将从UTF-8转换为GBK（试运行，文件未被修改）。"])
+
+        # 4. 写入临时文件后替换原文件
+        write_atomic(filepath, converted_content_bytes)
+        if cache is not None:
+            cache.put(filepath, os.stat(filepath), EncodingVerdict(TARGET_ENCODING, "converted", 1.0))
+        return "converted", " ".join(notes + ["成功将文件从UTF-8转换为GBK。"])
+
+    except OSError as e:
+        return "failed", f"无法读取或写入文件: {e}"
+
+def iter_nfo_files(root_dir):
+    """遍历目录及其子目录，产出所有 .nfo 文件路径。"""
+    for root, _, files in os.walk(root_dir):
+        for file in files:
+            if file.lower().endswith('.nfo'):
+                yield os.path.join(root, file)
 
-        # 2. 使用chardet检测编码
-        result = chardet.detect(raw_content)
-        detected_encoding = result['encoding']
-        confidence = result['confidence']
-
-        print(f"  检测到编码: {detected_encoding} (置信度: {confidence:.2f})")
-
-        # 3. 判断是否需要转换
-        if detected_encoding and detected_encoding.lower() == 'utf-8':
-            if confidence < 0.9: # 对低置信度的UTF-8发出警告
-                print("  警告: UTF-8置信度较低，转换可能存在风险。")
-
-            # 移除UTF-8 BOM，如果存在的话
-            if raw_content.startswith(codecs.BOM_UTF8):
-                raw_content = raw_content[len(codecs.BOM_UTF8):]
-                print("  已移除UTF-8 BOM。")
-
-            try:
-                # 尝试以UTF-8解码
-                content_str = raw_content.decode('utf-8')
-
-                try:
-                    # 尝试以GBK编码，如果遇到GBK不支持的字符，使用 'replace' 策略
-                    # 'replace' 会将无法编码的字符替换为问号 '?' 或默认替换字符
-                    converted_content_bytes = content_str.encode('gbk', errors='replace')
-
-                    # 检查是否有字符被替换（简单的启发式判断）
-                    # 注意：如果原始UTF-8字符串包含 '?'，这个判断会误报
-                    # 更精确的判断需要比较原始字符串和GBK编码后解码回来的字符串
-                    if '?' in content_str and '?' not in converted_content_bytes.decode('gbk', errors='ignore'):
-                         # 这是一个非常粗略的检查，可能不准确
-                        pass
-                    elif b'?' in converted_content_bytes and '?' not in content_str:
-                         print("  注意: 转换到GBK时，部分UTF-8字符无法映射，已被替换。")
-
-                    # 写入转换后的内容
-                    with open(filepath, 'wb') as f:
-                        f.write(converted_content_bytes)
-                    print("  成功将文件从UTF-8转换为GBK。")
-
-                except UnicodeEncodeError as e:
-                    print(f"  错误: 无法将UTF-8内容编码为GBK。可能包含GBK不支持的字符。{e}")
-                    print("  文件未被修改。")
-
-            except UnicodeDecodeError as e:
-                print(f"  错误: 文件被chardet检测为UTF-8，但实际解码失败。可能不是纯粹的UTF-8编码。{e}")
-                print("  文件未被修改。")
-
-        elif detected_encoding and detected_encoding.lower() == 'gbk':
-            print("  文件已经是GBK编码，无需转换。")
-        else:
-            print(f"  文件编码为 {detected_encoding}，不进行处理。")
-
-    except Exception as e:
-        print(f"  处理 {filepath} 时发生未知错误: {e}")
+def convert_all(root_dir, workers=CONVERT_WORKERS, cache=None, dry_run=False, verbose=False):
+    """
+    用线程池并发处理目录下的所有 NFO。同一时间最多有 workers * 4 个文件在处理中，
+    遍历和处理同时进行，内存占用与文件总数无关。
+
+    Returns:
+        dict: 各状态的文件数量。
+    """
+    counts = {"converted": 0, "skipped": 0, "failed": 0}
+    processed = 0
+
+    def report(filepath, status, message):
+        nonlocal processed
+        processed += 1
+        counts[status] += 1
+        if status != "skipped" or verbose:
+            label = {"converted": "转换", "skipped": "跳过", "failed": "错误"}[status]
+            print(f"[{label}] {filepath}: {message}")
+        if processed % PROGRESS_EVERY == 0:
+            print(f"已处理 {processed} 个文件...", end='\r')
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        in_flight = {}
+        for filepath in iter_nfo_files(root_dir):
+            in_flight[executor.submit(convert_nfo_to_gbk, filepath, cache, dry_run)] = filepath
+            if len(in_flight) >= workers * 4:
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    report(in_flight.pop(future), *future.result())
+        for future in list(in_flight):
+            report(in_flight.pop(future), *future.result())
+    return counts
 
 def main():
+    parser = argparse.ArgumentParser(description="检查目录下所有 .nfo 文件的编码，将 UTF-8 编码的文件转换为 GBK。")
+    parser.add_argument('root', nargs='?', default='.', help="要处理的目录，默认为当前目录。")
+    parser.add_argument('-y', '--yes', action='store_true', help="批量模式：不询问确认，直接执行。")
+    parser.add_argument('--dry-run', action='store_true', help="只检测并报告需要转换的文件，不修改任何文件。")
+    parser.add_argument('--workers', type=int, default=CONVERT_WORKERS, help=f"并发线程数，默认 {CONVERT_WORKERS}。")
+    parser.add_argument('--no-cache', action='store_true', help="不使用也不更新编码检测缓存。")
+    parser.add_argument('--verbose', action='store_true', help="同时列出无需转换的文件。")
+    args = parser.parse_args()
+
     print("NFO文件编码检查与转换工具")
     print("-----------------------------------")
-    print("本工具将遍历当前目录及其子目录，检查所有.nfo文件。")
+    print(f"本工具将遍历 '{args.root}' 及其子目录，检查所有.nfo文件。")
     print("如果文件被检测为UTF-8编码，则尝试将其转换为GBK编码。")
     print("在转换过程中，对于GBK无法表示的UTF-8字符，将替换为问号。")
-    print("转换前请务必备份您的NFO文件！\n")
-
-    confirm = input("是否继续执行？(y/n): ").lower()
-    if confirm != 'y':
-        print("操作已取消。")
-        return
-
-    nfo_found_count = 0
-    converted_count = 0
-
-    for root, _, files in os.walk('.'): # 遍历当前目录及子目录
-        for file in files:
-            if file.lower().endswith('.nfo'):
-                nfo_found_count += 1
-                full_path = os.path.join(root, file)
-                # 调用处理函数
-                convert_nfo_to_gbk(full_path)
-                # 简单计数，后续可以根据日志判断是否真正转换成功
-                # converted_count += 1 # 如果你想只统计成功转换的，需要修改convert_nfo_to_gbk返回状态
+    if not args.dry_run:
+        print("转换前请务必备份您的NFO文件！\n")
+        if not args.yes:
+            confirm = input("是否继续执行？(y/n): ").lower()
+            if confirm != 'y':
+                print("操作已取消。")
+                return
+
+    cache = None if args.no_cache else VerdictCache(ENCODING_CACHE_PATH or None)
+    try:
+        counts = convert_all(args.root, args.workers, cache, args.dry_run, args.verbose)
+    finally:
+        if cache is not None:
+            cache.save()
 
     print("\n-----------------------------------")
-    print(f"扫描完成。共找到 {nfo_found_count} 个 .nfo 文件。")
-    print("请查看上方输出日志，了解每个文件的处理情况。")
-    print("强烈建议您手动检查转换后的文件，确保内容完整无误。")
+    total = sum(counts.values())
+    action = "需要转换" if args.dry_run else "已转换"
+    print(f"扫描完成。共找到 {total} 个 .nfo 文件：{action} {counts['converted']} 个，"
+          f"无需转换 {counts['skipped']} 个，失败 {counts['failed']} 个。")
+    if counts['converted'] and not args.dry_run:
+        print("强烈建议您手动检查转换后的文件，确保内容完整无误。")
+    if counts['failed']:
+        sys.exit(1)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -1,8 +1,12 @@
 import os
-import sys
+import argparse
 from collections import Counter # 导入 Counter 类
+import media_walker # 并发目录遍历
+from ignore_rules import IgnoreRules, add_ignore_arguments, ignore_rules_from_args # 忽略规则
+import io_throttle # 按挂载点节流
+import fs_trace # 文件系统操作耗时追踪
 
-def find_and_count_and_filter_jpg_filenames(start_directory, min_count=3):
+def find_and_count_and_filter_jpg_filenames(start_directory, min_count=3, ignore_rules=None):
     """
     查找指定目录及其子目录下所有JPG/JPEG文件的文件名，统计其出现次数，
     并返回出现次数大于 min_count 的文件名及其计数。
@@ -10,6 +14,7 @@ def find_and_count_and_filter_jpg_filenames(start_directory, min_count=3):
     Args:
         start_directory (str): 开始搜索的目录路径。
         min_count (int): 文件的最小出现次数，只输出出现次数大于此值的文件名。
+        ignore_rules (IgnoreRules): 忽略规则，默认读取起始目录下的 .mhignore。
 
     Returns:
         list: 包含元组 (filename, count) 的列表，按 count 降序排列，
@@ -20,12 +25,15 @@ def find_and_count_and_filter_jpg_filenames(start_directory, min_count=3):
         print(f"错误：'{start_directory}' 不是一个有效的目录。")
         return []
 
+    if ignore_rules is None:
+        ignore_rules = IgnoreRules.load(start_directory)
+
     all_jpg_filenames = []
     jpg_extensions = ('.jpg', '.jpeg')
 
     print(f"正在扫描 '{start_directory}' 及其子目录中的JPG/JPEG文件并统计...")
 
-    for root, _, files in os.walk(start_directory):
+    for root, _, files in media_walker.walk(start_directory, ignore=ignore_rules):
         for file_name in files:
             if file_name.lower().endswith(jpg_extensions):
                 all_jpg_filenames.append(file_name.lower())
@@ -44,15 +52,21 @@ def find_and_count_and_filter_jpg_filenames(start_directory, min_count=3):
     return sorted(filtered_items, key=lambda x: (-x[1], x[0]))
 
 if __name__ == "__main__":
-    if len(sys.argv) > 1:
-        target_directory = sys.argv[1]
-    else:
-        target_directory = '.' # 当前目录
+    parser = argparse.ArgumentParser(description="统计目录中重复出现的 JPG/JPEG 文件名。")
+    parser.add_argument('directory', nargs='?', default='.', help="要扫描的目录，默认为当前目录。")
+    add_ignore_arguments(parser)
+    io_throttle.add_throttle_arguments(parser)
+    fs_trace.add_trace_arguments(parser)
+    args = parser.parse_args()
+    io_throttle.configure_from_args(args)
+    fs_trace.configure_from_args(args, root=args.directory)
+    target_directory = args.directory
 
     MIN_OCCURRENCES = 3 # 设定最小计数为 3 (即大于3张，所以是 > 3)
 
     # 调用函数查找和过滤文件名及数量
-    found_filtered_items = find_and_count_and_filter_jpg_filenames(target_directory, MIN_OCCURRENCES)
+    found_filtered_items = find_and_count_and_filter_jpg_filenames(
+        target_directory, MIN_OCCURRENCES, ignore_rules=ignore_rules_from_args(target_directory, args))
 
     if found_filtered_items:
         print(f"\n找到以下 JPG/JPEG 文件名及其数量 (出现次数大于 {MIN_OCCURRENCES} 次，按数量降序排列)：")
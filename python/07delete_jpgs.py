@@ -1,7 +1,11 @@
 import os
-import sys
+import argparse
+import media_walker # 并发目录遍历
+from ignore_rules import IgnoreRules, add_ignore_arguments, ignore_rules_from_args # 忽略规则
+import io_throttle # 按挂载点节流
+import fs_trace # 文件系统操作耗时追踪
 
-def delete_specific_jpg_files(start_directory):
+def delete_specific_jpg_files(start_directory, ignore_rules=None):
     """
     扫描指定目录及其子目录，删除所有是 JPG/JPEG 文件，但不是
     'folder.jpg', 'poster.jpg', 'fanart.jpg', 'banner.jpg', 'landscape.jpg'
@@ -9,12 +13,16 @@ def delete_specific_jpg_files(start_directory):
 
     Args:
         start_directory (str): 开始搜索的目录路径。
+        ignore_rules (IgnoreRules): 忽略规则，默认读取起始目录下的 .mhignore。被忽略的目录不会被访问，其中的文件也不会被删除。
     """
     # 检查起始目录是否存在且是一个目录
     if not os.path.isdir(start_directory):
         print(f"错误：'{start_directory}' 不是一个有效的目录。请提供一个存在的目录。")
         return
 
+    if ignore_rules is None:
+        ignore_rules = IgnoreRules.load(start_directory)
+
     # 定义要保留的文件名（不区分大小写）
     # 使用集合(set)进行快速查找
     files_to_keep = {
@@ -43,7 +51,7 @@ def delete_specific_jpg_files(start_directory):
     print(f"以下文件将被跳过 (不区分大小写): {', '.join(files_to_keep)}")
     print("-" * 60)
 
-    for root, _, files in os.walk(start_directory):
+    for root, _, files in media_walker.walk(start_directory, ignore=ignore_rules):
         for file_name in files:
             # 1. 检查文件是否是JPG/JPEG
             if file_name.lower().endswith(jpg_extensions):
@@ -75,10 +83,15 @@ def delete_specific_jpg_files(start_directory):
 if __name__ == "__main__":
     # 允许用户通过命令行参数指定目录
     # 如果没有提供参数，则默认为当前工作目录 '.'
-    if len(sys.argv) > 1:
-        target_directory = sys.argv[1]
-    else:
-        target_directory = '.' # 当前目录
+    parser = argparse.ArgumentParser(description="删除目录中除常用海报/背景图以外的 JPG/JPEG 文件。")
+    parser.add_argument('directory', nargs='?', default='.', help="要扫描的目录，默认为当前目录。")
+    add_ignore_arguments(parser)
+    io_throttle.add_throttle_arguments(parser)
+    fs_trace.add_trace_arguments(parser)
+    args = parser.parse_args()
+    io_throttle.configure_from_args(args)
+    fs_trace.configure_from_args(args, root=args.directory)
+    target_directory = args.directory
 
     # 调用函数执行删除操作
-    delete_specific_jpg_files(target_directory)
\ No newline at end of file
+    delete_specific_jpg_files(target_directory, ignore_rules=ignore_rules_from_args(target_directory, args))
\ No newline at end of file
@@ -1,8 +1,13 @@
 # -*- coding: utf-8 -*-
 import os
 import json
+import argparse
+import media_walker # 并发目录遍历
+from ignore_rules import IgnoreRules, add_ignore_arguments, ignore_rules_from_args # 忽略规则
+import io_throttle # 按挂载点节流
+import fs_trace # 文件系统操作耗时追踪
 
-def create_path_map(root_dir, target_filename='folder.jpg', ignore_dirs=None, ignore_files=None):
+def create_path_map(root_dir, target_filename='folder.jpg', ignore_dirs=None, ignore_files=None, ignore_rules=None):
     """
     遍历指定目录，查找目标文件，并生成一个扁平的 JSON 映射。
 
@@ -12,16 +17,19 @@ def create_path_map(root_dir, target_filename='folder.jpg', ignore_dirs=None, ig
     :param target_filename: 要查找的目标文件名（不区分大小写）。
     :param ignore_dirs: 一个包含要忽略的目录名的集合。
     :param ignore_files: 一个包含要忽略的文件名的集合。
+    :param ignore_rules: gitignore 风格的忽略规则（IgnoreRules），默认读取根目录下的 .mhignore。
     :return: 一个代表路径映射的字典。
     """
     if ignore_dirs is None:
         ignore_dirs = set()
     if ignore_files is None:
         ignore_files = set()
+    if ignore_rules is None:
+        ignore_rules = IgnoreRules.load(root_dir)
 
     path_map = {}
 
-    for dirpath, dirnames, filenames in os.walk(root_dir):
+    for dirpath, dirnames, filenames in media_walker.walk(root_dir, ignore=ignore_rules):
         dirnames[:] = [d for d in dirnames if d not in ignore_dirs]
 
         for filename in filenames:
@@ -40,6 +48,14 @@ def create_path_map(root_dir, target_filename='folder.jpg', ignore_dirs=None, ig
     return path_map
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="生成演员头像路径映射 people_summary.json。")
+    add_ignore_arguments(parser)
+    io_throttle.add_throttle_arguments(parser)
+    fs_trace.add_trace_arguments(parser)
+    args = parser.parse_args()
+    io_throttle.configure_from_args(args)
+    fs_trace.configure_from_args(args)
+
     try:
         script_path = os.path.dirname(os.path.abspath(__file__))
     except NameError:
@@ -53,7 +69,8 @@ if __name__ == "__main__":
     file_map = create_path_map(
         root_dir=root_directory,
         target_filename='folder.jpg',
-        ignore_dirs=dirs_to_ignore
+        ignore_dirs=dirs_to_ignore,
+        ignore_rules=ignore_rules_from_args(root_directory, args)
     )
 
     if file_map:
@@ -4,6 +4,7 @@ import requests
 import re
 from concurrent.futures import ThreadPoolExecutor, as_completed
 import threading
+from media_index_io import find_media_index, iter_media_index
 
 # --- Configuration ---
 # IMPORTANT: Replace "YOUR_TMDB_API_KEY" with your actual TMDb API key
@@ -136,28 +137,23 @@ if __name__ == "__main__":
         safe_print("You can get one from https://www.themoviedb.org/documentation/api")
         exit()
 
+    futures = []
+    items_to_process = []
+
+    # Collect all items that need processing.
+    # Entries are read one at a time, so both media_index.json and media_index.ndjson work.
+    media_index_path = find_media_index('media_index.json')
     try:
-        with open('media_index.json', 'r', encoding='utf-8') as f:
-            media_data = json.load(f)
+        for media_type_key, item in iter_media_index(media_index_path):
+            if 'poster_image' not in item['files'][0]:
+                items_to_process.append((item, 'movie' if media_type_key == 'movies' else 'tv'))
     except FileNotFoundError:
         safe_print("Error: media_index.json not found in the current directory.")
         exit()
     except json.JSONDecodeError:
-        safe_print("Error: Could not decode media_index.json. Check JSON format for errors.")
+        safe_print(f"Error: Could not decode {media_index_path}. Check JSON format for errors.")
         exit()
 
-    futures = []
-    items_to_process = []
-
-    # Collect all items that need processing
-    for item in media_data.get('movies', []):
-        if 'poster_image' not in item['files'][0]:
-            items_to_process.append((item, 'movie'))
-
-    for item in media_data.get('tv_shows', []):
-        if 'poster_image' not in item['files'][0]:
-            items_to_process.append((item, 'tv'))
-
     total_tasks = len(items_to_process)
     if total_tasks == 0:
         safe_print("No missing posters to process. All entries seem to have a 'poster_image' key.")
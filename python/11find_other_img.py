@@ -1,14 +1,22 @@
 import os
+import argparse
 from collections import Counter
+import media_walker # 并发目录遍历
+from ignore_rules import IgnoreRules, add_ignore_arguments, ignore_rules_from_args # 忽略规则
+import io_throttle # 按挂载点节流
+import fs_trace # 文件系统操作耗时追踪
 
-def find_most_common_non_jpg_images(directory="."):
+def find_most_common_non_jpg_images(directory=".", ignore_rules=None):
     """
     筛选指定目录及其子目录中所有非 JPG/JPEG 图片，
     统计出最多的文件名，并按多到少排序输出。
 
     Args:
         directory (str): 要扫描的起始目录。默认为当前目录。
+        ignore_rules (IgnoreRules): 忽略规则，默认读取起始目录下的 .mhignore。
     """
+    if ignore_rules is None:
+        ignore_rules = IgnoreRules.load(directory)
 
     # 定义常见的图片扩展名，不包含 .jpg 和 .jpeg
     # 注意：所有扩展名都小写，以确保不区分大小写地匹配
@@ -23,7 +31,7 @@ def find_most_common_non_jpg_images(directory="."):
     print("-" * 30)
 
     # 遍历指定目录及其所有子目录
-    for root, _, files in os.walk(directory):
+    for root, _, files in media_walker.walk(directory, ignore=ignore_rules):
         for filename in files:
             # 分离文件名和扩展名
             name, ext = os.path.splitext(filename)
@@ -53,8 +61,17 @@ def find_most_common_non_jpg_images(directory="."):
     print("-" * 50)
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="统计目录中非 JPG/JPEG 图片的文件名。")
+    parser.add_argument('directory', nargs='?', default='.', help="要扫描的目录，默认为当前目录。")
+    add_ignore_arguments(parser)
+    io_throttle.add_throttle_arguments(parser)
+    fs_trace.add_trace_arguments(parser)
+    args = parser.parse_args()
+    io_throttle.configure_from_args(args)
+    fs_trace.configure_from_args(args, root=args.directory)
+
     # 运行脚本，默认扫描当前目录
-    find_most_common_non_jpg_images()
+    find_most_common_non_jpg_images(args.directory, ignore_rules=ignore_rules_from_args(args.directory, args))
 
     # 如果你想扫描其他目录，可以这样调用：
     # find_most_common_non_jpg_images("/path/to/your/images")
\ No newline at end of file
@@ -1,5 +1,10 @@
 import os
 import sys
+import argparse
+import media_walker # 并发目录遍历
+from ignore_rules import IgnoreRules, add_ignore_arguments, ignore_rules_from_args # 忽略规则
+import io_throttle # 按挂载点节流
+import fs_trace # 文件系统操作耗时追踪
 
 # --- 配置区 ---
 # 定义要删除的图片文件名列表 (所有输入文件名都会被转换为小写进行匹配)
@@ -57,7 +62,7 @@ DRY_RUN = False         # 默认为 True (试运行模式)。如果为 True，
 CONFIRM_DELETION = True # 在实际删除前是否要求用户确认 (仅在 DRY_RUN 为 False 时生效)。
 # -----------------------------
 
-def delete_specified_images(directory, filenames_to_delete_lower, dry_run=True, confirm=True):
+def delete_specified_images(directory, filenames_to_delete_lower, dry_run=True, confirm=True, ignore_rules=None):
     """
     在指定目录及其子目录中查找并删除特定文件名的图片。
 
@@ -66,7 +71,11 @@ def delete_specified_images(directory, filenames_to_delete_lower, dry_run=True,
         filenames_to_delete_lower (set): 包含要删除的图片文件名的集合 (小写)。
         dry_run (bool): 如果为 True，则只模拟删除并打印信息，不实际删除文件。
         confirm (bool): 如果为 True 并且不是 dry_run，则在删除前要求用户确认。
+        ignore_rules (IgnoreRules): 忽略规则，默认读取起始目录下的 .mhignore。被忽略的目录不会被访问。
     """
+    if ignore_rules is None:
+        ignore_rules = IgnoreRules.load(directory)
+
     print(f"模式: {'试运行' if dry_run else '实际删除文件'}")
     print(f"正在扫描目录：{os.path.abspath(directory)}")
     print(f"将要处理的文件名 (不区分大小写)：{sorted(list(filenames_to_delete_lower))}")
@@ -83,7 +92,7 @@ def delete_specified_images(directory, filenames_to_delete_lower, dry_run=True,
             print("操作已取消。")
             sys.exit() # 退出脚本
 
-    for root, _, files in os.walk(directory):
+    for root, _, files in media_walker.walk(directory, ignore=ignore_rules):
         for filename in files:
             # 获取文件的基本名并转换为小写，以便进行大小写不敏感的匹配
             basename_lower = os.path.basename(filename).lower()
@@ -125,6 +134,15 @@ def delete_specified_images(directory, filenames_to_delete_lower, dry_run=True,
     print("=" * 50)
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="批量删除指定文件名的图片。")
+    parser.add_argument('directory', nargs='?', default=START_DIRECTORY, help="要扫描的目录，默认为 START_DIRECTORY。")
+    add_ignore_arguments(parser)
+    io_throttle.add_throttle_arguments(parser)
+    fs_trace.add_trace_arguments(parser)
+    args = parser.parse_args()
+    io_throttle.configure_from_args(args)
+    fs_trace.configure_from_args(args, root=args.directory)
+
     print("--- 图片文件批量删除工具 ---")
     print("请仔细检查脚本顶部的 'DRY_RUN' 和 'CONFIRM_DELETION' 配置！")
     print(f"当前 DRY_RUN 设置: {DRY_RUN}")
@@ -132,7 +150,8 @@ if __name__ == "__main__":
     print("-" * 50)
 
     # 运行主函数
-    delete_specified_images(START_DIRECTORY, FILENAMES_TO_DELETE_LOWER, DRY_RUN, CONFIRM_DELETION)
+    delete_specified_images(args.directory, FILENAMES_TO_DELETE_LOWER, DRY_RUN, CONFIRM_DELETION,
+                            ignore_rules=ignore_rules_from_args(args.directory, args))
 
     if DRY_RUN:
         print("\n!!! 脚本当前处于 '试运行' 模式 (DRY_RUN = True)。")
@@ -0,0 +1,232 @@
+import os
+import sys
+import glob
+import json
+import argparse
+import collections
+from media_index_io import iter_media_index, read_index_meta # 索引读取（支持逐行格式）
+from media_model import natural_sort_key # 与扫描器相同的自然排序
+from media_publish import build_published_indexes, load_people_images, DETAILS_DIRNAME # 前端索引和详情包
+from search_index import SearchIndexBuilder, SEARCH_DIRNAME # 预先生成的倒排索引
+from entity_index import EntityIndexBuilder, ENTITY_DIRNAME # 人物 / 制片厂 / 类型 / 年份的反向索引
+from similar_index import SimilarIndexBuilder, SIMILAR_DIRNAME # 相似作品（MinHash / LSH）
+from nfo_cache import cache_summary # NFO 字段缓存
+from nfo_pipeline import NFO_PARSE_WORKERS
+
+# --- 配置信息 ---
+# 未指定输入文件时，合并脚本目录下的所有分片索引
+SHARD_INDEX_PATTERNS = ("media_index.shard-*.json", "media_index.shard-*.ndjson")
+# 合并结果：完整索引，以及前端使用的电影/剧集分开的索引
+MEDIA_INDEX_FILENAME = "media_index.json"
+MOVIES_INDEX_FILENAME = "movies_index.json"
+TVSHOWS_INDEX_FILENAME = "tvshows_index.json"
+# 人物头像映射（08generate_peoples_summary.py 生成），用于详情包中的演员头像
+PEOPLE_SUMMARY_FILE = "people_summary.json"
+
+def check_shard_coverage(index_paths):
+    """
+    根据分片索引的元信息检查分片是否齐全、是否重复。
+
+    Returns:
+        list: 警告信息列表，没有问题时为空。
+    """
+    warnings = []
+    hash_shards = collections.defaultdict(list)
+    top_dir_owners = collections.defaultdict(list)
+    for path in index_paths:
+        try:
+            shard = read_index_meta(path).get("shard")
+        except (IOError, json.JSONDecodeError):
+            continue
+        if not shard:
+            continue
+        if shard.get("count", 1) > 1:
+            hash_shards[(shard["count"], tuple(shard.get("top_dirs", [])))].append((shard["index"], path))
+        for top_dir in shard.get("top_dirs", []):
+            top_dir_owners[top_dir].append(path)
+
+    for (count, top_dirs), shards in hash_shards.items():
+        scope = f"（顶级目录: {', '.join(top_dirs)}）" if top_dirs else ""
+        indices = collections.Counter(index for index, _ in shards)
+        missing = sorted(set(range(count)) - set(indices))
+        if missing:
+            warnings.append(f"共 {count} 个分片{scope}，缺少分片: {', '.join(map(str, missing))}")
+        for index, n in sorted(indices.items()):
+            if n > 1:
+                paths = [path for i, path in shards if i == index]
+                warnings.append(f"分片 {index}/{count}{scope} 出现了 {n} 次: {', '.join(paths)}")
+    if not hash_shards:
+        for top_dir, paths in sorted(top_dir_owners.items()):
+            if len(paths) > 1:
+                warnings.append(f"顶级目录 '{top_dir}' 被多个分片扫描: {', '.join(paths)}")
+    return warnings
+
+def merge_media_indexes(index_paths, on_conflict="error"):
+    """
+    合并多个（分片）索引。
+
+    同一路径在多个输入中出现且条目完全相同时视为重复，只保留一份；
+    条目不同（文件列表不同或类型不同）时视为冲突，按 on_conflict 处理：
+    "error" 与 "first" 保留先读到的条目，"last" 保留后读到的条目。
+    输出按路径自然排序，结果与输入文件的读取顺序无关（冲突处理除外，输入按文件名排序）。
+
+    Returns:
+        tuple: (合并后的索引字典, 冲突列表 [(路径, 保留来源, 另一来源)], 重复条目数)
+    """
+    merged = {"movies": {}, "tv_shows": {}}
+    sources = {}
+    conflicts = []
+    duplicate_count = 0
+
+    for path in index_paths:
+        for media_type_key, media_entry in iter_media_index(path, follow=False):
+            media_path = media_entry["path"]
+            existing_key = next((key for key in merged if media_path in merged[key]), None)
+            if existing_key is None:
+                merged[media_type_key][media_path] = media_entry
+                sources[media_path] = path
+                continue
+            if existing_key == media_type_key and merged[existing_key][media_path] == media_entry:
+                duplicate_count += 1
+                continue
+            if on_conflict == "last":
+                conflicts.append((media_path, path, sources[media_path]))
+                del merged[existing_key][media_path]
+                merged[media_type_key][media_path] = media_entry
+                sources[media_path] = path
+            else:
+                conflicts.append((media_path, sources[media_path], path))
+
+    media_data = {}
+    for media_type_key, entries in merged.items():
+        sorted_paths = sorted(entries, key=lambda p: (natural_sort_key(p), p))
+        media_data[media_type_key] = [entries[p] for p in sorted_paths]
+    return media_data, conflicts, duplicate_count
+
+def write_json(data, output_path, compact=False):
+    try:
+        with open(output_path, 'w', encoding='utf-8') as f:
+            if compact:
+                json.dump(data, f, ensure_ascii=False, separators=(',', ':'))
+            else:
+                json.dump(data, f, ensure_ascii=False, indent=4)
+        print(f"已写入: {output_path}")
+    except IOError as e:
+        print(f"错误: 无法写入文件 {output_path}: {e}")
+
+if __name__ == "__main__":
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+
+    parser = argparse.ArgumentParser(description="合并 01index_copy_media.py 生成的分片索引。")
+    parser.add_argument('inputs', nargs='*',
+                        help="要合并的索引文件（.json 或 .ndjson）。默认为脚本目录下的 media_index.shard-*.json/.ndjson。")
+    parser.add_argument('--output-dir', default=script_dir, help="输出目录，默认为脚本目录。")
+    parser.add_argument('--on-conflict', choices=("error", "first", "last"), default="error",
+                        help="同一路径在不同分片中条目不一致时的处理方式：error（报告并不写出结果，默认）、"
+                             "first（保留先读到的）、last（保留后读到的）。")
+    parser.add_argument('--base-path', default='.',
+                        help="索引中的路径相对的媒体库根目录（用于读取 NFO），默认为当前目录。")
+    parser.add_argument('--no-metadata', action='store_true',
+                        help="不读取 NFO，前端索引中不嵌入元数据（前端需要自行构建搜索索引），也不生成详情包、倒排索引、反向索引和相似作品。")
+    parser.add_argument('--no-details', action='store_true',
+                        help=f"不生成详情包（输出目录下的 {DETAILS_DIRNAME}/，前端打开详情时改为逐个请求 NFO）。")
+    parser.add_argument('--no-search-index', action='store_true',
+                        help=f"不生成倒排索引（输出目录下的 {SEARCH_DIRNAME}/，前端改为逐个比较标题和元数据）。")
+    parser.add_argument('--no-entity-index', action='store_true',
+                        help=f"不生成人物 / 制片厂 / 类型 / 年份的反向索引（输出目录下的 {ENTITY_DIRNAME}/）。")
+    parser.add_argument('--no-similar', action='store_true',
+                        help=f"不计算相似作品（输出目录下的 {SIMILAR_DIRNAME}/）。")
+    parser.add_argument('--people-summary', default=PEOPLE_SUMMARY_FILE,
+                        help=f"人物头像映射，用于详情包中的演员头像，默认 {PEOPLE_SUMMARY_FILE}。")
+    parser.add_argument('--workers', type=int, default=NFO_PARSE_WORKERS,
+                        help=f"解析 NFO 的进程数，默认 {NFO_PARSE_WORKERS}（CPU 核数）。")
+    args = parser.parse_args()
+
+    input_paths = args.inputs
+    if not input_paths:
+        input_paths = [p for pattern in SHARD_INDEX_PATTERNS for p in glob.glob(os.path.join(script_dir, pattern))]
+    # 按文件名排序，保证合并结果可复现
+    input_paths = sorted(set(input_paths))
+    if not input_paths:
+        print("错误: 没有找到要合并的索引文件。")
+        sys.exit(1)
+
+    print(f"合并 {len(input_paths)} 个索引:")
+    for path in input_paths:
+        print(f"  {path}")
+
+    for warning in check_shard_coverage(input_paths):
+        print(f"警告: {warning}")
+
+    try:
+        media_data, conflicts, duplicate_count = merge_media_indexes(input_paths, args.on_conflict)
+    except FileNotFoundError as e:
+        print(f"错误: 文件未找到 {e.filename}")
+        sys.exit(1)
+    except json.JSONDecodeError as e:
+        print(f"错误: 索引文件格式不正确: {e}")
+        sys.exit(1)
+
+    if duplicate_count:
+        print(f"信息: {duplicate_count} 个条目在多个索引中重复出现且内容一致，已去重。")
+    if conflicts:
+        print(f"\n发现 {len(conflicts)} 个冲突（同一路径的条目不一致）:")
+        for media_path, kept_source, other_source in conflicts:
+            print(f"  {media_path}\n    保留: {kept_source}\n    丢弃: {other_source}")
+        if args.on_conflict == "error":
+            print("\n未写出合并结果。请检查分片是否重叠，或使用 --on-conflict first/last。")
+            sys.exit(1)
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    write_json(media_data, os.path.join(args.output_dir, MEDIA_INDEX_FILENAME))
+    if args.no_metadata:
+        write_json({"movies": media_data["movies"]}, os.path.join(args.output_dir, MOVIES_INDEX_FILENAME))
+        write_json({"tv_shows": media_data["tv_shows"]}, os.path.join(args.output_dir, TVSHOWS_INDEX_FILENAME))
+    else:
+        # 前端索引嵌入每个项目的 NFO 元数据，浏览器一次下载即可搜索演员 / 制片厂 / 类型，不必逐个请求 NFO；
+        # 详情包包含详情页的全部内容（含剧集的每一集），打开详情时只需一次请求。文件由浏览器下载，不缩进
+        details_dir = None if args.no_details else os.path.join(args.output_dir, DETAILS_DIRNAME)
+        people_images = load_people_images(args.people_summary) if details_dir else None
+        search_builder = None if args.no_search_index else SearchIndexBuilder()
+        entity_builder = None if args.no_entity_index else EntityIndexBuilder()
+        similar_builder = None if args.no_similar else SimilarIndexBuilder()
+        index_builders = [builder for builder in (search_builder, entity_builder, similar_builder) if builder is not None]
+        print("\n正在读取 NFO...")
+        movies_index, tvshows_index, stats = build_published_indexes(
+            media_data, args.base_path, args.workers, progress=True,
+            details_dir=details_dir, people_images=people_images, index_builders=index_builders)
+        print(f"\n{stats['items']} 个项目中 {stats['with_nfo']} 个已嵌入元数据"
+              f"（NFO 不存在 {stats['missing']}，无法解析 {stats['errors']}）。")
+        if details_dir:
+            print(f"详情包: 写入 {stats['details_written']}，未变化 {stats['details_unchanged']}，"
+                  f"删除 {stats['details_removed']}（{details_dir}）。")
+        if search_builder is not None:
+            # 倒排索引：标题、简介、演员、导演、制片厂的词元 -> 项目 ID，按词元前缀分片，前端只加载查询用到的分片
+            search_dir = os.path.join(args.output_dir, SEARCH_DIRNAME)
+            search_stats = search_builder.write(search_dir)
+            print(f"倒排索引: {search_stats['tokens']} 个词元，{search_stats['shards']} 个分片"
+                  f"（写入 {search_stats['written']}，未变化 {search_stats['unchanged']}，"
+                  f"删除 {search_stats['removed']}；{search_dir}）。")
+        if entity_builder is not None:
+            # 反向索引：人物（含角色）/ 制片厂 / 类型 / 年份 -> 项目 ID，附带数量，人物页和分类统计无需扫描全部项目
+            entity_dir = os.path.join(args.output_dir, ENTITY_DIRNAME)
+            entity_stats = entity_builder.write(entity_dir)
+            print(f"反向索引: 人物 {entity_stats['people']}，制片厂 {entity_stats['studios']}，"
+                  f"类型 {entity_stats['genres']}，年份 {entity_stats['years']}"
+                  f"（写入 {entity_stats['written']}，未变化 {entity_stats['unchanged']}，"
+                  f"删除 {entity_stats['removed']}；{entity_dir}）。")
+        if similar_builder is not None:
+            # 相似作品：按演员 / 导演 / 类型 / 制片厂集合的 MinHash 签名分桶，只比较候选对
+            similar_dir = os.path.join(args.output_dir, SIMILAR_DIRNAME)
+            similar_stats = similar_builder.write(similar_dir)
+            print(f"相似作品: {similar_stats['with_similar']}/{similar_stats['items']} 个项目有相似作品"
+                  f"（{similar_stats['shards']} 个分片，写入 {similar_stats['written']}，"
+                  f"未变化 {similar_stats['unchanged']}，删除 {similar_stats['removed']}；{similar_dir}）。")
+        if cache_summary():
+            print(cache_summary())
+        write_json(movies_index, os.path.join(args.output_dir, MOVIES_INDEX_FILENAME), compact=True)
+        write_json(tvshows_index, os.path.join(args.output_dir, TVSHOWS_INDEX_FILENAME), compact=True)
+
+    print(f"\n--- 合并结果摘要 ---")
+    print(f"电影数量: {len(media_data['movies'])}")
+    print(f"剧集数量: {len(media_data['tv_shows'])}")
@@ -0,0 +1,89 @@
+import os
+import sys
+import json
+import argparse
+import fs_trace # 文件系统操作耗时追踪
+from media_index_io import find_media_index # 索引读取（支持逐行格式）
+from nfo_cache import cache_summary # NFO 字段缓存
+from nfo_pipeline import collect_nfo_paths, scan_nfo_files, write_nfo_warnings, write_missing_report, NFO_PARSE_WORKERS
+
+# --- 配置信息 ---
+MEDIA_INDEX_FILE = 'media_index.json'
+# 扫描结果：人物列表、制片厂列表、类型、合集和标题
+METADATA_OUTPUT_FILE = 'nfo_metadata.json'
+# 缺失报告（格式与 13find_miss_people.py / 14find_miss_studios.py 相同，供 15/16 读取）
+# 对应的汇总文件不存在时跳过该报告
+PEOPLE_SUMMARY_FILE = 'people_summary.json'
+PEOPLE_REPORT_FILE = 'report_people.txt'
+STUDIOS_SUMMARY_FILE = 'studios_summary.json'
+STUDIOS_REPORT_FILE = 'report_studios.txt'
+
+def load_summary_names(summary_file):
+    """读取汇总文件中的名称集合；文件不存在或无法解析时返回 None。"""
+    try:
+        with open(summary_file, 'r', encoding='utf-8') as f:
+            return set(json.load(f).keys())
+    except FileNotFoundError:
+        print(f"提示: 未找到 {summary_file}，跳过对应的缺失报告。")
+    except json.JSONDecodeError as e:
+        print(f"错误: 无法解析 {summary_file}: {e}，跳过对应的缺失报告。")
+    return None
+
+def write_report(report_file, label, found_names, summary_file, metadata, verbose):
+    existing_names = load_summary_names(summary_file)
+    if existing_names is None:
+        return
+    with open(report_file, 'w', encoding='utf-8') as f_report:
+        print(f"Scanning {metadata.nfo_count} NFO files for {label}...", file=f_report)
+        if verbose:
+            write_nfo_warnings(metadata, f_report)
+        print("NFO scanning complete.", file=f_report)
+        write_missing_report(f_report, label, found_names, existing_names, summary_file, report_file)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="一次读取所有 NFO，同时生成人物 / 制片厂 / 类型 / 合集 / 标题列表和缺失人物、缺失制片厂报告。")
+    parser.add_argument('--index', default=MEDIA_INDEX_FILE, help=f"媒体索引文件，默认 {MEDIA_INDEX_FILE}。")
+    parser.add_argument('--base-path', default='.', help="索引中的路径相对的媒体库根目录，默认为当前目录。")
+    parser.add_argument('--output', default=METADATA_OUTPUT_FILE, help=f"扫描结果 JSON，默认 {METADATA_OUTPUT_FILE}。")
+    parser.add_argument('--workers', type=int, default=NFO_PARSE_WORKERS,
+                        help=f"解析 NFO 的进程数，默认 {NFO_PARSE_WORKERS}（CPU 核数）。")
+    parser.add_argument('--no-reports', action='store_true', help="不生成缺失人物 / 缺失制片厂报告。")
+    parser.add_argument('--verbose-warnings', action='store_true', help="在缺失报告中包含不存在或无法解析的 NFO。")
+    fs_trace.add_trace_arguments(parser)
+    args = parser.parse_args()
+    fs_trace.configure_from_args(args, args.base_path)
+
+    index_path = find_media_index(args.index)
+    print("--- 正在收集NFO路径 ---")
+    try:
+        nfo_paths = collect_nfo_paths(index_path, args.base_path)
+    except FileNotFoundError:
+        print(f"错误: 索引文件 '{index_path}' 不存在。")
+        sys.exit(1)
+    except json.JSONDecodeError as e:
+        print(f"错误: 无法解析索引文件 '{index_path}': {e}")
+        sys.exit(1)
+
+    print(f"正在扫描 {len(nfo_paths)} 个NFO文件...")
+    metadata = scan_nfo_files(nfo_paths, progress=True, workers=args.workers)
+    print("\nNFO 扫描完成。")
+    if cache_summary():
+        print(cache_summary())
+    print(f"人物 {len(metadata.actors)}，制片厂 {len(metadata.studios)}，类型 {len(metadata.genres)}，"
+          f"合集 {len(metadata.sets)}，标题 {len(metadata.titles)}；"
+          f"不存在 {len(metadata.missing)}，无法解析 {len(metadata.errors)}。")
+
+    try:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(metadata.to_dict(), f, ensure_ascii=False, indent=4)
+        print(f"扫描结果已保存到: {os.path.abspath(args.output)}")
+    except IOError as e:
+        print(f"错误: 无法写入文件 {args.output}: {e}")
+        sys.exit(1)
+
+    if not args.no_reports:
+        write_report(PEOPLE_REPORT_FILE, "people", metadata.actor_names(), PEOPLE_SUMMARY_FILE,
+                     metadata, args.verbose_warnings)
+        write_report(STUDIOS_REPORT_FILE, "studios", metadata.studios, STUDIOS_SUMMARY_FILE,
+                     metadata, args.verbose_warnings)
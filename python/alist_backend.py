@@ -0,0 +1,138 @@
+import os
+import time
+import threading
+import posixpath
+from datetime import datetime
+
+import requests
+
+from media_walker import DirListing
+
+# --- 配置信息 ---
+# AList 令牌，也可以通过命令行参数传入（服务地址由调用方传入，01index_copy_media.py 读取 MEDIAHUB_ALIST_URL）
+ALIST_TOKEN = os.environ.get("MEDIAHUB_ALIST_TOKEN", "")
+# fs/list 每页返回的条目数。AList 对 per_page=0 的处理因版本和存储驱动而异，这里显式分页
+ALIST_PAGE_SIZE = 500
+ALIST_TIMEOUT = 30
+# 单个请求失败（网络错误或 5xx）时的重试次数
+ALIST_RETRIES = 3
+ALIST_RETRY_DELAY = 1.0
+
+class AListError(OSError):
+    """AList 接口返回错误。继承 OSError，media_walker.walk 会像处理本地列目录失败一样处理它。"""
+
+def _parse_modified(value):
+    """把 AList 返回的 ISO 8601 时间转换为时间戳，无法解析时返回 None。"""
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value.replace('Z', '+00:00')).timestamp()
+    except ValueError:
+        return None
+
+class AListLister:
+    """
+    通过 AList 的 /api/fs/list 接口列目录，可作为 media_walker.walk 的 lister。
+
+    walk 产出的仍是本地风格的路径：本地根目录 local_root 对应远端的 remote_root，
+    扫描器的相对路径计算和识别逻辑因此完全不变。每次请求可以取回一整页条目的
+    名称、大小和修改时间，避免经由 FUSE/WebDAV 挂载时逐个 stat 带来的大量往返。
+
+    walk 在线程池中并发调用本对象；每个线程使用独立的 requests.Session 以复用连接。
+    """
+
+    def __init__(self, base_url, remote_root="/", local_root=None, token=None, password="",
+                 page_size=ALIST_PAGE_SIZE, timeout=ALIST_TIMEOUT, refresh=False):
+        self.api_url = base_url.rstrip('/') + "/api/fs/list"
+        # io_throttle 按该键为同一 AList 服务共享一个调度器
+        self.throttle_key = base_url.rstrip('/')
+        self.remote_root = '/' + remote_root.strip('/')
+        self.local_root = os.path.abspath(local_root if local_root is not None else self.remote_root)
+        self.token = ALIST_TOKEN if token is None else token
+        self.password = password
+        self.page_size = page_size
+        self.timeout = timeout
+        self.refresh = refresh
+        self._local = threading.local()
+        self.request_count = 0
+        self._count_lock = threading.Lock()
+
+    def _session(self):
+        session = getattr(self._local, "session", None)
+        if session is None:
+            session = requests.Session()
+            if self.token:
+                session.headers["Authorization"] = self.token
+            self._local.session = session
+        return session
+
+    def remote_path(self, path):
+        """把 walk 产出的本地路径转换为 AList 中的路径。"""
+        rel = os.path.relpath(os.path.abspath(path), self.local_root)
+        if rel == '.':
+            return self.remote_root
+        return posixpath.join(self.remote_root, rel.replace(os.sep, '/'))
+
+    def _post(self, payload):
+        last_error = None
+        for attempt in range(ALIST_RETRIES + 1):
+            if attempt:
+                time.sleep(ALIST_RETRY_DELAY * attempt)
+            try:
+                response = self._session().post(self.api_url, json=payload, timeout=self.timeout)
+            except requests.exceptions.RequestException as e:
+                last_error = e
+                continue
+            with self._count_lock:
+                self.request_count += 1
+            if response.status_code >= 500:
+                last_error = f"HTTP {response.status_code}"
+                continue
+            try:
+                result = response.json()
+            except ValueError:
+                raise AListError(f"AList 返回了无效的响应（HTTP {response.status_code}）：{payload['path']}")
+            if result.get("code") != 200:
+                raise AListError(f"AList 列目录失败 '{payload['path']}'：{result.get('message')}")
+            return result.get("data") or {}
+        raise AListError(f"AList 请求失败 '{payload['path']}'：{last_error}")
+
+    def list_remote(self, remote_path):
+        """
+        列出一个远端目录的全部条目（自动翻页）。
+
+        Returns:
+            list: AList 返回的条目字典列表（包含 name、is_dir、size、modified 等字段）。
+        """
+        entries = []
+        page = 1
+        while True:
+            data = self._post({
+                "path": remote_path,
+                "password": self.password,
+                "page": page,
+                "per_page": self.page_size,
+                "refresh": self.refresh,
+            })
+            content = data.get("content") or []
+            entries.extend(content)
+            total = data.get("total", 0)
+            if not content or len(entries) >= total:
+                return entries
+            page += 1
+
+    def __call__(self, path):
+        dirnames = []
+        filenames = []
+        meta = {}
+        for entry in self.list_remote(self.remote_path(path)):
+            name = entry.get("name")
+            if not name:
+                continue
+            if entry.get("is_dir"):
+                dirnames.append(name)
+            else:
+                filenames.append(name)
+            meta[name] = (entry.get("size", 0), _parse_modified(entry.get("modified")))
+        # AList 中没有符号链接
+        return DirListing(dirnames, filenames, set(), meta)
@@ -0,0 +1,235 @@
+import os
+import sys
+import json
+import shutil
+import argparse
+import tempfile
+import threading
+from datetime import datetime, timezone
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+# 让检查能导入 python/ 目录下的辅助模块
+SCRIPTS_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, SCRIPTS_DIR)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+# --- 配置信息 ---
+# 替身服务默认监听的地址
+STANDIN_HOST = "127.0.0.1"
+STANDIN_PORT = 5244
+# 检查时使用的令牌、每页条目数（取小值，保证大部分目录都要翻页）和注入的失败次数
+CHECK_TOKEN = "standin-token"
+CHECK_PAGE_SIZE = 3
+CHECK_FAILURES_PER_PATH = 1
+CHECK_SCALE = 60
+
+class AListStandIn:
+    """
+    AList /api/fs/list 接口的本地替身：把本地目录 root 按 AList 的响应格式提供出来，用于在没有 AList 服务时
+    检查 alist_backend.AListLister。
+
+    - 分页：按 page / per_page 返回，per_page 为 0 时返回全部条目，"total" 为目录中的条目总数；
+    - 鉴权：指定 token 时，Authorization 头不一致的请求返回 {"code": 401}（与 AList 相同，HTTP 状态码仍为 200）；
+    - 故障注入：每个路径的前 failures_per_path 次请求返回 HTTP 503，用于检查重试；
+    - 不存在的路径返回 {"code": 500, "message": "object not found"}。
+    """
+
+    def __init__(self, root, host=STANDIN_HOST, port=0, token="", failures_per_path=0):
+        self.root = os.path.abspath(root)
+        self.token = token
+        self.failures_per_path = failures_per_path
+        self.request_count = 0
+        self.failures = {}
+        self.lock = threading.Lock()
+        self.server = ThreadingHTTPServer((host, port), self._handler_class())
+        self.server.daemon_threads = True
+        self.thread = None
+
+    @property
+    def url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def _handler_class(self):
+        standin = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # 响应头和响应体分两次写出，保持连接时 Nagle 算法会让每个请求多等约 40ms
+            disable_nagle_algorithm = True
+
+            def log_message(self, format, *args):
+                pass
+
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+                if self.path != "/api/fs/list":
+                    self._send(404, {"code": 404, "message": "not found"})
+                    return
+                status, result = standin.handle_list(json.loads(body or b"{}"), self.headers.get('Authorization', ''))
+                self._send(status, result)
+
+            def _send(self, status, result):
+                data = json.dumps(result, ensure_ascii=False).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json; charset=utf-8')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+        return Handler
+
+    def handle_list(self, payload, authorization):
+        """处理一次 fs/list 请求，返回 (HTTP 状态码, 响应 JSON)。"""
+        remote_path = payload.get("path", "/")
+        with self.lock:
+            self.request_count += 1
+            failed = self.failures.get(remote_path, 0)
+            if failed < self.failures_per_path:
+                self.failures[remote_path] = failed + 1
+                return 503, {"code": 503, "message": "injected failure"}
+
+        if self.token and authorization != self.token:
+            return 200, {"code": 401, "message": "token is invalidated", "data": None}
+        local_path = os.path.join(self.root, *[part for part in remote_path.split('/') if part])
+        if not os.path.isdir(local_path):
+            return 200, {"code": 500, "message": "object not found", "data": None}
+
+        names = sorted(os.listdir(local_path))
+        page = max(1, int(payload.get("page") or 1))
+        per_page = int(payload.get("per_page") or 0) or len(names) or 1
+        content = []
+        for name in names[(page - 1) * per_page:page * per_page]:
+            st = os.stat(os.path.join(local_path, name))
+            content.append({
+                "name": name,
+                "is_dir": os.path.isdir(os.path.join(local_path, name)),
+                "size": 0 if os.path.isdir(os.path.join(local_path, name)) else st.st_size,
+                "modified": datetime.fromtimestamp(st.st_mtime, timezone.utc).isoformat().replace('+00:00', 'Z'),
+            })
+        # 与 AList 一样，空页的 content 为 null
+        return 200, {"code": 200, "message": "success", "data": {"content": content or None, "total": len(names)}}
+
+    def start(self):
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+def _local_tree(root):
+    """本地目录树：{相对路径: (子目录, 文件)}，用于和经由替身服务遍历的结果比较。"""
+    tree = {}
+    for dirpath, dirnames, filenames in os.walk(root):
+        tree[os.path.relpath(dirpath, root)] = (sorted(dirnames), sorted(filenames))
+    return tree
+
+def run_check(root=None, scale=CHECK_SCALE):
+    """
+    用替身服务检查 AListLister：分页遍历整棵目录树、5xx 重试、令牌错误和不存在的路径。
+    未指定 root 时生成一个 scale 个媒体项目的假媒体库。
+
+    Returns:
+        list: 失败项的说明，全部通过时为空列表。
+    """
+    import alist_backend
+    from alist_backend import AListLister, AListError
+    from media_walker import walk
+
+    # 检查重试逻辑本身，不需要真的等待
+    alist_backend.ALIST_RETRY_DELAY = 0
+    failures = []
+    temp_dir = None
+    if root is None:
+        from make_fixture import generate_fixture
+        temp_dir = tempfile.mkdtemp(prefix="alist_standin_")
+        root = os.path.join(temp_dir, "library")
+        generate_fixture(root, scale)
+
+    try:
+        expected = _local_tree(root)
+        with AListStandIn(root, token=CHECK_TOKEN, failures_per_path=CHECK_FAILURES_PER_PATH) as standin:
+            # 1. 分页 + 重试：每个目录的第一次请求都返回 503
+            local_root = os.path.abspath("standin-root")
+            lister = AListLister(standin.url, remote_root="/", local_root=local_root,
+                                 token=CHECK_TOKEN, page_size=CHECK_PAGE_SIZE)
+            errors = []
+            walked = {}
+            for dirpath, dirnames, filenames in walk(local_root, lister=lister, onerror=errors.append, throttle=False):
+                walked[os.path.relpath(dirpath, local_root)] = (sorted(dirnames), sorted(filenames))
+            if errors:
+                failures.append(f"遍历时出现错误: {errors[0]}")
+            if walked != expected:
+                missing = sorted(set(expected) - set(walked))[:3]
+                failures.append(f"遍历结果与本地目录树不一致（{len(walked)}/{len(expected)} 个目录，例如缺少 {missing}）")
+            paged = sum(1 for dirnames, filenames in expected.values() if len(dirnames) + len(filenames) > CHECK_PAGE_SIZE)
+            if paged == 0:
+                failures.append("目录树中没有需要翻页的目录，分页未被检查")
+            print(f"遍历: {len(walked)} 个目录（{paged} 个需要翻页），AList 请求 {lister.request_count} 次，"
+                  f"替身服务收到 {standin.request_count} 次（含注入的 503）。")
+
+            # 2. 令牌错误：不重试，直接以 AListError 报告
+            bad_lister = AListLister(standin.url, remote_root="/", local_root=local_root, token="wrong-token")
+            try:
+                bad_lister(local_root)
+                failures.append("令牌错误时没有抛出 AListError")
+            except AListError as e:
+                print(f"令牌错误: {e}")
+
+            # 3. 不存在的路径
+            try:
+                lister(os.path.join(local_root, "no-such-dir"))
+                failures.append("不存在的路径没有抛出 AListError")
+            except AListError as e:
+                print(f"不存在的路径: {e}")
+
+        # 4. 重试次数用尽：每个路径都失败超过 ALIST_RETRIES 次
+        with AListStandIn(root, failures_per_path=alist_backend.ALIST_RETRIES + 1) as standin:
+            lister = AListLister(standin.url, remote_root="/", local_root=os.path.abspath("standin-root"), token="")
+            try:
+                lister(lister.local_root)
+                failures.append("重试次数用尽时没有抛出 AListError")
+            except AListError as e:
+                print(f"重试用尽: {e}")
+    finally:
+        if temp_dir:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+    return failures
+
+def main():
+    parser = argparse.ArgumentParser(description="AList fs/list 接口的本地替身服务，以及基于它的 AListLister 检查。")
+    parser.add_argument('root', nargs='?', help="要提供的本地目录；--check 时不提供则生成假媒体库。")
+    parser.add_argument('--check', action='store_true', help="启动替身服务并检查 AListLister（分页、重试、鉴权错误），失败时退出码为 1。")
+    parser.add_argument('--port', type=int, default=STANDIN_PORT, help=f"服务模式的监听端口，默认 {STANDIN_PORT}。")
+    parser.add_argument('--token', default="", help="服务模式下要求的令牌，默认不检查。")
+    parser.add_argument('--failures', type=int, default=0, help="服务模式下每个路径前几次请求返回 503。")
+    args = parser.parse_args()
+
+    if args.check:
+        failures = run_check(args.root)
+        for failure in failures:
+            print(f"失败: {failure}")
+        print("检查通过。" if not failures else f"检查失败（{len(failures)} 项）。")
+        sys.exit(1 if failures else 0)
+
+    if not args.root:
+        parser.error("服务模式需要指定要提供的目录。")
+    standin = AListStandIn(args.root, port=args.port, token=args.token, failures_per_path=args.failures)
+    print(f"AList 替身服务: {standin.url}，目录 {standin.root}（Ctrl+C 退出）")
+    try:
+        standin.server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        standin.server.server_close()
+
+if __name__ == "__main__":
+    main()
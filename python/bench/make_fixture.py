@@ -0,0 +1,220 @@
+import os
+import sys
+import json
+import random
+import argparse
+
+# --- 配置信息 ---
+# 预设规模：媒体项目（电影 + 剧集）数量
+SCALES = {"1k": 1000, "10k": 10000, "100k": 100000}
+# 剧集在媒体项目中所占比例
+TV_SHOW_RATIO = 0.3
+# 以 GBK 编码写出的 NFO 比例（老的刮削器/手工编辑的 NFO 常见）
+GBK_NFO_RATIO = 0.05
+# XML 格式错误的 NFO 比例（截断、未转义的 &、标签不匹配）
+MALFORMED_NFO_RATIO = 0.02
+# 不属于任何媒体项目的杂项目录比例
+MISC_DIR_RATIO = 0.02
+# 所有生成文件的修改时间，保证同一参数生成的目录树完全一致（包括增量扫描快照的行为）
+FIXTURE_MTIME = 1577836800 # 2020-01-01 00:00:00 UTC
+# 记录生成参数的清单文件，写在目录树根目录
+MANIFEST_FILENAME = ".bench_fixture.json"
+
+# 生成的是占位文件，图片内容不是有效图片（04resize_images.py 的基准自行生成图片）
+PLACEHOLDER_IMAGE = b"\xff\xd8\xff\xe0" + b"\0" * 60
+
+SURNAMES = ["王", "李", "张", "刘", "陈", "杨", "黄", "赵", "吴", "周", "徐", "孙", "马", "朱", "胡", "郭"]
+GIVEN_NAMES = ["伟", "芳", "娜", "秀英", "敏", "静", "丽", "强", "磊", "军", "洋", "勇", "艳", "杰", "娟", "涛"]
+WESTERN_NAMES = ["James", "Mary", "John", "Patricia", "Robert", "Jennifer", "Michael", "Linda", "David", "Emma"]
+WESTERN_SURNAMES = ["Smith", "Johnson", "Williams", "Brown", "Jones", "Garcia", "Miller", "Davis", "Wilson", "Moore"]
+STUDIOS = ["中国电影集团", "华谊兄弟", "光线传媒", "博纳影业", "Warner Bros.", "Paramount Pictures",
+           "Universal Pictures", "A24", "Studio Ghibli", "東宝", "TVB", "Netflix", "HBO", "BBC"]
+GENRES = ["剧情", "喜剧", "动作", "爱情", "科幻", "动画", "悬疑", "惊悚", "纪录片", "犯罪"]
+TITLE_WORDS = ["长夜", "星辰", "归途", "风暴", "迷城", "少年", "Echo", "Horizon", "Night", "River", "Shadow", "Garden"]
+CATEGORIES_MOVIE = ["电影", "动画电影", "纪录片"]
+CATEGORIES_TV = ["剧集", "动漫", "综艺"]
+
+def _person(rng):
+    if rng.random() < 0.6:
+        return rng.choice(SURNAMES) + rng.choice(GIVEN_NAMES)
+    return f"{rng.choice(WESTERN_NAMES)} {rng.choice(WESTERN_SURNAMES)}"
+
+def _title(rng, index):
+    return f"{rng.choice(TITLE_WORDS)}{rng.choice(TITLE_WORDS)} {index}"
+
+def _nfo_xml(rng, root_tag, title, actor_pool_size):
+    """生成 Kodi 风格的 NFO 文本。"""
+    lines = [f'<?xml version="1.0" encoding="utf-8" standalone="yes"?>', f"<{root_tag}>",
+             f"  <title>{title}</title>", f"  <plot>{title} 的剧情简介。</plot>",
+             f"  <year>{rng.randint(1960, 2024)}</year>", f"  <tmdbid>{rng.randint(1, 999999)}</tmdbid>"]
+    for genre in rng.sample(GENRES, rng.randint(1, 3)):
+        lines.append(f"  <genre>{genre}</genre>")
+    for studio in rng.sample(STUDIOS, rng.randint(0, 2)):
+        lines.append(f"  <studio>{studio}</studio>")
+    for _ in range(rng.randint(0, actor_pool_size)):
+        lines += ["  <actor>", f"    <name>{_person(rng)}</name>", "    <role>角色</role>",
+                  f"    <tmdbid>{rng.randint(1, 4000000)}</tmdbid>", "  </actor>"]
+    lines.append(f"</{root_tag}>")
+    return "\n".join(lines) + "\n"
+
+def _malform(rng, text):
+    """把合法的 NFO 文本改成几种常见的损坏形式之一。"""
+    kind = rng.randrange(3)
+    if kind == 0:
+        # 写入中断：文件被截断
+        return text[:len(text) // 2]
+    if kind == 1:
+        # 未转义的 &
+        return text.replace("<plot>", "<plot>Tom & Jerry ", 1)
+    # 标签不匹配
+    return text.replace("</title>", "</titel>", 1)
+
+class FixtureWriter:
+    """按确定的随机序列生成目录树，并统计生成的内容。"""
+
+    def __init__(self, root, seed):
+        self.root = root
+        self.rng = random.Random(seed)
+        self.counts = {"movies": 0, "tv_shows": 0, "misc_dirs": 0, "files": 0, "nfo": 0, "gbk_nfo": 0, "malformed_nfo": 0}
+
+    def _write(self, path, data):
+        with open(path, 'wb') as f:
+            f.write(data)
+        os.utime(path, (FIXTURE_MTIME, FIXTURE_MTIME))
+        self.counts["files"] += 1
+
+    def _write_nfo(self, path, text):
+        rng = self.rng
+        self.counts["nfo"] += 1
+        if rng.random() < MALFORMED_NFO_RATIO:
+            text = _malform(rng, text)
+            self.counts["malformed_nfo"] += 1
+        if rng.random() < GBK_NFO_RATIO:
+            # GBK 编码的 NFO 通常仍然带着 utf-8 的声明，或者干脆没有声明
+            text = text.split("\n", 1)[1] if rng.random() < 0.5 else text
+            self._write(path, text.encode('gbk', errors='replace'))
+            self.counts["gbk_nfo"] += 1
+        else:
+            self._write(path, text.encode('utf-8'))
+
+    def movie(self, category, index):
+        rng = self.rng
+        title = _title(rng, index)
+        item_dir = os.path.join(self.root, category, f"{title} ({rng.randint(1960, 2024)})")
+        os.makedirs(item_dir, exist_ok=True)
+        nfo_name = "movie.nfo" if rng.random() < 0.3 else f"{title}.nfo"
+        self._write_nfo(os.path.join(item_dir, nfo_name), _nfo_xml(rng, "movie", title, 12))
+        self._write(os.path.join(item_dir, f"{title}.strm"), f"http://127.0.0.1/media/{index}.mkv\n".encode())
+        for image in ("poster.jpg", "fanart.jpg", "landscape.jpg", "clearlogo.png", "disc.png")[:rng.randint(2, 5)]:
+            self._write(os.path.join(item_dir, image), PLACEHOLDER_IMAGE)
+        if rng.random() < 0.3:
+            self._write(os.path.join(item_dir, f"{title}.chs.ass"), b"[Script Info]\n")
+        if rng.random() < 0.2:
+            self._write(os.path.join(item_dir, f"{title}-mediainfo.json"), b"{}\n")
+        if rng.random() < 0.1:
+            extras = os.path.join(item_dir, "extras")
+            os.makedirs(extras, exist_ok=True)
+            self._write(os.path.join(extras, "trailer.strm"), b"http://127.0.0.1/trailer.mkv\n")
+        self.counts["movies"] += 1
+
+    def tv_show(self, category, index):
+        rng = self.rng
+        title = _title(rng, index)
+        item_dir = os.path.join(self.root, category, title)
+        os.makedirs(item_dir, exist_ok=True)
+        # 少数剧集没有 tvshow.nfo，只能通过 Season 目录识别
+        if rng.random() < 0.9:
+            self._write_nfo(os.path.join(item_dir, "tvshow.nfo"), _nfo_xml(rng, "tvshow", title, 15))
+        for image in ("poster.jpg", "fanart.jpg", "banner.jpg", "clearlogo.png")[:rng.randint(1, 4)]:
+            self._write(os.path.join(item_dir, image), PLACEHOLDER_IMAGE)
+        for season in range(1, rng.randint(1, 3) + 1):
+            season_dir = os.path.join(item_dir, f"Season {season}")
+            os.makedirs(season_dir, exist_ok=True)
+            self._write(os.path.join(item_dir, f"season{season:02d}-poster.jpg"), PLACEHOLDER_IMAGE)
+            if rng.random() < 0.5:
+                self._write_nfo(os.path.join(season_dir, "season.nfo"), _nfo_xml(rng, "season", f"{title} S{season}", 0))
+            for episode in range(1, rng.randint(2, 8) + 1):
+                name = f"{title} S{season:02d}E{episode:02d}"
+                self._write_nfo(os.path.join(season_dir, name + ".nfo"), _nfo_xml(rng, "episodedetails", name, 4))
+                self._write(os.path.join(season_dir, name + ".strm"), f"http://127.0.0.1/tv/{index}/{season}/{episode}.mkv\n".encode())
+                if rng.random() < 0.5:
+                    self._write(os.path.join(season_dir, name + "-thumb.jpg"), PLACEHOLDER_IMAGE)
+        self.counts["tv_shows"] += 1
+
+    def misc_dir(self, index):
+        """不是媒体项目的目录：扫描器应当遍历但不产出条目。"""
+        misc_dir = os.path.join(self.root, "杂项", f"资料 {index}", "子目录")
+        os.makedirs(misc_dir, exist_ok=True)
+        self._write(os.path.join(misc_dir, "readme.txt"), b"not media\n")
+        self._write(os.path.join(misc_dir, "folder.jpg"), PLACEHOLDER_IMAGE)
+        self.counts["misc_dirs"] += 1
+
+    def people_dir(self, count):
+        """演员头像目录（08generate_peoples_summary.py 的输入）。"""
+        for i in range(count):
+            person_dir = os.path.join(self.root, "People", f"{_person(self.rng)} {i}")
+            os.makedirs(person_dir, exist_ok=True)
+            self._write(os.path.join(person_dir, "folder.jpg"), PLACEHOLDER_IMAGE)
+
+def _pin_dir_mtimes(root):
+    """
+    把目录的修改时间也设为 FIXTURE_MTIME。目录在写入其中的文件时会被更新，
+    因此在全部文件写完后自底向上统一设置（设置子目录的时间不会改变父目录的时间）。
+    """
+    for dirpath, _, _ in os.walk(root, topdown=False):
+        os.utime(dirpath, (FIXTURE_MTIME, FIXTURE_MTIME))
+
+def generate_fixture(root, item_count, seed=0):
+    """
+    在 root 下生成包含 item_count 个媒体项目的假媒体库。同一 (item_count, seed) 生成的目录树完全相同。
+
+    Returns:
+        dict: 生成内容的统计（同时写入 root 下的清单文件）。
+    """
+    os.makedirs(root, exist_ok=True)
+    writer = FixtureWriter(root, seed)
+    rng = writer.rng
+    for index in range(item_count):
+        if rng.random() < TV_SHOW_RATIO:
+            writer.tv_show(rng.choice(CATEGORIES_TV), index)
+        else:
+            writer.movie(rng.choice(CATEGORIES_MOVIE), index)
+        if rng.random() < MISC_DIR_RATIO:
+            writer.misc_dir(index)
+    writer.people_dir(max(10, item_count // 20))
+
+    manifest = {"items": item_count, "seed": seed, **writer.counts}
+    with open(os.path.join(root, MANIFEST_FILENAME), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=4)
+    os.utime(os.path.join(root, MANIFEST_FILENAME), (FIXTURE_MTIME, FIXTURE_MTIME))
+    _pin_dir_mtimes(root)
+    return manifest
+
+def parse_scale(value):
+    """解析规模参数："1k"/"10k"/"100k" 或具体数字。"""
+    if value in SCALES:
+        return SCALES[value]
+    try:
+        count = int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"无效的规模 '{value}'，可选: {', '.join(SCALES)} 或正整数")
+    if count <= 0:
+        raise argparse.ArgumentTypeError("规模必须为正整数")
+    return count
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="生成用于基准测试的假媒体库（确定性，可复现）。")
+    parser.add_argument('output', help="输出目录（应为空目录或不存在）。")
+    parser.add_argument('--scale', type=parse_scale, default="1k",
+                        help="媒体项目数量：1k、10k、100k 或具体数字，默认 1k。")
+    parser.add_argument('--seed', type=int, default=0, help="随机种子，默认 0。")
+    args = parser.parse_args()
+
+    if os.path.isdir(args.output) and os.listdir(args.output):
+        print(f"错误: 输出目录 '{args.output}' 不为空。")
+        sys.exit(1)
+
+    print(f"正在生成 {args.scale} 个媒体项目到 '{args.output}' ...")
+    manifest = generate_fixture(args.output, args.scale, args.seed)
+    print(f"完成: 电影 {manifest['movies']}，剧集 {manifest['tv_shows']}，杂项目录 {manifest['misc_dirs']}，"
+          f"文件 {manifest['files']}（NFO {manifest['nfo']}，其中 GBK {manifest['gbk_nfo']}，格式错误 {manifest['malformed_nfo']}）")
@@ -0,0 +1,223 @@
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import statistics
+import contextlib
+import importlib.util
+
+# 让被测脚本能导入 python/ 目录下的辅助模块
+SCRIPTS_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, SCRIPTS_DIR)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+# 解析器基准测量的是解析本身：不使用 NFO 缓存（缓存单独测量，见 bench_nfo_cache）
+os.environ["MEDIAHUB_NFO_CACHE"] = ""
+
+from make_fixture import generate_fixture, parse_scale # 假媒体库生成
+
+# --- 配置信息 ---
+# 每个基准重复运行的次数，报告最小值和中位数
+DEFAULT_REPEAT = 3
+# 与基线比较时允许的变慢比例，超出即视为性能回退
+DEFAULT_TOLERANCE = 0.2
+# 04resize_images.py 基准生成的图片数量和尺寸
+RESIZE_IMAGE_COUNT = 50
+RESIZE_IMAGE_SIZE = (1280, 720)
+
+def load_script(filename):
+    """
+    按文件名加载编号脚本（例如 "02get_people_path.py"）。编号开头的文件名不能直接 import。
+    """
+    module_name = "bench_" + os.path.splitext(filename)[0]
+    spec = importlib.util.spec_from_file_location(module_name, os.path.join(SCRIPTS_DIR, filename))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+def time_call(func, repeat, setup=None):
+    """
+    重复运行 func 并返回每次的耗时（秒）。被测函数的输出被丢弃，setup 的耗时不计入。
+    """
+    timings = []
+    result = None
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        with open(os.devnull, 'w', encoding='utf-8') as devnull, contextlib.redirect_stdout(devnull):
+            start = time.perf_counter()
+            result = func()
+            timings.append(time.perf_counter() - start)
+    return timings, result
+
+def _collect_nfo_paths(root):
+    nfo_paths = []
+    for dirpath, _, filenames in os.walk(root):
+        nfo_paths.extend(os.path.join(dirpath, name) for name in filenames if name.lower().endswith('.nfo'))
+    nfo_paths.sort()
+    return nfo_paths
+
+# --- 各项基准 ---
+# 每个基准函数接收 (fixture, repeat, workdir)，返回 [(名称, 耗时列表, 处理数量)]；
+# 依赖缺失时抛出 ImportError，该基准被跳过。
+
+def bench_scan(fixture, repeat, workdir):
+    scanner = load_script("01index_copy_media.py")
+    results = []
+    timings, media_data = time_call(lambda: scanner.scan_media_library_and_index(fixture), repeat)
+    item_count = len(media_data["movies"]) + len(media_data["tv_shows"])
+    results.append(("scan: full", timings, item_count))
+
+    # 增量扫描：先生成快照，再计时无变化时的重扫
+    snapshot_path = os.path.join(workdir, "scan.snapshot.json")
+    time_call(lambda: scanner.scan_media_library_and_index(fixture, snapshot_path=snapshot_path), 1)
+    timings, _ = time_call(lambda: scanner.scan_media_library_and_index(fixture, snapshot_path=snapshot_path), repeat)
+    results.append(("scan: incremental (unchanged)", timings, item_count))
+    return results
+
+def bench_nfo(fixture, repeat, workdir):
+    from nfo_reader import read_nfo_fields
+    from nfo_pipeline import scan_nfo_files
+    nfo_paths = _collect_nfo_paths(fixture)
+    results = []
+    timings, _ = time_call(lambda: [read_nfo_fields(path) for path in nfo_paths], repeat)
+    results.append(("nfo: read_nfo_fields", timings, len(nfo_paths)))
+    # 02/03/13/14/18 共用的单次扫描：解析并汇总演员、制片厂、类型、合集和标题
+    timings, _ = time_call(lambda: scan_nfo_files(nfo_paths, workers=1), repeat)
+    results.append(("nfo: scan_nfo_files (1 process)", timings, len(nfo_paths)))
+    # 进程池并行解析（进程数为 CPU 核数）
+    timings, _ = time_call(lambda: scan_nfo_files(nfo_paths), repeat)
+    results.append(("nfo: scan_nfo_files (process pool)", timings, len(nfo_paths)))
+    return results
+
+def bench_nfo_cache(fixture, repeat, workdir):
+    from nfo_cache import NfoCache
+    nfo_paths = _collect_nfo_paths(fixture)
+    cache_path = os.path.join(workdir, "nfo_cache.sqlite3")
+
+    def remove_cache():
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(cache_path + suffix):
+                os.remove(cache_path + suffix)
+
+    def read_all():
+        cache = NfoCache(cache_path)
+        try:
+            for path in nfo_paths:
+                cache.read(path)
+        finally:
+            cache.close()
+
+    results = []
+    timings, _ = time_call(read_all, repeat, setup=remove_cache)
+    results.append(("nfo-cache: cold", timings, len(nfo_paths)))
+    timings, _ = time_call(read_all, repeat)
+    results.append(("nfo-cache: warm", timings, len(nfo_paths)))
+    return results
+
+def bench_images(fixture, repeat, workdir):
+    results = []
+    find_jpgs = load_script("06find_jpgs.py")
+    timings, _ = time_call(lambda: find_jpgs.find_and_count_and_filter_jpg_filenames(fixture), repeat)
+    results.append(("images: 06 find_jpgs", timings, None))
+
+    find_other = load_script("11find_other_img.py")
+    timings, _ = time_call(lambda: find_other.find_most_common_non_jpg_images(fixture), repeat)
+    results.append(("images: 11 find_other_img", timings, None))
+
+    people_summary = load_script("08generate_peoples_summary.py")
+    timings, path_map = time_call(lambda: people_summary.create_path_map(os.path.join(fixture, "People")), repeat)
+    results.append(("images: 08 create_path_map", timings, len(path_map)))
+
+    # 04resize_images.py 会覆盖原图：在临时目录中生成真实图片，每轮重新生成
+    try:
+        resize = load_script("04resize_images.py")
+        from PIL import Image
+    except ImportError as e:
+        print(f"  跳过 04resize_images.py: {e}")
+        return results
+    image_dir = os.path.join(workdir, "resize")
+    source = Image.new("RGB", RESIZE_IMAGE_SIZE, (40, 90, 160))
+
+    def setup():
+        shutil.rmtree(image_dir, ignore_errors=True)
+        os.makedirs(image_dir)
+        for i in range(RESIZE_IMAGE_COUNT):
+            source.save(os.path.join(image_dir, f"{i}-landscape.jpg"), "JPEG")
+
+    def run():
+        for name in os.listdir(image_dir):
+            resize.compress_image(os.path.join(image_dir, name), resize.TARGET_HEIGHT)
+
+    timings, _ = time_call(run, repeat, setup=setup)
+    results.append(("images: 04 compress_image", timings, RESIZE_IMAGE_COUNT))
+    return results
+
+BENCHMARKS = {"scan": bench_scan, "nfo": bench_nfo, "nfo-cache": bench_nfo_cache, "images": bench_images}
+
+def compare_with_baseline(results, baseline, tolerance):
+    """
+    与基线结果比较（按最小耗时），返回变慢超过 tolerance 的基准列表 [(名称, 基线秒数, 当前秒数)]。
+    """
+    baseline_best = {entry["name"]: entry["best"] for entry in baseline.get("results", [])}
+    regressions = []
+    for entry in results:
+        old = baseline_best.get(entry["name"])
+        if old and entry["best"] > old * (1 + tolerance):
+            regressions.append((entry["name"], old, entry["best"]))
+    return regressions
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="对扫描器、NFO 解析和图片脚本运行基准测试。")
+    parser.add_argument('--fixture', help="已有的假媒体库目录（由 make_fixture.py 生成）。不提供时在临时目录中生成。")
+    parser.add_argument('--scale', type=parse_scale, default="1k", help="临时生成假媒体库时的规模：1k、10k、100k 或具体数字。")
+    parser.add_argument('--seed', type=int, default=0, help="临时生成假媒体库时的随机种子。")
+    parser.add_argument('--repeat', type=int, default=DEFAULT_REPEAT, help=f"每项重复次数，默认 {DEFAULT_REPEAT}。")
+    parser.add_argument('--only', nargs='+', choices=sorted(BENCHMARKS), help="只运行指定的基准组。")
+    parser.add_argument('--json', dest='json_output', help="把结果写入 JSON 文件（可作为之后的 --baseline）。")
+    parser.add_argument('--baseline', help="基线结果 JSON。有基准比基线慢超过 --tolerance 时以状态码 1 退出。")
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE,
+                        help=f"允许的变慢比例，默认 {DEFAULT_TOLERANCE}（即 20%%）。")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="mediahub-bench-") as workdir:
+        fixture = args.fixture
+        if fixture is None:
+            fixture = os.path.join(workdir, "library")
+            print(f"正在生成 {args.scale} 个媒体项目的假媒体库...")
+            start = time.perf_counter()
+            manifest = generate_fixture(fixture, args.scale, args.seed)
+            print(f"生成完成（{time.perf_counter() - start:.1f} 秒）: {manifest['files']} 个文件")
+        elif not os.path.isdir(fixture):
+            print(f"错误: 假媒体库目录 '{fixture}' 不存在。")
+            sys.exit(1)
+
+        results = []
+        for group in args.only or BENCHMARKS:
+            print(f"\n--- {group} ---")
+            for name, timings, count in BENCHMARKS[group](fixture, args.repeat, workdir):
+                best, median = min(timings), statistics.median(timings)
+                rate = f"  {count / best:,.0f}/秒" if count and best > 0 else ""
+                print(f"{name:<40} 最快 {best:8.3f} 秒  中位数 {median:8.3f} 秒{rate}")
+                results.append({"name": name, "best": best, "median": median, "timings": timings, "count": count})
+
+    report = {"fixture": args.fixture or f"generated:{args.scale}:{args.seed}", "repeat": args.repeat,
+              "python": sys.version.split()[0], "results": results}
+    if args.json_output:
+        with open(args.json_output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=4)
+        print(f"\n结果已保存到: {args.json_output}")
+
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = compare_with_baseline(results, baseline, args.tolerance)
+        if regressions:
+            print(f"\n性能回退（比基线慢超过 {args.tolerance:.0%}）:")
+            for name, old, new in regressions:
+                print(f"  {name}: {old:.3f} 秒 -> {new:.3f} 秒（{new / old - 1:+.0%}）")
+            sys.exit(1)
+        print(f"\n没有发现超过 {args.tolerance:.0%} 的性能回退。")
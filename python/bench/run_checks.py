@@ -0,0 +1,164 @@
+import os
+import sys
+import json
+import argparse
+import tempfile
+import contextlib
+import shutil
+
+# 让检查能导入 python/ 目录下的辅助模块
+SCRIPTS_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, SCRIPTS_DIR)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+# 检查的是各模块的行为：不读写 NFO 缓存
+os.environ["MEDIAHUB_NFO_CACHE"] = ""
+
+from make_fixture import generate_fixture # 假媒体库生成
+from run_bench import load_script # 加载编号脚本
+
+# --- 配置信息 ---
+# 检查使用的假媒体库规模
+CHECK_SCALE = 300
+# search-shard-size 检查使用的分片大小上限（字节）。检查用的假媒体库较小，用较小的上限让分组确实被拆分
+CHECK_SHARD_MAX_BYTES = 4 * 1024
+
+# --- 各项检查 ---
+# 每个检查函数接收生成的假媒体库根目录，返回失败项的说明列表（全部通过时为空列表）。
+
+def check_walker_unthrottled(fixture):
+    """未配置任何 I/O 限制时，media_walker.walk 不包装列目录函数，也不为任何目录查询挂载点。"""
+    import io_throttle
+    import media_walker
+
+    failures = []
+    saved = (io_throttle.DEFAULT_OPS_PER_SEC, io_throttle.DEFAULT_CONCURRENCY, dict(io_throttle.MOUNT_LIMITS),
+             io_throttle.throttle_for)
+    lookups = []
+
+    def counting_throttle_for(key):
+        lookups.append(key)
+        return saved[3](key)
+
+    listed = []
+
+    def lister(path):
+        listed.append(path)
+        return media_walker.scandir_listing(path)
+
+    try:
+        io_throttle.DEFAULT_OPS_PER_SEC = 0
+        io_throttle.DEFAULT_CONCURRENCY = 0
+        io_throttle.MOUNT_LIMITS.clear()
+        io_throttle.throttle_for = counting_throttle_for
+        for followlinks in (False, True):
+            lookups.clear()
+            listed.clear()
+            dir_count = sum(1 for _ in media_walker.walk(fixture, followlinks=followlinks, lister=lister))
+            if lookups:
+                failures.append(f"未配置限制时仍查询了 {len(lookups)} 次调度器（followlinks={followlinks}）")
+            if len(listed) != dir_count:
+                failures.append(f"列目录 {len(listed)} 次，产出 {dir_count} 个目录（followlinks={followlinks}）")
+
+        # 对照：配置了某个挂载点的限制后，每个目录都按其挂载点查询调度器
+        lookups.clear()
+        io_throttle.MOUNT_LIMITS["/nonexistent-mount"] = (5, 0)
+        io_throttle._registry.clear()
+        dir_count = sum(1 for _ in media_walker.walk(fixture, lister=lister))
+        if len(lookups) != dir_count:
+            failures.append(f"配置限制后查询调度器 {len(lookups)} 次，应为 {dir_count} 次")
+    finally:
+        (io_throttle.DEFAULT_OPS_PER_SEC, io_throttle.DEFAULT_CONCURRENCY, mount_limits,
+         io_throttle.throttle_for) = saved
+        io_throttle.MOUNT_LIMITS.clear()
+        io_throttle.MOUNT_LIMITS.update(mount_limits)
+        io_throttle._registry.clear()
+    return failures
+
+def check_search_shard_size(fixture):
+    """倒排索引的分片文件不超过 SEARCH_SHARD_MAX_BYTES（只含一个词元的分片除外），按清单范围查找的结果与完整倒排列表一致。"""
+    import search_index
+    from media_publish import build_published_indexes
+
+    failures = []
+    saved = search_index.SEARCH_SHARD_MAX_BYTES
+    temp_dir = tempfile.mkdtemp(prefix="mediahub_search_")
+    try:
+        search_index.SEARCH_SHARD_MAX_BYTES = CHECK_SHARD_MAX_BYTES
+        builder = search_index.SearchIndexBuilder()
+        with open(os.devnull, 'w', encoding='utf-8') as devnull, contextlib.redirect_stdout(devnull):
+            media_data = load_script("01index_copy_media.py").scan_media_library_and_index(fixture)
+            build_published_indexes(media_data, base_path=fixture, workers=1, index_builders=[builder])
+        builder.write(temp_dir)
+
+        with open(os.path.join(temp_dir, search_index.SEARCH_MANIFEST_FILENAME), encoding='utf-8') as f:
+            manifest = json.load(f)
+        shards = {}
+        for name in os.listdir(temp_dir):
+            if name == search_index.SEARCH_MANIFEST_FILENAME:
+                continue
+            path = os.path.join(temp_dir, name)
+            with open(path, encoding='utf-8') as f:
+                shards[name] = json.load(f)
+            size = os.path.getsize(path)
+            if size > CHECK_SHARD_MAX_BYTES and len(shards[name]) > 1:
+                failures.append(f"分片 {name} 为 {size} 字节，超过上限 {CHECK_SHARD_MAX_BYTES}")
+        if not any(len(parts) > 1 for parts in manifest["shards"].values()):
+            failures.append("没有任何分组被拆分，检查没有覆盖拆分后的查找")
+
+        postings = {token: deltas for shard in shards.values() for token, deltas in shard.items()}
+        if len(postings) != len(builder.postings):
+            failures.append(f"分片中共有 {len(postings)} 个词元，应为 {len(builder.postings)} 个")
+        queries = set(postings) | {token[:length] for token in postings for length in (1, 2, 3)}
+        for query in sorted(queries):
+            for prefix in (False, True):
+                expected = {token for token in postings if (token.startswith(query) if prefix else token == query)}
+                found = {token for name in search_index.shard_names_for(manifest, query, prefix)
+                         for token in shards.get(name, {}) if (token.startswith(query) if prefix else token == query)}
+                if found != expected:
+                    failures.append(f"按清单查找 '{query}'（prefix={prefix}）得到 {len(found)} 个词元，应为 {len(expected)} 个")
+    finally:
+        search_index.SEARCH_SHARD_MAX_BYTES = saved
+        shutil.rmtree(temp_dir, ignore_errors=True)
+    return failures
+
+CHECKS = {
+    "walker-unthrottled": check_walker_unthrottled,
+    "search-shard-size": check_search_shard_size,
+}
+
+def run_checks(names=None, scale=CHECK_SCALE):
+    """
+    在生成的假媒体库上运行检查。
+
+    Returns:
+        dict: {检查名: 失败项的说明列表}。
+    """
+    results = {}
+    temp_dir = tempfile.mkdtemp(prefix="mediahub_checks_")
+    try:
+        fixture = os.path.join(temp_dir, "library")
+        generate_fixture(fixture, scale)
+        for name in names or CHECKS:
+            results[name] = CHECKS[name](fixture)
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+    return results
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="在生成的假媒体库上检查各模块的行为约定，失败时退出码为 1。")
+    parser.add_argument('checks', nargs='*', metavar='CHECK', help=f"要运行的检查，默认全部：{', '.join(CHECKS)}。")
+    parser.add_argument('--scale', type=int, default=CHECK_SCALE, help=f"假媒体库的媒体项目数量，默认 {CHECK_SCALE}。")
+    args = parser.parse_args()
+    unknown = [name for name in args.checks if name not in CHECKS]
+    if unknown:
+        parser.error(f"未知的检查: {', '.join(unknown)}")
+
+    failed = 0
+    for name, failures in run_checks(args.checks, args.scale).items():
+        print(f"{name}: {'通过' if not failures else '失败'}")
+        for failure in failures:
+            print(f"  {failure}")
+        failed += bool(failures)
+    print("全部检查通过。" if not failed else f"{failed} 项检查失败。")
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,228 @@
+import os
+import errno
+import shutil
+import hashlib
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import fcntl
+except ImportError: # Windows
+    fcntl = None
+
+# --- 配置信息 ---
+# 并发复制的线程数。NFO/strm/图片都是小文件，瓶颈在每个文件的打开、创建和元数据操作上，并发收益明显
+COPY_WORKERS = int(os.environ.get("MEDIAHUB_COPY_WORKERS", "8"))
+# 复制方式：
+# "copy"     复制文件内容（Linux 上使用 copy_file_range/sendfile 在内核中完成，不经过用户态缓冲区）
+# "hardlink" 创建硬链接，不占用额外空间，要求与源文件在同一文件系统
+# "symlink"  创建符号链接
+# "reflink"  写时复制克隆（Btrfs/XFS 等支持），不支持时退回到普通复制
+COPY_MODES = ("copy", "hardlink", "symlink", "reflink")
+# 判断目标文件是否已是最新时允许的修改时间误差（秒）。FAT/exFAT 和部分网络盘只有 2 秒精度
+MTIME_TOLERANCE = 2.0
+# 校验时每次读取的字节数
+CHECKSUM_CHUNK_SIZE = 1024 * 1024
+
+# Linux ioctl FICLONE，见 <linux/fs.h>
+FICLONE = 0x40049409
+
+class _DirectoryCache:
+    """记录已创建的目录，同一目录下的大量文件只调用一次 os.makedirs。"""
+
+    def __init__(self):
+        self.created = set()
+        self.lock = threading.Lock()
+
+    def ensure(self, path):
+        if path in self.created:
+            return
+        os.makedirs(path, exist_ok=True)
+        with self.lock:
+            self.created.add(path)
+
+# 内核零拷贝调用不支持当前文件组合时返回的错误码，遇到时换下一种方式
+_ZERO_COPY_UNSUPPORTED = {errno.EXDEV, errno.ENOSYS, errno.EINVAL, errno.EOPNOTSUPP, errno.ENOTSUP, errno.EBADF}
+# 单次零拷贝调用的最大字节数
+_ZERO_COPY_CHUNK = 1 << 30
+
+def _zero_copy(in_fd, out_fd, size):
+    """
+    依次尝试 os.copy_file_range 与 os.sendfile 在内核中复制数据。
+
+    Returns:
+        bool: 复制完成返回 True；两种方式都不可用时返回 False（目标文件保持为空）。
+    """
+    for name in ("copy_file_range", "sendfile"):
+        if not hasattr(os, name):
+            continue
+        offset = 0
+        try:
+            while offset < size:
+                count = min(size - offset, _ZERO_COPY_CHUNK)
+                if name == "sendfile":
+                    sent = os.sendfile(out_fd, in_fd, offset, count)
+                else:
+                    sent = os.copy_file_range(in_fd, out_fd, count, offset, offset)
+                if sent == 0:
+                    # 源文件在复制过程中变短
+                    break
+                offset += sent
+            return True
+        except OSError as e:
+            if e.errno not in _ZERO_COPY_UNSUPPORTED:
+                raise
+            if offset:
+                # sendfile 会推进目标文件的位置：截断后两个文件都回到开头，再由调用方从头复制
+                os.ftruncate(out_fd, 0)
+                os.lseek(out_fd, 0, os.SEEK_SET)
+                os.lseek(in_fd, 0, os.SEEK_SET)
+    return False
+
+def _copy_data(src, dst, src_stat):
+    """
+    复制文件内容。优先在内核中完成（copy_file_range/sendfile），
+    不可用时（例如 Windows）退回到 shutil.copyfileobj。
+    """
+    with open(src, 'rb') as fsrc, open(dst, 'wb') as fdst:
+        if not _zero_copy(fsrc.fileno(), fdst.fileno(), src_stat.st_size):
+            shutil.copyfileobj(fsrc, fdst, CHECKSUM_CHUNK_SIZE)
+
+def _reflink(src, dst):
+    """写时复制克隆。文件系统不支持时抛出 OSError。"""
+    if fcntl is None:
+        raise OSError(errno.EOPNOTSUPP, "当前系统不支持 reflink")
+    with open(src, 'rb') as fsrc, open(dst, 'wb') as fdst:
+        fcntl.ioctl(fdst.fileno(), FICLONE, fsrc.fileno())
+
+def _remove_existing(path):
+    try:
+        os.unlink(path)
+    except FileNotFoundError:
+        pass
+
+def file_checksum(path):
+    """计算文件的 BLAKE2b 校验和。"""
+    digest = hashlib.blake2b()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(CHECKSUM_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+class CopyEngine:
+    """
+    并发复制（或链接）一批文件。
+
+    - 目标文件的大小和修改时间与源文件一致时跳过，因此重复运行只处理新增或修改过的文件；
+    - 目录创建结果被缓存，每个目录只调用一次 os.makedirs；
+    - 可选在全部复制完成后并发校验源文件与目标文件的内容。
+    """
+
+    def __init__(self, mode="copy", workers=None, verify=False):
+        if mode not in COPY_MODES:
+            raise ValueError(f"不支持的复制方式: {mode}，可选: {', '.join(COPY_MODES)}")
+        self.mode = mode
+        self.workers = max(1, workers or COPY_WORKERS)
+        self.verify = verify
+        self.dirs = _DirectoryCache()
+        self.lock = threading.Lock()
+        self.stats = {"copied": 0, "skipped": 0, "missing": 0, "failed": 0, "fallback": 0, "verify_failed": 0}
+        self.verify_list = []
+
+    def _count(self, key):
+        with self.lock:
+            self.stats[key] += 1
+
+    def _is_up_to_date(self, src, src_stat, dst):
+        try:
+            if self.mode == "symlink":
+                return os.readlink(dst) == src
+            dst_stat = os.stat(dst)
+        except OSError:
+            return False
+        if self.mode == "hardlink":
+            return (dst_stat.st_ino, dst_stat.st_dev) == (src_stat.st_ino, src_stat.st_dev)
+        return (dst_stat.st_size == src_stat.st_size and
+                abs(dst_stat.st_mtime - src_stat.st_mtime) <= MTIME_TOLERANCE)
+
+    def _copy_one(self, src, dst):
+        try:
+            src_stat = os.stat(src)
+        except FileNotFoundError:
+            print(f"  警告: 源文件不存在，无法复制: {src}")
+            self._count("missing")
+            return
+
+        if self._is_up_to_date(src, src_stat, dst):
+            self._count("skipped")
+            return
+
+        try:
+            self.dirs.ensure(os.path.dirname(dst))
+            mode = self.mode
+            if mode == "symlink":
+                _remove_existing(dst)
+                os.symlink(src, dst)
+            elif mode == "hardlink":
+                _remove_existing(dst)
+                try:
+                    os.link(src, dst)
+                except OSError as e:
+                    if e.errno not in (errno.EXDEV, errno.EPERM, errno.EMLINK):
+                        raise
+                    # 跨文件系统或不支持硬链接：退回到复制
+                    self._count("fallback")
+                    mode = "copy"
+            elif mode == "reflink":
+                try:
+                    _reflink(src, dst)
+                except OSError as e:
+                    if e.errno not in (errno.EOPNOTSUPP, errno.ENOTSUP, errno.EXDEV, errno.EINVAL, errno.ENOTTY):
+                        raise
+                    self._count("fallback")
+                    mode = "copy"
+
+            if mode == "copy":
+                _copy_data(src, dst, src_stat)
+            if mode in ("copy", "reflink"):
+                # 与 shutil.copy2 一样保留权限和时间戳，下次运行据此跳过未变化的文件
+                shutil.copymode(src, dst)
+                os.utime(dst, ns=(src_stat.st_atime_ns, src_stat.st_mtime_ns))
+                if self.verify:
+                    with self.lock:
+                        self.verify_list.append((src, dst))
+            self._count("copied")
+        except Exception as e:
+            print(f"  错误: 复制文件失败 {src} -> {dst}: {e}")
+            self._count("failed")
+
+    def _verify_one(self, src, dst):
+        try:
+            if file_checksum(src) == file_checksum(dst):
+                return
+            print(f"  错误: 校验失败，内容不一致: {dst}")
+        except OSError as e:
+            print(f"  错误: 无法校验 {dst}: {e}")
+        self._count("verify_failed")
+
+    def _run_bounded(self, executor, func, pairs):
+        """逐步提交任务，同时在途的任务数不超过线程数的 4 倍，避免一次性为所有文件创建 Future。"""
+        pending = deque()
+        for src, dst in pairs:
+            if len(pending) >= self.workers * 4:
+                pending.popleft().result()
+            pending.append(executor.submit(func, src, dst))
+        while pending:
+            pending.popleft().result()
+
+    def run(self, pairs):
+        """
+        处理 (源路径, 目标路径) 序列，返回统计信息字典。
+        """
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="media-copy") as executor:
+            self._run_bounded(executor, self._copy_one, pairs)
+            if self.verify and self.verify_list:
+                print(f"正在校验 {len(self.verify_list)} 个文件...")
+                self._run_bounded(executor, self._verify_one, self.verify_list)
+        return self.stats
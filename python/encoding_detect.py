@@ -0,0 +1,177 @@
+import os
+import json
+import codecs
+import threading
+from collections import namedtuple
+
+try:
+    from chardet.universaldetector import UniversalDetector
+except ImportError: # 未安装 chardet：无法由 BOM 和 UTF-8 判断的文件直接使用 FALLBACK_ENCODING
+    UniversalDetector = None
+
+# --- 配置信息 ---
+# chardet 最多检查文件开头的字节数。NFO 中的非 ASCII 字符集中在标题和简介，开头一段足够判断
+CHARDET_PREFIX_BYTES = 64 * 1024
+# 每次送入 chardet 增量检测器的字节数，检测器有把握后立即停止
+CHARDET_CHUNK_BYTES = 4096
+# chardet 置信度低于该值时不采用其结果
+CHARDET_MIN_CONFIDENCE = 0.5
+# 无法判断时使用的编码（老的刮削器和 05nfo_converter.py 转换后的 NFO 都是 GBK）
+FALLBACK_ENCODING = 'gbk'
+# 检测结果中统一使用的编码名：GB2312 是 GBK 的子集，按 GBK 解码不会丢字
+ENCODING_ALIASES = {'gb2312': 'gbk'}
+
+_BOMS = (
+    (codecs.BOM_UTF32_LE, 'utf-32'), (codecs.BOM_UTF32_BE, 'utf-32'), # UTF-32 LE 的 BOM 以 UTF-16 LE 的 BOM 开头，需先检查
+    (codecs.BOM_UTF8, 'utf-8-sig'), (codecs.BOM_UTF16_LE, 'utf-16'), (codecs.BOM_UTF16_BE, 'utf-16'),
+)
+
+# 检测结果：encoding 为 Python 编码名；method 为 "bom"、"ascii"、"utf-8"、"hint"、"chardet"、"fallback"，
+# 或 "converted"（05nfo_converter.py 转换后写入缓存的结果）
+EncodingVerdict = namedtuple("EncodingVerdict", ("encoding", "method", "confidence"))
+
+def _normalize(encoding):
+    try:
+        name = codecs.lookup(encoding).name
+    except LookupError:
+        return None
+    return ENCODING_ALIASES.get(name, name)
+
+def _chardet_prefix(raw):
+    detector = UniversalDetector()
+    prefix = raw[:CHARDET_PREFIX_BYTES]
+    for offset in range(0, len(prefix), CHARDET_CHUNK_BYTES):
+        detector.feed(prefix[offset:offset + CHARDET_CHUNK_BYTES])
+        if detector.done:
+            break
+    detector.close()
+    return detector.result
+
+def _bom_verdict(raw):
+    for bom, encoding in _BOMS:
+        if raw.startswith(bom):
+            return EncodingVerdict(encoding, "bom", 1.0)
+    return None
+
+def _detect_non_utf8(raw, hint):
+    """已确认不是 UTF-8（也没有 BOM）时的判断：hint > chardet > FALLBACK_ENCODING。"""
+    hint = _normalize(hint) if hint else None
+    if hint and hint != 'utf-8':
+        try:
+            raw.decode(hint)
+            return EncodingVerdict(hint, "hint", 1.0)
+        except UnicodeDecodeError:
+            pass
+
+    if UniversalDetector is not None:
+        result = _chardet_prefix(raw)
+        encoding = _normalize(result["encoding"]) if result.get("encoding") else None
+        if encoding and result["confidence"] >= CHARDET_MIN_CONFIDENCE:
+            return EncodingVerdict(encoding, "chardet", result["confidence"])
+    return EncodingVerdict(FALLBACK_ENCODING, "fallback", 0.0)
+
+def detect_bytes(raw, hint=None):
+    """
+    判断一段字节的编码，按开销从低到高依次尝试：
+    BOM > 纯 ASCII > 严格 UTF-8 > hint（例如 XML 声明的编码，能严格解码时采用）
+    > chardet 增量检测（只检查开头 CHARDET_PREFIX_BYTES 字节）> FALLBACK_ENCODING。
+
+    Returns:
+        EncodingVerdict: (编码, 判断方式, 置信度)。
+    """
+    verdict = _bom_verdict(raw)
+    if verdict is not None:
+        return verdict
+    if raw.isascii():
+        return EncodingVerdict('ascii', "ascii", 1.0)
+    try:
+        raw.decode('utf-8')
+        return EncodingVerdict('utf-8', "utf-8", 1.0)
+    except UnicodeDecodeError:
+        return _detect_non_utf8(raw, hint)
+
+class VerdictCache:
+    """
+    按 (路径, 文件大小, 修改时间) 缓存编码判断结果。文件没有变化时不需要再读取和检测。
+    指定 path 时从该 JSON 文件加载，并可用 save() 保存，供下次运行使用。
+    """
+
+    def __init__(self, path=None):
+        self.path = path
+        self.lock = threading.Lock()
+        self.entries = {}
+        if path and os.path.exists(path):
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    self.entries = json.load(f)
+            except (IOError, json.JSONDecodeError) as e:
+                print(f"警告: 无法读取编码缓存 '{path}'（{e}），将重新检测。")
+
+    def get(self, file_path, st):
+        key = os.path.normcase(os.path.abspath(file_path))
+        with self.lock:
+            entry = self.entries.get(key)
+        if entry and entry[0] == st.st_size and entry[1] == st.st_mtime_ns:
+            return EncodingVerdict(*entry[2:])
+        return None
+
+    def put(self, file_path, st, verdict):
+        key = os.path.normcase(os.path.abspath(file_path))
+        with self.lock:
+            self.entries[key] = [st.st_size, st.st_mtime_ns, *verdict]
+
+    def save(self):
+        if not self.path:
+            return
+        temp_path = self.path + ".tmp"
+        with self.lock:
+            try:
+                with open(temp_path, 'w', encoding='utf-8') as f:
+                    json.dump(self.entries, f, ensure_ascii=False, separators=(',', ':'))
+                os.replace(temp_path, self.path)
+            except IOError as e:
+                print(f"警告: 无法写入编码缓存 '{self.path}'：{e}")
+
+# 未指定缓存时使用的进程内缓存
+_default_cache = VerdictCache()
+
+def detect_file(path, hint=None, cache=None):
+    """
+    判断文件的编码。缓存中有该文件（大小和修改时间都未变）的结果时直接返回，不读取文件。
+
+    Args:
+        path (str): 文件路径。
+        hint (str): 见 detect_bytes。
+        cache (VerdictCache): 使用的缓存，默认为进程内缓存。
+
+    Returns:
+        EncodingVerdict: 检测结果。
+
+    Raises:
+        OSError: 文件无法读取。
+    """
+    if cache is None:
+        cache = _default_cache
+    st = os.stat(path)
+    verdict = cache.get(path, st)
+    if verdict is None:
+        with open(path, 'rb') as f:
+            verdict = detect_bytes(f.read(), hint)
+        cache.put(path, st, verdict)
+    return verdict
+
+def decode_bytes(raw, hint=None, errors='ignore'):
+    """
+    按 detect_bytes 的规则判断编码并解码。UTF-8 文件的严格检查本身就是解码，结果直接使用，不会解码两次。
+
+    Returns:
+        tuple: (文本, EncodingVerdict)。
+    """
+    verdict = _bom_verdict(raw)
+    if verdict is None:
+        try:
+            text = raw.decode('utf-8')
+            return text, EncodingVerdict('ascii', "ascii", 1.0) if text.isascii() else EncodingVerdict('utf-8', "utf-8", 1.0)
+        except UnicodeDecodeError:
+            verdict = _detect_non_utf8(raw, hint)
+    return raw.decode(verdict.encoding, errors=errors), verdict
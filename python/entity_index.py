@@ -0,0 +1,143 @@
+import os
+import unicodedata
+from media_publish import write_compact_json, remove_stale_files
+from search_index import shard_key, encode_postings, SHARD_CODEPOINT_BITS
+
+# --- 配置信息 ---
+# 反向索引的输出子目录名与格式标识，与 js/data.js 中的 ENTITIES_DIR 对应
+ENTITY_DIRNAME = "entities"
+ENTITY_FORMAT_NAME = "mediahub-entities"
+ENTITY_FORMAT_VERSION = 1
+# 人物和制片厂数量很多，按名称首字符分片（规则同倒排索引，见 search_index.shard_key）；类型和年份各为一个文件
+PEOPLE_DIRNAME = "people"
+STUDIOS_DIRNAME = "studios"
+GENRES_FILENAME = "genres.json"
+YEARS_FILENAME = "years.json"
+# 分类统计：各类型 / 制片厂 / 年份 / 年代的项目数和作品最多的人物，前端不需要加载任何分片
+FACETS_FILENAME = "facets.json"
+TOP_PEOPLE_COUNT = 100
+
+def entity_shard_key(name):
+    """名称所在的分片名：按 NFKC 规范化并转小写后的首字符分片，与 js/data.js 中的 entityShardKey 相同。"""
+    return shard_key(unicodedata.normalize('NFKC', name).lower())
+
+def _sorted_by_count(groups):
+    """按项目数从多到少（相同时按名称）排列的 [(名称, ID 列表)]。"""
+    return sorted(groups.items(), key=lambda item: (-len(item[1]), item[0]))
+
+def _add_id(groups, name, item_id):
+    item_ids = groups.setdefault(name, [])
+    if not item_ids or item_ids[-1] != item_id:
+        item_ids.append(item_id)
+        return True
+    return False
+
+def _person_count(person):
+    """人物出演和执导的项目总数（同一项目既出演又执导只计一次）。"""
+    return len(set(person["ids"]) | set(person["directed"]))
+
+def _id_group(item_ids):
+    return {"count": len(item_ids), "ids": encode_postings(item_ids)}
+
+class EntityIndexBuilder:
+    """
+    逐个加入媒体项目，生成 人物 / 制片厂 / 类型 / 年份 -> 项目 ID 的反向索引，每项附带项目数。
+    人物页、制片厂页和分类统计只需读取对应的分片或统计文件，不需要扫描全部项目。
+    项目需按 ID 升序加入，ID 列表因此天然有序。
+    """
+
+    def __init__(self):
+        self.item_count = 0
+        self.people = {}        # {姓名: {"ids": [...], "roles": [...], "directed": [...]}}
+        self.studios = {}
+        self.genres = {}
+        self.years = {}
+
+    def add_item(self, item_id, item_path, fields, meta, pinyin):
+        """
+        加入一个媒体项目。演员（含角色）和导演取自 NFO 字段，制片厂、类型和年份取自 meta（见 build_item_meta），
+        不使用拼音检索键。没有 NFO 或 NFO 无法读取的项目只计入项目总数。
+        """
+        self.item_count += 1
+        if fields and "error" not in fields:
+            for actor in fields.get("actors", ()):
+                person = self._person(actor[0])
+                if _add_id(person, "ids", item_id):
+                    person["roles"].append(actor[2] or "")
+            for name in fields.get("director", ()):
+                _add_id(self._person(name), "directed", item_id)
+        for name in meta.get("studio", ()):
+            _add_id(self.studios, name, item_id)
+        for name in meta.get("genre", ()):
+            _add_id(self.genres, name, item_id)
+        year = meta.get("year")
+        if isinstance(year, int) and year > 0:
+            _add_id(self.years, year, item_id)
+
+    def _person(self, name):
+        name = name.split('-tmdb-')[0]
+        return self.people.setdefault(name, {"ids": [], "roles": [], "directed": []})
+
+    @staticmethod
+    def _person_entry(person):
+        """人物条目：count 为出演和执导的项目总数；roles 与 ids 一一对应，全部为空时省略；没有执导作品时省略 directed。"""
+        entry = {"count": _person_count(person)}
+        if person["ids"]:
+            entry["ids"] = encode_postings(person["ids"])
+            if any(person["roles"]):
+                entry["roles"] = person["roles"]
+        if person["directed"]:
+            entry["directed"] = encode_postings(person["directed"])
+        return entry
+
+    def write(self, entity_dir):
+        """
+        写出人物和制片厂分片（{people,studios}/{分片名}.json，内容为 {名称: 条目}）、
+        genres.json、years.json（年份和年代，如 "1990s"）以及分类统计 facets.json。
+        内容未变化的文件不重写，已不存在的分片被删除。
+
+        Returns:
+            dict: 统计 {"people", "studios", "genres", "years", "written", "unchanged", "removed"}。
+        """
+        files = {}
+        shards = {}
+        for dirname, groups, make_entry in ((PEOPLE_DIRNAME, self.people, self._person_entry),
+                                            (STUDIOS_DIRNAME, self.studios, _id_group)):
+            shards[dirname] = {}
+            for name in sorted(groups):
+                key = entity_shard_key(name)
+                shards[dirname][key] = shards[dirname].get(key, 0) + 1
+                files.setdefault(f"{dirname}/{key}.json", {})[name] = make_entry(groups[name])
+
+        decades = {}
+        for year, item_ids in self.years.items():
+            decades.setdefault(f"{year // 10 * 10}s", set()).update(item_ids)
+        decades = {name: sorted(item_ids) for name, item_ids in decades.items()}
+        files[GENRES_FILENAME] = {name: _id_group(item_ids) for name, item_ids in _sorted_by_count(self.genres)}
+        files[YEARS_FILENAME] = {
+            "years": {str(year): _id_group(self.years[year]) for year in sorted(self.years, reverse=True)},
+            "decades": {name: _id_group(decades[name]) for name in sorted(decades, reverse=True)},
+        }
+
+        people_by_count = sorted(((_person_count(person), name) for name, person in self.people.items()),
+                                 key=lambda item: (-item[0], item[1]))
+        files[FACETS_FILENAME] = {
+            "format": ENTITY_FORMAT_NAME,
+            "version": ENTITY_FORMAT_VERSION,
+            "items": self.item_count,
+            "shard_codepoint_bits": SHARD_CODEPOINT_BITS,
+            "shards": {dirname: dict(sorted(counts.items())) for dirname, counts in shards.items()},
+            "genres": {name: len(item_ids) for name, item_ids in _sorted_by_count(self.genres)},
+            "studios": {name: len(item_ids) for name, item_ids in _sorted_by_count(self.studios)},
+            "years": {str(year): len(self.years[year]) for year in sorted(self.years, reverse=True)},
+            "decades": {name: len(decades[name]) for name in sorted(decades, reverse=True)},
+            "people": len(self.people),
+            "top_people": [[name, count] for count, name in people_by_count[:TOP_PEOPLE_COUNT]],
+        }
+
+        stats = {"people": len(self.people), "studios": len(self.studios), "genres": len(self.genres),
+                 "years": len(self.years), "written": 0, "unchanged": 0}
+        for name, data in files.items():
+            stats["written" if write_compact_json(os.path.join(entity_dir, *name.split('/')), data) else "unchanged"] += 1
+        stats["removed"] = remove_stale_files(entity_dir, set(files))
+        return stats
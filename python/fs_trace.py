@@ -0,0 +1,325 @@
+import os
+import sys
+import json
+import time
+import heapq
+import atexit
+import threading
+import functools
+import multiprocessing
+
+# --- 配置信息 ---
+# 设置该环境变量即开启追踪：值为输出 JSON 的路径，或 "1" 表示使用默认文件名 fs_trace.<脚本名>.json。
+# 没有命令行参数的脚本（02/03/13/14）只能通过环境变量开启。
+TRACE_ENV = "MEDIAHUB_TRACE_FS"
+# 报告中保留的最慢目录 / 文件数量
+TRACE_SLOWEST_N = 20
+# 延迟直方图的桶上界（毫秒），最后一个桶收集超过最大上界的操作
+TRACE_BUCKETS_MS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+# 列目录类操作：最慢列表按目录统计，其余操作按文件统计
+DIRECTORY_OPS = {"readdir", "stat_dir"}
+
+class _OpStats:
+    """单种操作的计数、总耗时、最大耗时和延迟直方图。"""
+
+    __slots__ = ("count", "errors", "total", "max", "buckets")
+
+    def __init__(self):
+        self.count = 0
+        self.errors = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.buckets = [0] * (len(TRACE_BUCKETS_MS) + 1)
+
+    def merge(self, other):
+        """并入另一份同一操作的统计（例如工作进程的）。"""
+        self.count += other.count
+        self.errors += other.errors
+        self.total += other.total
+        self.max = max(self.max, other.max)
+        self.buckets = [a + b for a, b in zip(self.buckets, other.buckets)]
+
+    def add(self, seconds, failed):
+        self.count += 1
+        self.errors += failed
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+        ms = seconds * 1000
+        for i, bound in enumerate(TRACE_BUCKETS_MS):
+            if ms <= bound:
+                self.buckets[i] += 1
+                return
+        self.buckets[-1] += 1
+
+    def percentile_ms(self, fraction):
+        """按直方图估算分位数（返回所在桶的上界，毫秒）。"""
+        target = self.count * fraction
+        seen = 0
+        for i, n in enumerate(self.buckets):
+            seen += n
+            if n and seen >= target:
+                return TRACE_BUCKETS_MS[i] if i < len(TRACE_BUCKETS_MS) else round(self.max * 1000, 3)
+        return 0
+
+    def to_dict(self):
+        labels = [f"<={bound}ms" for bound in TRACE_BUCKETS_MS] + [f">{TRACE_BUCKETS_MS[-1]}ms"]
+        return {
+            "count": self.count,
+            "errors": self.errors,
+            "total_s": round(self.total, 6),
+            "mean_ms": round(self.total / self.count * 1000, 3) if self.count else 0,
+            "max_ms": round(self.max * 1000, 3),
+            "p50_ms": self.percentile_ms(0.5),
+            "p90_ms": self.percentile_ms(0.9),
+            "p99_ms": self.percentile_ms(0.99),
+            "histogram": {label: n for label, n in zip(labels, self.buckets) if n},
+        }
+
+class FsTracer:
+    """
+    记录文件系统操作（列目录、stat、读取、解析）的耗时。
+
+    汇总三类信息：每种操作的延迟直方图、最慢的 N 个目录和文件、按媒体库顶级目录统计的耗时，
+    用于定位扫描变慢时究竟是哪种操作、哪个挂载点或哪个目录拖慢了整体。
+    """
+
+    def __init__(self, root=None, slowest_n=TRACE_SLOWEST_N):
+        self.root = os.path.abspath(root or os.getcwd())
+        self.slowest_n = slowest_n
+        self.lock = threading.Lock()
+        self.ops = {}
+        # 最小堆，只保留最慢的 slowest_n 项：(耗时, 操作, 路径)
+        self.slowest_dirs = []
+        self.slowest_files = []
+        # 顶级目录 -> 操作 -> [次数, 总耗时]
+        self.top_level = {}
+        self.started = time.time()
+
+    def _top_level_of(self, path):
+        rel = os.path.relpath(os.path.abspath(path), self.root)
+        if rel == '.':
+            return '.'
+        if rel.startswith(os.pardir):
+            # 根目录之外的路径（例如经由符号链接到达的目录）按其所在目录归类
+            return os.path.dirname(os.path.abspath(path))
+        return rel.split(os.sep, 1)[0]
+
+    def record(self, op, path, seconds, failed=False):
+        top = self._top_level_of(path)
+        slowest = self.slowest_dirs if op in DIRECTORY_OPS else self.slowest_files
+        with self.lock:
+            stats = self.ops.get(op)
+            if stats is None:
+                stats = self.ops[op] = _OpStats()
+            stats.add(seconds, failed)
+
+            totals = self.top_level.setdefault(top, {}).setdefault(op, [0, 0.0])
+            totals[0] += 1
+            totals[1] += seconds
+
+            item = (seconds, op, path)
+            if len(slowest) < self.slowest_n:
+                heapq.heappush(slowest, item)
+            elif seconds > slowest[0][0]:
+                heapq.heapreplace(slowest, item)
+
+    def take_records(self):
+        """取出并清空目前的记录（可以 pickle），用于把工作进程的记录送回主进程合并（见 merge_records）。"""
+        with self.lock:
+            records = (self.ops, self.slowest_dirs, self.slowest_files, self.top_level)
+            self.ops = {}
+            self.slowest_dirs = []
+            self.slowest_files = []
+            self.top_level = {}
+        return records
+
+    def merge_records(self, records):
+        """并入 take_records 取出的记录。"""
+        ops, slowest_dirs, slowest_files, top_level = records
+        with self.lock:
+            for op, stats in ops.items():
+                self.ops.setdefault(op, _OpStats()).merge(stats)
+            for slowest, items in ((self.slowest_dirs, slowest_dirs), (self.slowest_files, slowest_files)):
+                for item in items:
+                    if len(slowest) < self.slowest_n:
+                        heapq.heappush(slowest, item)
+                    elif item[0] > slowest[0][0]:
+                        heapq.heapreplace(slowest, item)
+            for top, top_ops in top_level.items():
+                for op, (count, total) in top_ops.items():
+                    totals = self.top_level.setdefault(top, {}).setdefault(op, [0, 0.0])
+                    totals[0] += count
+                    totals[1] += total
+
+    def report(self):
+        """返回可序列化为 JSON 的追踪报告。"""
+        def slowest_list(heap):
+            return [{"op": op, "path": path, "ms": round(seconds * 1000, 3)}
+                    for seconds, op, path in sorted(heap, reverse=True)]
+
+        with self.lock:
+            top_level = {}
+            for top, ops in self.top_level.items():
+                top_level[top] = {
+                    "total_s": round(sum(total for _, total in ops.values()), 6),
+                    "ops": {op: {"count": count, "total_s": round(total, 6)} for op, (count, total) in sorted(ops.items())},
+                }
+            return {
+                "root": self.root,
+                "started": self.started,
+                "elapsed_s": round(time.time() - self.started, 3),
+                "ops": {op: stats.to_dict() for op, stats in sorted(self.ops.items())},
+                "slowest_dirs": slowest_list(self.slowest_dirs),
+                "slowest_files": slowest_list(self.slowest_files),
+                "top_level": dict(sorted(top_level.items(), key=lambda kv: -kv[1]["total_s"])),
+            }
+
+    def dump(self, output_path):
+        report = self.report()
+        try:
+            with open(output_path, 'w', encoding='utf-8') as f:
+                json.dump(report, f, ensure_ascii=False, indent=4)
+        except IOError as e:
+            print(f"错误: 无法写入文件系统追踪报告 {output_path}: {e}")
+            return report
+        print(f"\n--- 文件系统追踪 ---")
+        for op, stats in report["ops"].items():
+            print(f"  {op:<10} {stats['count']:>8} 次  总计 {stats['total_s']:9.3f} 秒  "
+                  f"平均 {stats['mean_ms']:8.3f} ms  p99 <= {stats['p99_ms']} ms  最大 {stats['max_ms']:.3f} ms")
+        for top, totals in list(report["top_level"].items())[:5]:
+            print(f"  顶级目录 {top}: {totals['total_s']:.3f} 秒")
+        print(f"  完整报告已保存到: {output_path}")
+        return report
+
+class _Timer:
+    __slots__ = ("tracer", "op", "path", "start")
+
+    def __init__(self, tracer, op, path):
+        self.tracer = tracer
+        self.op = op
+        self.path = path
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.tracer.record(self.op, self.path, time.perf_counter() - self.start, failed=exc_type is not None)
+        return False
+
+class _NullTimer:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+_NULL_TIMER = _NullTimer()
+_tracer = None
+_output_path = None
+
+def enabled():
+    return _tracer is not None
+
+def timed(op, path):
+    """
+    计时上下文管理器：`with fs_trace.timed("read", path): ...`。未开启追踪时几乎没有开销。
+    """
+    if _tracer is None:
+        return _NULL_TIMER
+    return _Timer(_tracer, op, path)
+
+def traced(op, func):
+    """
+    包装以路径为第一个参数的函数（例如列目录函数），每次调用记录为 op 操作。
+    未开启追踪时原样返回 func。
+    """
+    if _tracer is None:
+        return func
+    tracer = _tracer
+
+    @functools.wraps(func)
+    def wrapper(path, *args, **kwargs):
+        start = time.perf_counter()
+        failed = True
+        try:
+            result = func(path, *args, **kwargs)
+            failed = False
+            return result
+        finally:
+            tracer.record(op, path, time.perf_counter() - start, failed=failed)
+    return wrapper
+
+def _default_output_path():
+    stage = os.path.splitext(os.path.basename(sys.argv[0] or "python"))[0] or "python"
+    return f"fs_trace.{stage}.json"
+
+def enable(output_path=None, root=None):
+    """
+    开启追踪，进程退出时把报告写入 output_path（默认为当前目录下的 fs_trace.<脚本名>.json）。
+    重复调用只更新输出路径和根目录。
+
+    Returns:
+        FsTracer: 当前的追踪器。
+    """
+    global _tracer, _output_path
+    if output_path in (None, "", "1"):
+        output_path = _default_output_path()
+    _output_path = output_path
+    if _tracer is None:
+        _tracer = FsTracer(root)
+        atexit.register(lambda: _tracer.dump(_output_path))
+    elif root is not None:
+        _tracer.root = os.path.abspath(root)
+    return _tracer
+
+def worker_settings():
+    """
+    传给进程池初始化函数 init_worker 的参数：未开启追踪时为 None。
+    工作进程不会按环境变量开启追踪（见模块末尾），需要由主进程显式传入。
+    """
+    return None if _tracer is None else _tracer.root
+
+def init_worker(root):
+    """
+    进程池的初始化函数：root 不为 None 时在工作进程中开启追踪，但退出时不写报告，
+    记录由 take_worker_records 随每个任务的结果送回主进程，再由 merge_worker_records 并入主进程的报告。
+    fork 方式启动的工作进程继承了主进程的追踪器，这里换成新的，避免主进程已有的记录被重复合并。
+    """
+    global _tracer
+    _tracer = FsTracer(root) if root is not None else None
+
+def take_worker_records():
+    """工作进程中调用：取出并清空本进程的追踪记录，未开启追踪时返回 None。"""
+    return None if _tracer is None else _tracer.take_records()
+
+def merge_worker_records(records):
+    """主进程中调用：并入工作进程送回的追踪记录。"""
+    if _tracer is not None and records is not None:
+        _tracer.merge_records(records)
+
+def set_root(root):
+    """设置按顶级目录统计时使用的媒体库根目录（默认为当前目录）。"""
+    if _tracer is not None:
+        _tracer.root = os.path.abspath(root)
+
+def add_trace_arguments(parser):
+    """为命令行解析器添加 --trace-fs 参数。"""
+    parser.add_argument('--trace-fs', nargs='?', const="1", default=None, metavar='PATH',
+                        help=f"记录文件系统操作耗时，结束时写出 JSON 报告（默认 fs_trace.<脚本名>.json；"
+                             f"也可设置环境变量 {TRACE_ENV}）。")
+
+def configure_from_args(args, root=None):
+    """根据 --trace-fs 参数开启追踪。需要在开始遍历之前调用。"""
+    if args.trace_fs is not None:
+        enable(args.trace_fs, root)
+    elif root is not None:
+        set_root(root)
+
+# 只在主进程中按环境变量开启：spawn 方式启动的工作进程（例如 nfo_pipeline 的解析进程池）会重新导入本模块，
+# 若也开启，退出时写出的只含该进程操作的报告会覆盖主进程的报告。工作进程的追踪由 init_worker 开启
+if os.environ.get(TRACE_ENV) and multiprocessing.parent_process() is None:
+    enable(os.environ[TRACE_ENV])
@@ -0,0 +1,134 @@
+import os
+import re
+
+# --- 配置信息 ---
+# 忽略规则文件名，放在被遍历的根目录下
+IGNORE_FILENAME = ".mhignore"
+
+def _translate_glob(pattern):
+    """
+    把 gitignore 风格的通配符转换为正则表达式片段。
+    `*` 和 `?` 不匹配路径分隔符，`**` 可以跨越多级目录，`[...]` 为字符集合。
+    """
+    i, n = 0, len(pattern)
+    parts = []
+    while i < n:
+        c = pattern[i]
+        if c == '*':
+            if pattern[i:i + 3] == '**/':
+                # "**/" 匹配零个或多个目录
+                parts.append('(?:.*/)?')
+                i += 3
+                continue
+            if pattern[i:i + 2] == '**':
+                parts.append('.*')
+                i += 2
+                continue
+            parts.append('[^/]*')
+        elif c == '?':
+            parts.append('[^/]')
+        elif c == '[':
+            j = pattern.find(']', i + 1)
+            if j == -1:
+                parts.append(re.escape(c))
+            else:
+                body = pattern[i + 1:j]
+                if body.startswith('!'):
+                    body = '^' + body[1:]
+                parts.append('[' + body.replace('\\', '\\\\') + ']')
+                i = j
+        elif c == '\\' and i + 1 < n:
+            i += 1
+            parts.append(re.escape(pattern[i]))
+        else:
+            parts.append(re.escape(c))
+        i += 1
+    return ''.join(parts)
+
+class IgnoreRule:
+    """一条忽略规则。"""
+
+    def __init__(self, line):
+        pattern = line
+        self.negated = pattern.startswith('!')
+        if self.negated:
+            pattern = pattern[1:]
+        elif pattern.startswith('\\!') or pattern.startswith('\\#'):
+            pattern = pattern[1:]
+
+        # 以 "/" 结尾的规则只匹配目录
+        self.directory_only = pattern.endswith('/')
+        pattern = pattern.rstrip('/')
+
+        # 规则中间或开头含有 "/" 时相对于根目录匹配，否则匹配任意层级的名称
+        anchored = '/' in pattern
+        pattern = pattern.lstrip('/')
+        regex = _translate_glob(pattern)
+        if not anchored:
+            regex = '(?:.*/)?' + regex
+        # 文件名的大小写在整个项目中都按不区分处理
+        self.regex = re.compile('^' + regex + '$', re.IGNORECASE)
+        self.pattern = line
+
+    def matches(self, rel_path, is_dir):
+        if self.directory_only and not is_dir:
+            return False
+        return self.regex.match(rel_path) is not None
+
+class IgnoreRules:
+    """
+    gitignore 风格的忽略规则集合。
+
+    支持的语法：`#` 注释、`!` 取反、`/` 结尾仅匹配目录、`/` 开头或中间含 `/` 时相对根目录匹配，
+    以及 `*`、`?`、`**`、`[...]` 通配符。与 git 一样，后出现的规则优先；
+    目录一旦被忽略就不会再向下遍历，其中的内容也无法被取反规则重新包含。
+    """
+
+    def __init__(self, patterns=()):
+        self.rules = []
+        for line in patterns:
+            line = line.rstrip('\n').rstrip()
+            if not line or line.startswith('#'):
+                continue
+            self.rules.append(IgnoreRule(line))
+
+    def __bool__(self):
+        return bool(self.rules)
+
+    @classmethod
+    def load(cls, root, extra_patterns=None, ignore_file=None):
+        """
+        读取根目录下的 .mhignore（如存在）、额外的规则文件以及命令行给出的规则。
+        命令行规则排在最后，优先级最高。
+        """
+        patterns = []
+        for path in (os.path.join(root, IGNORE_FILENAME), ignore_file):
+            if path and os.path.isfile(path):
+                try:
+                    with open(path, 'r', encoding='utf-8') as f:
+                        patterns.extend(f.readlines())
+                except (IOError, UnicodeDecodeError) as e:
+                    print(f"警告: 无法读取忽略规则文件 '{path}'：{e}")
+        patterns.extend(extra_patterns or [])
+        return cls(patterns)
+
+    def is_ignored(self, rel_path, is_dir=False):
+        """
+        判断相对于根目录的路径（使用 "/" 分隔）是否被忽略。
+        """
+        ignored = False
+        for rule in self.rules:
+            if rule.negated == ignored and rule.matches(rel_path, is_dir):
+                ignored = not rule.negated
+        return ignored
+
+def add_ignore_arguments(parser):
+    """为命令行解析器添加 --ignore 和 --ignore-file 参数。"""
+    parser.add_argument('--ignore', action='append', default=[], metavar='PATTERN',
+                        help=f"忽略匹配的目录或文件（gitignore 语法，可重复）。根目录下的 {IGNORE_FILENAME} 会自动读取。")
+    parser.add_argument('--ignore-file', metavar='PATH',
+                        help="额外读取的忽略规则文件。")
+
+def ignore_rules_from_args(root, args):
+    """根据命令行参数和根目录下的 .mhignore 构建忽略规则。"""
+    return IgnoreRules.load(root, extra_patterns=args.ignore, ignore_file=args.ignore_file)
@@ -0,0 +1,249 @@
+import os
+import re
+import time
+import threading
+
+# --- 配置信息 ---
+# 默认的每秒操作数上限和并发上限，0 表示不限制。两者都为 0 时不启用节流。
+# 阿里云盘等网盘经 AList 挂载后，列目录过快会被限流甚至封禁，可以从每秒 5 次、并发 4 开始尝试。
+DEFAULT_OPS_PER_SEC = float(os.environ.get("MEDIAHUB_IO_OPS_PER_SEC", "0"))
+DEFAULT_CONCURRENCY = int(os.environ.get("MEDIAHUB_IO_CONCURRENCY", "0"))
+
+# 按挂载点（或 AList 地址）单独设置的上限，优先于默认值。
+# 例如 {"/mnt/aliyun": (5, 4), "http://127.0.0.1:5244": (10, 8)}
+MOUNT_LIMITS = {}
+
+# --- 自适应退避 ---
+# 单次操作耗时超过平滑后基线的该倍数时视为延迟突增
+LATENCY_SPIKE_FACTOR = 3.0
+# 低于该耗时（秒）的操作不算突增，避免本地磁盘亚毫秒级的抖动触发退避
+LATENCY_SPIKE_MIN = 0.2
+# 建立延迟基线所需的最少样本数
+LATENCY_MIN_SAMPLES = 10
+LATENCY_EWMA_ALPHA = 0.1
+# 退避时速率和并发减半，但不低于下面的下限
+BACKOFF_FACTOR = 0.5
+MIN_OPS_PER_SEC = 0.5
+# 两次退避之间的最短间隔（秒），避免同一波失败连续多次减半
+BACKOFF_COOLDOWN = 2.0
+
+class IoThrottle:
+    """
+    单个存储后端的 I/O 调度器：令牌桶限制每秒操作数，计数器限制并发数，
+    并按 AIMD（加性增、乘性减）根据延迟和错误自适应调整。
+
+    - 操作成功且延迟正常时，速率和并发缓慢回升，直到配置的上限；
+    - 出现错误或延迟突增时，速率和并发立即减半，并在 BACKOFF_COOLDOWN 内不再重复减半。
+
+    这样可以在不触发后端限流的前提下，维持后端所能承受的最高吞吐。
+    """
+
+    def __init__(self, ops_per_sec=0, concurrency=0, name=""):
+        self.name = name
+        self.max_rate = float(ops_per_sec) if ops_per_sec and ops_per_sec > 0 else None
+        self.max_concurrency = int(concurrency) if concurrency and concurrency > 0 else None
+
+        self.rate = self.max_rate
+        self.concurrency = float(self.max_concurrency) if self.max_concurrency else None
+        self.tokens = min(1.0, self.max_rate) if self.max_rate else 0.0
+        self.last_refill = time.monotonic()
+
+        self.in_flight = 0
+        self.latency_baseline = None
+        self.latency_samples = 0
+        self.last_backoff = 0.0
+
+        self.ops = 0
+        self.errors = 0
+        self.backoffs = 0
+        self.cond = threading.Condition()
+
+    def _refill(self, now):
+        if self.rate is None:
+            return
+        self.tokens = min(max(1.0, self.rate), self.tokens + (now - self.last_refill) * self.rate)
+        self.last_refill = now
+
+    def acquire(self):
+        """等待直到允许发起下一次操作。"""
+        with self.cond:
+            while True:
+                now = time.monotonic()
+                self._refill(now)
+                if self.concurrency is not None and self.in_flight >= int(self.concurrency):
+                    self.cond.wait()
+                    continue
+                if self.rate is not None and self.tokens < 1.0:
+                    self.cond.wait((1.0 - self.tokens) / self.rate)
+                    continue
+                if self.rate is not None:
+                    self.tokens -= 1.0
+                self.in_flight += 1
+                return
+
+    def release(self, latency, error=False):
+        """一次操作结束，根据耗时和结果调整速率与并发。"""
+        with self.cond:
+            self.in_flight -= 1
+            self.ops += 1
+            now = time.monotonic()
+
+            spike = False
+            if error:
+                self.errors += 1
+            elif self.latency_baseline is None:
+                self.latency_baseline = latency
+            else:
+                spike = (self.latency_samples >= LATENCY_MIN_SAMPLES and latency > LATENCY_SPIKE_MIN and
+                         latency > self.latency_baseline * LATENCY_SPIKE_FACTOR)
+                if not spike:
+                    self.latency_baseline += LATENCY_EWMA_ALPHA * (latency - self.latency_baseline)
+            if not error:
+                self.latency_samples += 1
+
+            if error or spike:
+                if now - self.last_backoff >= BACKOFF_COOLDOWN:
+                    self.last_backoff = now
+                    self.backoffs += 1
+                    if self.rate is not None:
+                        self.rate = max(MIN_OPS_PER_SEC, self.rate * BACKOFF_FACTOR)
+                        self.tokens = min(self.tokens, 0.0)
+                    if self.concurrency is not None:
+                        self.concurrency = max(1.0, self.concurrency * BACKOFF_FACTOR)
+            else:
+                # 加性回升：大约每完成一轮（当前速率/并发数次）操作增加 1
+                if self.rate is not None and self.rate < self.max_rate:
+                    self.rate = min(self.max_rate, self.rate + 1.0 / self.rate)
+                if self.concurrency is not None and self.concurrency < self.max_concurrency:
+                    self.concurrency = min(float(self.max_concurrency), self.concurrency + 1.0 / self.concurrency)
+            self.cond.notify_all()
+
+    def wrap(self, func):
+        """返回一个受本调度器约束的函数（例如 media_walker 的 lister）。"""
+        def throttled(*args, **kwargs):
+            self.acquire()
+            start = time.monotonic()
+            error = False
+            try:
+                return func(*args, **kwargs)
+            except OSError:
+                error = True
+                raise
+            finally:
+                self.release(time.monotonic() - start, error)
+        return throttled
+
+    def summary(self):
+        parts = [f"{self.ops} 次操作", f"{self.errors} 次错误", f"{self.backoffs} 次退避"]
+        if self.rate is not None:
+            parts.append(f"当前速率 {self.rate:.1f}/s")
+        if self.concurrency is not None:
+            parts.append(f"当前并发 {int(self.concurrency)}")
+        return f"I/O 节流 [{self.name}]: " + "，".join(parts)
+
+_registry = {}
+_registry_lock = threading.Lock()
+# 挂载点列表：[(挂载点, 文件系统类型)]
+_mount_points = None
+# 没有 /proc/self/mounts 时，已确认的 目录 -> 所在挂载点
+_mount_root_cache = {}
+
+def _load_mount_points():
+    """读取系统挂载点列表（仅 Linux 可用），按路径长度降序排列以便最长前缀匹配。"""
+    mount_points = {}
+    try:
+        with open("/proc/self/mounts", 'r', encoding='utf-8') as f:
+            for line in f:
+                fields = line.split()
+                if len(fields) >= 3:
+                    # /proc/self/mounts 中的空格等字符以八进制转义（如 \040）
+                    mount_point = re.sub(r'\\([0-7]{3})', lambda m: chr(int(m.group(1), 8)), fields[1])
+                    # 同一挂载点被多次挂载时，后出现的生效
+                    mount_points[mount_point] = fields[2]
+    except (IOError, UnicodeDecodeError):
+        pass
+    return sorted(mount_points.items(), key=lambda item: len(item[0]), reverse=True)
+
+def _find_mount(path):
+    """在 /proc/self/mounts 中查找 path 所在的挂载点，返回 (挂载点, 文件系统类型)，找不到时返回 None。"""
+    global _mount_points
+    if _mount_points is None:
+        _mount_points = _load_mount_points()
+    for mount_point, fstype in _mount_points:
+        if path == mount_point or path.startswith(os.path.join(mount_point, '')):
+            return mount_point, fstype
+    return None
+
+def mount_fstype(path):
+    """返回 path 所在挂载点的文件系统类型（如 ext4、fuse.rclone、nfs），无法获取时返回 None。"""
+    found = _find_mount(os.path.abspath(path))
+    return found[1] if found else None
+
+def mount_root(path):
+    """
+    返回 path 所在的挂载点。Linux 下查询 /proc/self/mounts；
+    其他系统逐级向上检查 os.path.ismount（Windows 下即盘符或 UNC 共享根），
+    检查过的目录会被缓存，遍历时每个目录只需检查自身一次。
+    """
+    path = os.path.abspath(path)
+    found = _find_mount(path)
+    if found:
+        return found[0]
+    checked = []
+    while True:
+        root = _mount_root_cache.get(path)
+        if root is not None:
+            break
+        parent = os.path.dirname(path)
+        if parent == path or os.path.ismount(path):
+            root = path
+            break
+        checked.append(path)
+        path = parent
+    for checked_path in checked:
+        _mount_root_cache[checked_path] = root
+    return root
+
+def limits_configured():
+    """是否配置了任何限制（默认上限或 MOUNT_LIMITS 中的某一项不为 0）。都没有时任何目录都不会被节流。"""
+    if DEFAULT_OPS_PER_SEC > 0 or DEFAULT_CONCURRENCY > 0:
+        return True
+    return any(ops_per_sec > 0 or concurrency > 0 for ops_per_sec, concurrency in MOUNT_LIMITS.values())
+
+def throttle_for(key):
+    """
+    返回某个存储后端的共享调度器。key 为本地路径时按其挂载点归类，
+    其他字符串（如 AList 地址）直接作为后端标识。未配置任何限制时返回 None。
+    """
+    if os.path.isabs(key) and not key.startswith(('http://', 'https://')):
+        key = mount_root(key)
+    with _registry_lock:
+        if key not in _registry:
+            ops_per_sec, concurrency = MOUNT_LIMITS.get(key, (DEFAULT_OPS_PER_SEC, DEFAULT_CONCURRENCY))
+            if ops_per_sec > 0 or concurrency > 0:
+                _registry[key] = IoThrottle(ops_per_sec, concurrency, name=key)
+            else:
+                _registry[key] = None
+        return _registry[key]
+
+def active_throttles():
+    """本进程中已启用的调度器列表。"""
+    with _registry_lock:
+        return [throttle for throttle in _registry.values() if throttle is not None]
+
+def add_throttle_arguments(parser):
+    """为命令行解析器添加 --io-rate 和 --io-concurrency 参数。"""
+    parser.add_argument('--io-rate', type=float, metavar='OPS',
+                        help="每个挂载点每秒最多列举的目录数（默认读取 MEDIAHUB_IO_OPS_PER_SEC，0 为不限制）。")
+    parser.add_argument('--io-concurrency', type=int, metavar='N',
+                        help="每个挂载点同时进行的列举数（默认读取 MEDIAHUB_IO_CONCURRENCY，0 为不限制）。")
+
+def configure_from_args(args):
+    """用命令行参数覆盖默认上限。需要在开始遍历之前调用。"""
+    global DEFAULT_OPS_PER_SEC, DEFAULT_CONCURRENCY
+    if args.io_rate is not None:
+        DEFAULT_OPS_PER_SEC = args.io_rate
+    if args.io_concurrency is not None:
+        DEFAULT_CONCURRENCY = args.io_concurrency
+    with _registry_lock:
+        _registry.clear()
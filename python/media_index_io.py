@@ -0,0 +1,184 @@
+import os
+import json
+import time
+
+# --- 配置信息 ---
+# 逐行格式（NDJSON）：每行一个媒体条目，形如 {"type": "movie", "path": ..., "files": [...]}。
+# 首行和末行是以 "_meta" 为键的元信息行；末行只在扫描正常结束时写入，用于判断索引是否完整。
+NDJSON_EXTENSIONS = ('.ndjson', '.jsonl')
+NDJSON_FORMAT_NAME = "mediahub-index"
+NDJSON_FORMAT_VERSION = 1
+
+# 条目类型与 media_index.json 中分组键的对应关系
+MEDIA_TYPE_KEYS = {"movie": "movies", "tv_show": "tv_shows"}
+
+# 设置环境变量 MEDIAHUB_FOLLOW_INDEX=1 后，读取 NDJSON 索引时会等待扫描器继续写入，
+# 直到读到结束行为止，这样下游脚本可以在扫描完成前开始处理。
+FOLLOW_INDEX = os.environ.get("MEDIAHUB_FOLLOW_INDEX", "") not in ("", "0")
+# 跟随模式下，文件超过该时长（秒）没有增长则视为扫描器已退出
+FOLLOW_IDLE_TIMEOUT = 600
+FOLLOW_POLL_INTERVAL = 1.0
+
+def is_ndjson_path(path):
+    """根据扩展名判断索引文件是否为逐行格式。"""
+    return path.lower().endswith(NDJSON_EXTENSIONS)
+
+def find_media_index(path):
+    """
+    返回实际存在的索引文件路径：path 不存在时，尝试同名的 .ndjson 文件。
+    都不存在时原样返回 path，由调用方报告文件不存在。
+    """
+    if os.path.exists(path) or is_ndjson_path(path):
+        return path
+    ndjson_path = os.path.splitext(path)[0] + NDJSON_EXTENSIONS[0]
+    if os.path.exists(ndjson_path):
+        return ndjson_path
+    return path
+
+class NdjsonIndexWriter:
+    """
+    逐行写入媒体索引。每发现一个媒体项目就追加一行并立即刷新，
+    因此扫描中途的索引文件也可以被读取和使用。
+    """
+
+    def __init__(self, path, meta=None):
+        self.path = path
+        self.counts = {media_type: 0 for media_type in MEDIA_TYPE_KEYS}
+        self.file = open(path, 'w', encoding='utf-8')
+        self._write_line({"_meta": {"format": NDJSON_FORMAT_NAME, "version": NDJSON_FORMAT_VERSION, **(meta or {})}})
+
+    def _write_line(self, obj):
+        self.file.write(json.dumps(obj, ensure_ascii=False) + "\n")
+        self.file.flush()
+
+    def write(self, media_type, media_entry):
+        """
+        追加一个媒体条目。
+
+        Args:
+            media_type (str): "movie" 或 "tv_show"。
+            media_entry (dict): 与 media_index.json 中结构相同的条目（包含 path 和 files）。
+        """
+        self._write_line({"type": media_type, **media_entry})
+        self.counts[media_type] += 1
+
+    def close(self, complete=True):
+        """关闭文件。complete 为 True 时写入结束行，标记索引完整。"""
+        if self.file.closed:
+            return
+        if complete:
+            self._write_line({"_meta": {"complete": True, "movies": self.counts["movie"], "tv_shows": self.counts["tv_show"]}})
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close(complete=exc_type is None)
+
+def _iter_ndjson_lines(path, follow):
+    """逐行读取文件；跟随模式下在文件末尾等待新内容。产出完整的行（不含换行符）。"""
+    with open(path, 'r', encoding='utf-8') as f:
+        pending = ''
+        idle_since = time.monotonic()
+        while True:
+            chunk = f.readline()
+            if chunk:
+                idle_since = time.monotonic()
+                pending += chunk
+                if pending.endswith('\n'):
+                    yield pending.rstrip('\n')
+                    pending = ''
+                continue
+            # 已到达文件末尾
+            if not follow or time.monotonic() - idle_since > FOLLOW_IDLE_TIMEOUT:
+                break
+            time.sleep(FOLLOW_POLL_INTERVAL)
+        if pending.strip():
+            # 最后一行没有换行符：扫描可能被中断，只有能完整解析时才使用
+            yield pending
+
+def iter_media_index(path, follow=None):
+    """
+    逐个产出索引中的媒体条目，同时支持 media_index.json 和逐行格式。
+
+    逐行格式按需读取，内存占用与索引大小无关；未写完的最后一行会被忽略，
+    所以扫描中途或被中断的索引也可以直接使用。
+
+    Args:
+        path (str): 索引文件路径。
+        follow (bool): 是否等待扫描器继续写入（仅逐行格式）。默认取 FOLLOW_INDEX。
+
+    Yields:
+        tuple: (分组键, 条目)，分组键为 "movies" 或 "tv_shows"。
+
+    Raises:
+        FileNotFoundError: 文件不存在。
+        json.JSONDecodeError: 文件内容不是有效的 JSON。
+    """
+    if not is_ndjson_path(path):
+        with open(path, 'r', encoding='utf-8') as f:
+            media_data = json.load(f)
+        for media_type_key in ("movies", "tv_shows"):
+            for media_entry in media_data.get(media_type_key, []):
+                yield media_type_key, media_entry
+        return
+
+    if follow is None:
+        follow = FOLLOW_INDEX
+
+    lines = _iter_ndjson_lines(path, follow)
+    for line in lines:
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError:
+            if next(lines, None) is not None:
+                raise
+            # 只有最后一行解析失败：扫描被中断时留下的不完整行
+            print(f"警告: 索引 '{path}' 的最后一行不完整，已忽略。")
+            break
+
+        meta = record.get("_meta")
+        if meta is not None:
+            if meta.get("complete"):
+                break
+            continue
+
+        media_type = record.pop("type", None)
+        media_type_key = MEDIA_TYPE_KEYS.get(media_type)
+        if media_type_key is None:
+            print(f"警告: 索引 '{path}' 中存在未知类型的条目，已跳过：{media_type}")
+            continue
+        yield media_type_key, record
+
+def read_index_meta(path):
+    """
+    读取索引的元信息（例如分片信息）。media_index.json 中为顶层的 "_meta" 键，
+    逐行格式中为首行与结束行的 "_meta" 合并结果。没有元信息时返回空字典。
+    """
+    if not is_ndjson_path(path):
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f).get("_meta", {})
+
+    meta = {}
+    with open(path, 'r', encoding='utf-8') as f:
+        first_line = f.readline()
+        last_line = first_line
+        for line in f:
+            if line.strip():
+                last_line = line
+    for line in (first_line, last_line):
+        try:
+            meta.update(json.loads(line).get("_meta") or {})
+        except json.JSONDecodeError:
+            pass
+    return meta
+
+def load_media_index(path):
+    """读取整个索引，返回与 media_index.json 结构相同的字典。"""
+    media_data = {"movies": [], "tv_shows": []}
+    for media_type_key, media_entry in iter_media_index(path, follow=False):
+        media_data[media_type_key].append(media_entry)
+    return media_data
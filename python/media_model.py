@@ -0,0 +1,167 @@
+import re
+import sys
+from collections import defaultdict
+from collections.abc import Mapping
+
+# --- 文件分类 ---
+# 分类名即 media_index.json 中 files 字典的键。内存中每个文件只保存一个字节的分类编号。
+CATEGORY_NAMES = (
+    'tvshow_nfo', 'movie_nfo', 'season_nfo', 'nfo', 'strm',
+    'poster_image', 'fanart_image', 'season_banner_images', 'season_poster_images',
+    'ass', 'mediainfo_json', 'other_files',
+)
+(TVSHOW_NFO, MOVIE_NFO, SEASON_NFO, NFO, STRM,
+ POSTER_IMAGE, FANART_IMAGE, SEASON_BANNER_IMAGE, SEASON_POSTER_IMAGE,
+ ASS, MEDIAINFO_JSON, OTHER_FILE) = range(len(CATEGORY_NAMES))
+
+# 按完整文件名（小写）直接确定分类的文件
+_EXACT_FILENAMES = {
+    'tvshow.nfo': TVSHOW_NFO,
+    'movie.nfo': MOVIE_NFO,
+    'season.nfo': SEASON_NFO,
+    'folder.jpg': POSTER_IMAGE, 'cover.jpg': POSTER_IMAGE, 'movie.jpg': POSTER_IMAGE, 'poster.jpg': POSTER_IMAGE,
+    'banner.jpg': FANART_IMAGE, 'fanart.jpg': FANART_IMAGE,
+}
+# 特定季的图像，例如 season01-poster.jpg（与原先的 re.match 一样只匹配文件名开头）
+_SEASON_IMAGE_PATTERN = re.compile(r"season\d+-(banner|poster)\.jpg")
+
+def classify_filename(filename_lower):
+    """
+    返回文件（小写文件名）的分类编号，规则与扫描器原先的 if/elif 判断顺序一致：
+    特定 NFO > 其他 .nfo > .strm > 海报/背景图 > 季图像 > .ass > -mediainfo.json > 其他。
+    """
+    code = _EXACT_FILENAMES.get(filename_lower)
+    if code is not None:
+        return code
+    if filename_lower.endswith('.nfo'):
+        return NFO
+    if filename_lower.endswith('.strm'):
+        return STRM
+    match = _SEASON_IMAGE_PATTERN.match(filename_lower)
+    if match:
+        return SEASON_BANNER_IMAGE if match.group(1) == 'banner' else SEASON_POSTER_IMAGE
+    if filename_lower.endswith('.ass'):
+        return ASS
+    if filename_lower.endswith('-mediainfo.json'):
+        return MEDIAINFO_JSON
+    return OTHER_FILE
+
+# --- 自然排序键函数 ---
+def natural_sort_key(s):
+    """
+    为包含数字的字符串返回一个自然排序的键。
+    例如，"file10.txt" 会排在 "file2.txt" 之后。
+    在比较非数字部分时，会转换为小写以实现不区分大小写的排序。
+    """
+    def convert(text):
+        return int(text) if text.isdigit() else text.lower()
+    # 使用正则表达式将字符串分割成数字和非数字部分
+    # `([0-9]+)` 捕获一个或多个数字，re.split 会在捕获组处分割，并保留捕获组
+    # 例如："Day10.nfo" -> ["Day", "10", ".nfo"]
+    return [convert(c) for c in re.split('([0-9]+)', s)]
+
+# 同一目录的文件名拼接成一个字符串保存时使用的分隔符（文件名中不可能出现）
+_NAME_SEPARATOR = '\0'
+
+class MediaDir:
+    """
+    媒体项目中的一个目录：目录前缀、分组名、文件名和每个文件的分类编号。
+
+    前缀（如 "Season 1\\"）和分组名（如 "Season 1"）经过 sys.intern，
+    成千上万个剧集的同名季目录共用同一个字符串对象。
+    同一目录的文件名拼接为一个字符串，分类编号为每个文件一个字节，
+    省去了每个文件单独一个字符串对象的开销。
+    """
+
+    __slots__ = ("prefix", "group", "names", "codes")
+
+    def __init__(self, prefix, group, names):
+        self.prefix = sys.intern(prefix)
+        self.group = sys.intern(group)
+        self.names = _NAME_SEPARATOR.join(names)
+        self.codes = bytes(classify_filename(name.lower()) for name in names)
+
+    def __iter__(self):
+        """产出 (文件名, 分类编号)。"""
+        return zip(self.names.split(_NAME_SEPARATOR), self.codes)
+
+    def __len__(self):
+        return len(self.codes)
+
+class MediaEntry(Mapping):
+    """
+    紧凑的媒体条目：按目录保存文件名和分类编号，而不是每个文件的完整相对路径。
+
+    作为只读映射使用时与 media_index.json 中的条目一致（键为 "path" 和 "files"），
+    "files" 在访问时才生成；写入 JSON 时配合 json_default 使用。
+    """
+
+    __slots__ = ("type", "path", "dirs")
+
+    def __init__(self, media_type, path):
+        self.type = media_type
+        self.path = path
+        self.dirs = []
+
+    def add_dir(self, prefix, group, filenames):
+        """
+        归入一个目录中的文件。
+
+        Args:
+            prefix (str): 目录相对于媒体项目根目录的前缀（以 '\\' 结尾，根目录为空字符串）。
+            group (str): 剧集 NFO/STRM 的分组名（目录名；根目录为媒体项目目录名）。
+            filenames (list): 文件名列表。
+        """
+        if filenames:
+            self.dirs.append(MediaDir(prefix, group, filenames))
+
+    def files_dict(self):
+        """生成与 media_index.json 中 files[0] 结构相同的字典。"""
+        is_tv_show = self.type == "tv_show"
+        categorized = defaultdict(list)
+        episode_nfo = defaultdict(list)
+        episode_strm = defaultdict(list)
+
+        for media_dir in self.dirs:
+            prefix = media_dir.prefix
+            for name, code in media_dir:
+                if is_tv_show and code == NFO:
+                    episode_nfo[media_dir.group].append(prefix + name)
+                elif is_tv_show and code == STRM:
+                    episode_strm[media_dir.group].append(prefix + name)
+                else:
+                    categorized[CATEGORY_NAMES[code]].append(prefix + name)
+
+        # 只有一个文件的分类保存为字符串，多个文件保存为列表
+        files = {key: paths[0] if len(paths) == 1 else paths for key, paths in categorized.items()}
+        # 剧集的 NFO 和 STRM 按目录分组，组内自然排序
+        if episode_nfo:
+            files['nfo'] = [{group: sorted(paths, key=natural_sort_key)} for group, paths in episode_nfo.items()]
+        if episode_strm:
+            files['strm'] = [{group: sorted(paths, key=natural_sort_key)} for group, paths in episode_strm.items()]
+        return files
+
+    def to_dict(self):
+        return {"path": self.path, "files": [self.files_dict()]}
+
+    def __getitem__(self, key):
+        if key == "path":
+            return self.path
+        if key == "files":
+            return [self.files_dict()]
+        raise KeyError(key)
+
+    def __iter__(self):
+        return iter(("path", "files"))
+
+    def __len__(self):
+        return 2
+
+    def __repr__(self):
+        return f"MediaEntry({self.type!r}, {self.path!r}, {sum(len(d) for d in self.dirs)} files)"
+
+def json_default(obj):
+    """json.dump 的 default 参数：把 MediaEntry 转换为普通字典。"""
+    if isinstance(obj, MediaEntry):
+        return obj.to_dict()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
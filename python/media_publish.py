@@ -0,0 +1,393 @@
+import os
+import re
+import json
+import hashlib
+import urllib.parse
+from nfo_pipeline import index_path_to_local, iter_nfo_fields, PROGRESS_EVERY
+from nfo_reader import nfo_actors, nfo_studios
+from pinyin_keys import texts_pinyin_keys # 拼音检索键
+
+# --- 配置信息 ---
+# 前端使用的电影 / 剧集索引（movies_index.json、tvshows_index.json）的格式标识，写在顶层 "_meta" 中
+PUBLISHED_FORMAT_NAME = "mediahub-published"
+PUBLISHED_FORMAT_VERSION = 1
+# 海报 / 背景图的优先级，与 js/data.js 中 selectBestPoster / selectBestFanart 一致
+POSTER_PRIORITY = ('poster.jpg', 'movie.jpg', 'cover.jpg', 'folder.jpg')
+FANART_PRIORITY = ('fanart.jpg', 'banner.jpg')
+# 各分组中媒体项目（电影 / 剧集本身）NFO 的键，按优先级排列；只取第一个文件条目中的 NFO
+ITEM_NFO_KEYS = {"movies": ('movie_nfo', 'nfo'), "tv_shows": ('tvshow_nfo',)}
+# 评分保留的小数位数
+RATING_DIGITS = 1
+# 详情包（每个媒体项目一个 JSON）的子目录名，与 js/data.js 中的 DETAILS_DIR 对应。
+# 文件名由项目路径的哈希生成，按前两位分到子目录，避免单个目录中文件过多
+DETAILS_DIRNAME = "details"
+DETAIL_NAME_LENGTH = 16
+# 详情包需要的单集 NFO 字段：较大的单集 NFO 读到这几个顶层元素即停止解析（缺少 plot 时另取 outline，会读到文件末尾）
+EPISODE_NFO_FIELDS = ('title', 'episode', 'plot')
+
+_LEADING_NUMBER = re.compile(r'\d+(?:\.\d+)?')
+# 与 JavaScript 的 encodeURIComponent 相同的保留字符（另外保留 '/'），与 js/data.js 中 cleanPath 的结果一致
+_URL_SAFE_CHARS = "/!~*'()"
+
+def select_best_image(value, priority):
+    """
+    从 poster_image / fanart_image 的值（字符串或列表）中按优先级选出一个文件名，没有时返回 None。
+    """
+    if not value:
+        return None
+    if isinstance(value, str):
+        return value
+    if not isinstance(value, list):
+        return None
+    for name in priority:
+        if name in value:
+            return name
+    return value[0]
+
+def item_nfo_path(media_type_key, media_entry, base_path='.'):
+    """
+    索引条目中媒体项目 NFO 的本地路径；没有时返回 None。
+    电影取 movie_nfo / nfo（多个版本时取第一个），剧集取 tvshow_nfo。
+    """
+    files_info = media_entry.get('files') or []
+    if not files_info:
+        return None
+    for key in ITEM_NFO_KEYS.get(media_type_key, ()):
+        nfo = files_info[0].get(key)
+        if isinstance(nfo, list):
+            nfo = next((item for item in nfo if isinstance(item, str) and item), None)
+        if isinstance(nfo, str) and nfo:
+            return index_path_to_local(base_path, media_entry.get('path', ''), nfo)
+    return None
+
+def _number(value, digits=None):
+    """NFO 中的数值文本（例如 "7.5"、"120 min"）转为数字；无法识别时返回 None。"""
+    match = _LEADING_NUMBER.match(value.strip()) if value else None
+    if not match:
+        return None
+    number = float(match.group())
+    if digits is None:
+        return int(number)
+    return round(number, digits)
+
+def build_item_meta(fields):
+    """
+    由 NFO 字段生成写入已发布索引的精简元数据，只包含前端显示和搜索需要的内容，空值省略。
+
+    Returns:
+        dict: {"title", "year", "rating", "runtime", "genre", "actors", "studio"} 的子集。
+              actors 只有姓名（去掉 "-tmdb-" 后缀，与前端构建搜索索引时的处理相同）。
+    """
+    if not fields or "error" in fields:
+        return {}
+    actors = []
+    for name, _ in nfo_actors(fields):
+        name = name.split('-tmdb-')[0]
+        if name not in actors:
+            actors.append(name)
+    meta = {
+        "title": fields.get("title"),
+        "year": _number(fields.get("year")),
+        "rating": _number(fields.get("rating"), RATING_DIGITS),
+        "runtime": _number(fields.get("runtime")),
+        "genre": list(fields.get("genre", ())),
+        "actors": actors,
+        "studio": nfo_studios(fields),
+    }
+    return {key: value for key, value in meta.items() if value}
+
+def item_pinyin_keys(item_path, meta):
+    """
+    媒体项目的拼音检索键（见 pinyin_keys.pinyin_keys）：目录名、标题、演员和制片厂中含汉字的都生成全拼和首字母键，
+    前端按前缀匹配，输入 "lyb" 或 "langya" 即可找到《琅琊榜》。
+    """
+    texts = [item_path.replace('\\', '/').split('/')[-1], meta.get("title")]
+    keys = texts_pinyin_keys(texts)
+    # 演员名开头的多音字按姓氏读音（曾志伟 -> zengzhiwei）
+    for key in texts_pinyin_keys(meta.get("actors", []), person=True) + texts_pinyin_keys(meta.get("studio", [])):
+        if key not in keys:
+            keys.append(key)
+    return keys
+
+def _published_files(files_info):
+    """文件条目中的海报 / 背景图列表替换为选好的一张，前端无需再选择。"""
+    published = []
+    for file_entry in files_info:
+        file_entry = dict(file_entry)
+        for key, priority in (('poster_image', POSTER_PRIORITY), ('fanart_image', FANART_PRIORITY)):
+            if key in file_entry:
+                best = select_best_image(file_entry[key], priority)
+                if best:
+                    file_entry[key] = best
+                else:
+                    del file_entry[key]
+        published.append(file_entry)
+    return published
+
+def detail_bundle_name(item_path):
+    """详情包相对于详情目录的路径（以 '/' 分隔），由索引中的项目路径决定，多次生成时保持不变。"""
+    digest = hashlib.sha1(item_path.encode('utf-8')).hexdigest()[:DETAIL_NAME_LENGTH]
+    return f"{digest[:2]}/{digest}.json"
+
+def iter_season_episodes(media_entry):
+    """
+    产出剧集条目中每一季的 (季目录, [(单集 NFO 相对路径, STRM 相对路径或 None), ...])。
+    与前端的处理相同：单集 NFO 和 STRM 按季和位置一一对应。
+    """
+    files_info = media_entry.get('files') or []
+    if not files_info:
+        return
+    nfo_groups = files_info[0].get('nfo')
+    strm_groups = files_info[0].get('strm')
+    if not isinstance(nfo_groups, list):
+        return
+    for season_index, nfo_group in enumerate(nfo_groups):
+        if not isinstance(nfo_group, dict) or not nfo_group:
+            continue
+        season_name = next(iter(nfo_group))
+        nfo_paths = nfo_group[season_name]
+        if not isinstance(nfo_paths, list):
+            continue
+        strm_paths = []
+        if isinstance(strm_groups, list) and season_index < len(strm_groups) and isinstance(strm_groups[season_index], dict):
+            strm_paths = strm_groups[season_index].get(season_name) or []
+        yield season_name, [(nfo_path, strm_paths[i] if i < len(strm_paths) else None)
+                            for i, nfo_path in enumerate(nfo_paths)]
+
+def _episode_fields(fields):
+    """详情包只需要单集 NFO 中的这几个字段（读取时只要求 EPISODE_NFO_FIELDS），其余丢弃以节省内存。"""
+    if not fields or "error" in fields:
+        return None
+    return {"title": fields.get("title"), "episode": fields.get("episode"),
+            "plot": fields.get("plot") or fields.get("outline")}
+
+def load_people_images(summary_file):
+    """
+    读取 08generate_peoples_summary.py 生成的人物头像映射（{人物目录名: 图片路径}）。
+    文件不存在或无法解析时返回空字典。
+    """
+    try:
+        with open(summary_file, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        print(f"提示: 未找到 {summary_file}，详情包中的演员只使用 NFO 中的头像。")
+    except json.JSONDecodeError as e:
+        print(f"错误: 无法解析 {summary_file}: {e}，详情包中的演员只使用 NFO 中的头像。")
+    return {}
+
+class PeopleImageResolver:
+    """
+    按演员姓名查找头像，规则与前端 getPersonImage 相同：先按姓名精确匹配，
+    再匹配 "姓名-tmdb-ID" 形式的目录名（有 TMDb ID 时优先匹配同一 ID）。
+    """
+
+    def __init__(self, people_images):
+        self.people_images = people_images
+        self.first_tmdb_key = {}
+        for key in sorted(people_images):
+            name, sep, _ = key.partition('-tmdb-')
+            if sep:
+                self.first_tmdb_key.setdefault(name, key)
+
+    def resolve(self, name, tmdbid=None):
+        if name in self.people_images:
+            return self.people_images[name]
+        if tmdbid and f"{name}-tmdb-{tmdbid}" in self.people_images:
+            return self.people_images[f"{name}-tmdb-{tmdbid}"]
+        key = self.first_tmdb_key.get(name)
+        return self.people_images[key] if key else None
+
+def _actor_image(item_path, thumb, name, tmdbid, resolver):
+    """演员头像的最终地址：NFO 中的网址原样使用，相对路径拼接项目目录，没有时查人物头像映射。"""
+    if thumb:
+        if thumb.startswith(('http://', 'https://', 'data:')):
+            return thumb
+        return urllib.parse.quote(f"{item_path}\\{thumb}".replace('\\', '/'), safe=_URL_SAFE_CHARS)
+    return resolver.resolve(name, tmdbid)
+
+def build_detail_bundle(media_type_key, media_entry, fields, episode_fields, resolver):
+    """
+    生成一个媒体项目的详情包：详情页需要的全部内容，前端打开详情时只需请求这一个文件。
+
+    Args:
+        media_type_key (str): "movies" 或 "tv_shows"。
+        media_entry (dict): 索引条目。
+        fields (dict): 项目 NFO 的字段（见 read_nfo_fields），没有时为 None。
+        episode_fields (dict): {单集 NFO 在索引中的相对路径: _episode_fields 的结果}。
+        resolver (PeopleImageResolver): 人物头像查找。
+
+    Returns:
+        dict: build_item_meta 的字段，加上 plot、originaltitle、director、writer、
+              actors [{"name", "role", "image"}]，剧集另有 seasons [{"name", "episodes": [...]}]。
+    """
+    item_path = media_entry.get('path', '')
+    bundle = build_item_meta(fields)
+    if bundle:
+        actors = []
+        for name, tmdbid, role, thumb in fields.get("actors", ()):
+            actor = {"name": name.split('-tmdb-')[0], "role": role,
+                     "image": _actor_image(item_path, thumb, name, tmdbid, resolver)}
+            actors.append({key: value for key, value in actor.items() if value})
+        writers = list(dict.fromkeys(fields.get("writer", []) + fields.get("credits", [])))
+        extra = {"originaltitle": fields.get("originaltitle"), "plot": fields.get("plot") or fields.get("outline"),
+                 "director": fields.get("director"), "writer": writers, "actors": actors}
+        bundle.update((key, value) for key, value in extra.items() if value)
+
+    if media_type_key == "tv_shows":
+        seasons = []
+        for season_name, episodes in iter_season_episodes(media_entry):
+            season = []
+            for position, (nfo_path, strm_path) in enumerate(episodes, 1):
+                episode = episode_fields.get(nfo_path) or {}
+                season.append({key: value for key, value in {
+                    "title": episode.get("title") or os.path.splitext(nfo_path.replace('\\', '/').split('/')[-1])[0],
+                    "episode": episode.get("episode") or str(position),
+                    "plot": episode.get("plot"),
+                    "strm": f"{item_path}\\{strm_path}" if strm_path else None,
+                }.items() if value})
+            seasons.append({"name": season_name, "episodes": season})
+        bundle["seasons"] = seasons
+    return bundle
+
+def write_compact_json(path, data):
+    """
+    以紧凑格式写出 JSON（由浏览器下载）。内容与已有文件相同时不重写，保持修改时间不变（便于同步和浏览器缓存）。
+
+    Returns:
+        bool: 是否写入了文件。
+    """
+    content = json.dumps(data, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    try:
+        with open(path, 'rb') as f:
+            if f.read() == content:
+                return False
+    except FileNotFoundError:
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    temp_path = path + ".tmp"
+    with open(temp_path, 'wb') as f:
+        f.write(content)
+    os.replace(temp_path, path)
+    return True
+
+def remove_stale_files(directory, keep_names):
+    """删除目录中不在 keep_names（相对路径，以 '/' 分隔）中的文件和随之变空的子目录，返回删除的文件数量。"""
+    removed = 0
+    for dirpath, _, filenames in os.walk(directory, topdown=False):
+        for filename in filenames:
+            path = os.path.join(dirpath, filename)
+            if os.path.relpath(path, directory).replace(os.sep, '/') not in keep_names:
+                os.remove(path)
+                removed += 1
+        if dirpath != directory and not os.listdir(dirpath):
+            os.rmdir(dirpath)
+    return removed
+
+def build_published_indexes(media_data, base_path='.', workers=None, progress=False,
+                            details_dir=None, people_images=None, index_builders=()):
+    """
+    生成前端使用的电影 / 剧集索引：每个条目增加 "id"（电影在前、剧集在后的序号）、"meta"（见 build_item_meta）
+    和 "pinyin"（拼音检索键，见 item_pinyin_keys，没有时省略），海报 / 背景图预先选好。
+    "meta" 只包含 NFO 中的字段，每个条目都有：没有 NFO 或 NFO 无法读取的条目为空字典。
+    前端按条目是否有 "meta" 字段（而不是其内容）判断索引是否已嵌入元数据，见 js/data.js 中的 embeddedMetadata。
+
+    指定 details_dir 时，同时为每个项目写出详情包（见 build_detail_bundle），条目中的 "detail" 为详情包的相对路径，
+    并删除目录中已不存在的项目的详情包。
+
+    项目 NFO 和单集 NFO 一起读取，每个 NFO 只读取一次（经过 nfo_cache，未命中时并行解析）。
+
+    Args:
+        media_data (dict): 与 media_index.json 结构相同的完整索引，不会被修改。
+        base_path (str): 索引中的路径相对的媒体库根目录。
+        workers (int): 解析 NFO 的进程数，默认 NFO_PARSE_WORKERS。
+        progress (bool): 是否在控制台原地显示进度。
+        details_dir (str): 详情包输出目录，为 None 时不生成详情包。
+        people_images (dict): 人物头像映射（见 load_people_images），用于详情包中的演员头像。
+        index_builders (list): 由全部项目生成的索引（倒排索引 search_index.SearchIndexBuilder、
+            反向索引 entity_index.EntityIndexBuilder 等）。每个项目按 ID 顺序以
+            add_item(ID, 项目路径, NFO 字段, meta, 拼音检索键) 加入各构建器，写出由调用方负责。
+
+    Returns:
+        tuple: ({"_meta": ..., "movies": [...]}, {"_meta": ..., "tv_shows": [...]}, 统计)
+               统计包含 items、with_nfo、missing、errors，生成详情包时另有 details_written、details_unchanged、details_removed。
+    """
+    entries = []            # [(分组键, 原始条目, 发布条目, 项目 NFO 路径)]
+    item_nfo_paths = set()
+    episode_nfo_paths = set()
+    published = {}
+    for media_type_key in ("movies", "tv_shows"):
+        published[media_type_key] = []
+        for media_entry in media_data.get(media_type_key, []):
+            entry = {"id": len(entries), **media_entry,
+                     "files": _published_files(media_entry.get('files') or []), "meta": {}}
+            published[media_type_key].append(entry)
+            nfo_path = item_nfo_path(media_type_key, media_entry, base_path)
+            entries.append((media_type_key, media_entry, entry, nfo_path))
+            if nfo_path:
+                item_nfo_paths.add(nfo_path)
+            if details_dir is not None and media_type_key == "tv_shows":
+                for _, episodes in iter_season_episodes(media_entry):
+                    episode_nfo_paths.update(index_path_to_local(base_path, media_entry.get('path', ''), nfo)
+                                             for nfo, _ in episodes)
+
+    item_fields = {}
+    episode_fields = {}
+    # 只作为单集 NFO 的文件只读取详情包需要的字段：较大的单集 NFO 读到这些字段即停止解析
+    passes = ((sorted(item_nfo_paths), None), (sorted(episode_nfo_paths - item_nfo_paths), EPISODE_NFO_FIELDS))
+    total = len(item_nfo_paths | episode_nfo_paths)
+    done = 0
+    for nfo_paths, wanted in passes:
+        for nfo_path, fields in iter_nfo_fields(nfo_paths, workers, wanted):
+            done += 1
+            if nfo_path in item_nfo_paths:
+                item_fields[nfo_path] = fields
+            if nfo_path in episode_nfo_paths:
+                episode_fields[nfo_path] = _episode_fields(fields)
+            if progress and (done % PROGRESS_EVERY == 0 or done == total):
+                print(f"已读取 {done}/{total} 个 NFO。", end='\r')
+
+    stats = {"items": len(entries), "with_nfo": 0, "missing": 0, "errors": 0}
+    for nfo_path in item_nfo_paths:
+        fields = item_fields.get(nfo_path)
+        if fields is None:
+            stats["missing"] += 1
+        elif "error" in fields:
+            stats["errors"] += 1
+
+    keep_names = set()
+    if details_dir is not None:
+        resolver = PeopleImageResolver(people_images or {})
+        stats.update(details_written=0, details_unchanged=0, details_removed=0)
+    for media_type_key, media_entry, entry, nfo_path in entries:
+        fields = item_fields.get(nfo_path)
+        entry["meta"] = build_item_meta(fields)
+        if entry["meta"]:
+            stats["with_nfo"] += 1
+        pinyin = item_pinyin_keys(media_entry.get('path', ''), entry["meta"])
+        if pinyin:
+            entry["pinyin"] = pinyin
+        for builder in index_builders:
+            builder.add_item(entry["id"], media_entry.get('path', ''), fields, entry["meta"], pinyin)
+        if details_dir is None:
+            continue
+        # 单集 NFO 的键为本地路径，与 iter_season_episodes 中的相对路径对应
+        local_episode_fields = {}
+        for _, episodes in iter_season_episodes(media_entry):
+            for nfo, _ in episodes:
+                local_episode_fields[nfo] = episode_fields.get(
+                    index_path_to_local(base_path, media_entry.get('path', ''), nfo))
+        bundle = build_detail_bundle(media_type_key, media_entry, fields, local_episode_fields, resolver)
+        name = detail_bundle_name(media_entry.get('path', ''))
+        keep_names.add(name)
+        entry["detail"] = name
+        if write_compact_json(os.path.join(details_dir, *name.split('/')), bundle):
+            stats["details_written"] += 1
+        else:
+            stats["details_unchanged"] += 1
+    if details_dir is not None:
+        # 已不在索引中的项目的详情包
+        stats["details_removed"] = remove_stale_files(details_dir, keep_names)
+
+    index_meta = {"format": PUBLISHED_FORMAT_NAME, "version": PUBLISHED_FORMAT_VERSION}
+    return ({"_meta": index_meta, "movies": published["movies"]},
+            {"_meta": index_meta, "tv_shows": published["tv_shows"]},
+            stats)
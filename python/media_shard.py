@@ -0,0 +1,85 @@
+import re
+import zlib
+
+# --- 配置信息 ---
+# 哈希分片按相对路径的前几级目录计算。媒体库通常是 "分类/影片" 两级结构，
+# 取 2 级可以把各分类下的影片均匀分散到各个分片，而每个媒体项目只会落在一个分片中。
+SHARD_DEPTH = 2
+
+class ShardSpec:
+    """
+    扫描分片规则：把媒体库按目录划分给多台机器（或多个进程）分别扫描，之后再合并。
+
+    支持两种划分方式，可以同时使用：
+    - 哈希分片 "i/N"：对前 SHARD_DEPTH 级目录的相对路径做 CRC32，余数为 i 的归本分片；
+    - 顶级目录列表：只扫描列出的顶级目录（例如挂在本机磁盘上的那几个）。
+
+    哈希使用 CRC32 而不是 hash()，保证不同机器、不同 Python 进程的划分结果一致。
+    """
+
+    def __init__(self, index=0, count=1, top_dirs=None, depth=SHARD_DEPTH):
+        if count < 1 or not 0 <= index < count:
+            raise ValueError(f"无效的分片编号: {index}/{count}")
+        self.index = index
+        self.count = count
+        self.top_dirs = set(top_dirs) if top_dirs else None
+        self.depth = depth
+
+    @classmethod
+    def parse(cls, spec, top_dirs=None):
+        """
+        解析 "i/N" 形式的分片规则（i 从 0 开始）。spec 为空时只按 top_dirs 划分。
+
+        Raises:
+            ValueError: 格式不正确。
+        """
+        if not spec:
+            return cls(top_dirs=top_dirs)
+        match = re.fullmatch(r"\s*(\d+)\s*/\s*(\d+)\s*", spec)
+        if not match:
+            raise ValueError(f"无效的分片规则 '{spec}'，应为 i/N 的形式，例如 0/4")
+        return cls(int(match.group(1)), int(match.group(2)), top_dirs=top_dirs)
+
+    def __str__(self):
+        parts = []
+        if self.count > 1:
+            parts.append(f"{self.index}/{self.count}")
+        if self.top_dirs:
+            parts.append("+".join(sorted(self.top_dirs)))
+        return " ".join(parts) or "all"
+
+    def label(self):
+        """用于分片输出文件名的标签，例如 "2of8"。"""
+        if self.count > 1:
+            return f"{self.index}of{self.count}"
+        return re.sub(r'[<>:"/\\|?*\s]+', '_', "+".join(sorted(self.top_dirs or ["all"])))
+
+    def _hash_owner(self, parts):
+        key = "/".join(parts[:self.depth])
+        return zlib.crc32(key.encode('utf-8')) % self.count
+
+    def may_contain(self, parts):
+        """
+        相对路径（按目录拆分的列表）所指的目录中是否可能有属于本分片的媒体项目。
+        返回 False 的目录可以整棵子树跳过。
+        """
+        if self.top_dirs is not None and parts and parts[0] not in self.top_dirs:
+            return False
+        if self.count > 1 and len(parts) >= self.depth:
+            return self._hash_owner(parts) == self.index
+        return True
+
+    def owns(self, parts):
+        """以该目录为根的媒体项目是否属于本分片。"""
+        if self.top_dirs is not None and (not parts or parts[0] not in self.top_dirs):
+            return False
+        if self.count > 1:
+            return self._hash_owner(parts) == self.index
+        return True
+
+    def meta(self):
+        """写入分片索引元信息的字典，合并工具据此检查分片是否齐全。"""
+        meta = {"index": self.index, "count": self.count}
+        if self.top_dirs:
+            meta["top_dirs"] = sorted(self.top_dirs)
+        return meta
@@ -0,0 +1,186 @@
+import os
+import io_throttle # 按挂载点节流
+import fs_trace # 文件系统操作耗时追踪
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+# --- 配置信息 ---
+# 并发列目录的线程数。本地磁盘上收益有限；
+# 对 rclone/AList/WebDAV 等网络挂载盘，每次 readdir 都有几十到几百毫秒的延迟，可以适当调大。
+DEFAULT_WALK_WORKERS = int(os.environ.get("MEDIAHUB_WALK_WORKERS", "16"))
+
+# 单个目录的列举结果
+# dirnames: 子目录名列表（与 os.walk 一致，指向目录的符号链接也算作目录）
+# filenames: 文件名列表
+# symlink_dirnames: dirnames 中属于符号链接的名称集合，用于在不跟随链接时跳过它们
+# meta: 可选，名称 -> (大小, 修改时间戳)。远程列目录接口（如 AList）会一并返回这些信息
+DirListing = namedtuple('DirListing', ['dirnames', 'filenames', 'symlink_dirnames', 'meta'], defaults=(None,))
+
+def scandir_listing(path):
+    """
+    使用 os.scandir 列出单个目录。
+    DirEntry 会缓存 readdir 返回的文件类型，绝大多数条目无需额外的 stat 调用即可区分文件和目录。
+
+    Args:
+        path (str): 要列出的目录。
+
+    Returns:
+        DirListing: 目录的列举结果。
+    """
+    dirnames = []
+    filenames = []
+    symlink_dirnames = set()
+    with os.scandir(path) as it:
+        for entry in it:
+            try:
+                is_dir = entry.is_dir()
+            except OSError:
+                is_dir = False
+            if is_dir:
+                dirnames.append(entry.name)
+                if entry.is_symlink():
+                    symlink_dirnames.add(entry.name)
+            else:
+                filenames.append(entry.name)
+    return DirListing(dirnames, filenames, symlink_dirnames)
+
+def _apply_ignore(ignore, ignore_root, dirpath, dirnames, filenames):
+    """按忽略规则过滤一个目录的列举结果。规则中的路径相对于 ignore_root，并使用 "/" 分隔。"""
+    rel_dir = os.path.relpath(dirpath, ignore_root)
+    prefix = '' if rel_dir == '.' else rel_dir.replace(os.sep, '/') + '/'
+    dirnames = [d for d in dirnames if not ignore.is_ignored(prefix + d, is_dir=True)]
+    filenames = [f for f in filenames if not ignore.is_ignored(prefix + f)]
+    return dirnames, filenames
+
+def _identified_lister(lister):
+    """
+    包装列目录函数，同时返回目录的物理标识 (st_dev, st_ino)。
+    os.stat 会跟随符号链接，因此经由不同链接到达的同一目录得到相同的标识。
+    """
+    def list_with_identity(path):
+        with fs_trace.timed("stat_dir", path):
+            st = os.stat(path)
+        return lister(path), (st.st_dev, st.st_ino)
+    return list_with_identity
+
+def _mount_throttled_lister(lister, top, resolve_links):
+    """
+    包装列目录函数，按每个目录所在的挂载点选择调度器（io_throttle.throttle_for 按挂载点共享调度器）：
+    位于其他挂载点的子目录和跟随的符号链接计入该挂载点自己的配额，而不是 top 所在挂载点的。
+
+    未跟随符号链接时，目录的真实路径由 top 的真实路径拼接相对路径得到，不需要额外的系统调用；
+    跟随符号链接时（resolve_links 为 True）每个目录都用 os.path.realpath 解析。
+    """
+    real_top = os.path.realpath(top)
+    wrapped = {}
+
+    def list_throttled(path):
+        if resolve_links:
+            real_path = os.path.realpath(path)
+        else:
+            real_path = os.path.normpath(os.path.join(real_top, os.path.relpath(path, top)))
+        throttle = io_throttle.throttle_for(real_path)
+        if not throttle:
+            return lister(path)
+        throttled = wrapped.get(throttle)
+        if throttled is None:
+            throttled = wrapped.setdefault(throttle, throttle.wrap(lister))
+        return throttled(path)
+    return list_throttled
+
+def walk(top, max_workers=None, followlinks=False, onerror=None, lister=scandir_listing, ignore=None,
+         onduplicate=None, throttle=None, ignore_root=None):
+    """
+    并发版的 os.walk（仅支持自顶向下模式），可直接替换 `os.walk(top)`。
+
+    目录列举在有界线程池中并发执行，但产出顺序与 os.walk 自顶向下的深度优先顺序完全一致，
+    因此依赖遍历顺序的调用方（例如按子树连续性归类文件的扫描器）行为不变。
+    与 os.walk 一样，调用方可以就地修改产出的 dirnames 来裁剪遍历。
+
+    Args:
+        top (str): 开始遍历的根目录。
+        max_workers (int): 并发列目录的线程数，默认为 DEFAULT_WALK_WORKERS。
+        followlinks (bool): 是否进入指向目录的符号链接。为 True 时按 (st_dev, st_ino) 记录已访问的目录，
+            每个物理目录只产出一次（以深度优先顺序中最先到达的路径为准），链接形成的环路也会被切断。
+        onerror (callable): 列目录失败时以 OSError 为参数调用；为 None 时忽略错误。
+        lister (callable): 列出单个目录的函数，返回 DirListing。
+        ignore (IgnoreRules): 忽略规则（见 ignore_rules）。被忽略的子目录在产出前就从 dirnames 中移除，
+            不会被列举；被忽略的文件不会出现在 filenames 中。
+        onduplicate (callable): followlinks 为 True 时，遇到已访问过的物理目录以 (路径, 首次访问的路径) 为参数调用。
+        throttle (IoThrottle): 列目录使用的节流调度器。默认按每个目录所在的挂载点从 io_throttle 取得
+            （lister 有 throttle_key 属性时，例如 AList 地址，全部目录共用该后端的调度器）；传入 False 则不节流。
+            没有配置任何限制（见 io_throttle.limits_configured）时 lister 原样使用。
+        ignore_root (str): 忽略规则中路径所相对的根目录，默认为 top。只遍历媒体库的一部分时传入媒体库根目录。
+
+    Yields:
+        tuple: (dirpath, dirnames, filenames)
+    """
+    if max_workers is None:
+        max_workers = DEFAULT_WALK_WORKERS
+    # 预取窗口：只为深度优先栈顶附近的目录提前提交列举任务，
+    # 既能让线程池保持繁忙，又避免一次性提交整棵树造成内存膨胀。
+    prefetch = max(1, max_workers * 4)
+
+    if ignore_root is None:
+        ignore_root = top
+
+    if throttle is None and getattr(lister, "throttle_key", None):
+        # 未配置限制时为 False：远程后端的目录不按本地挂载点节流
+        throttle = io_throttle.throttle_for(lister.throttle_key) or False
+    # 追踪记录的是列目录本身的耗时，不包括节流等待
+    lister = fs_trace.traced("readdir", lister)
+    if throttle is None:
+        # 没有配置任何限制时不包装：否则每个目录都要查一次挂载点（跟随链接时还要 realpath），结果总是不节流
+        if io_throttle.limits_configured():
+            lister = _mount_throttled_lister(lister, top, followlinks)
+    elif throttle:
+        lister = throttle.wrap(lister)
+
+    # 已访问的物理目录：(st_dev, st_ino) -> 首次到达该目录的路径
+    visited = None
+    if followlinks:
+        visited = {}
+        lister = _identified_lister(lister)
+
+    executor = ThreadPoolExecutor(max_workers=max(1, max_workers), thread_name_prefix="media-walk")
+    # 栈中的每个节点为 [目录路径, Future 或 None]
+    stack = [[top, None]]
+    try:
+        while stack:
+            for node in stack[-1:-prefetch - 1:-1]:
+                if node[1] is None:
+                    node[1] = executor.submit(lister, node[0])
+
+            dirpath, future = stack.pop()
+            try:
+                listing = future.result()
+            except OSError as e:
+                if onerror is not None:
+                    onerror(e)
+                continue
+
+            if visited is not None:
+                listing, identity = listing
+                first_path = visited.setdefault(identity, dirpath)
+                if first_path != dirpath:
+                    # 同一物理目录已经遍历过（重复链接或指向祖先目录的环路），跳过整棵子树
+                    if onduplicate is not None:
+                        onduplicate(dirpath, first_path)
+                    continue
+
+            dirnames = listing.dirnames
+            filenames = listing.filenames
+            if ignore:
+                dirnames, filenames = _apply_ignore(ignore, ignore_root, dirpath, dirnames, filenames)
+            yield dirpath, dirnames, filenames
+
+            # 调用方可能已经就地修改了 dirnames，这里按修改后的结果继续向下遍历
+            children = [
+                os.path.join(dirpath, d) for d in dirnames
+                if followlinks or d not in listing.symlink_dirnames
+            ]
+            # 逆序入栈，保证出栈顺序与 dirnames 顺序一致
+            stack.extend([child, None] for child in reversed(children))
+    finally:
+        # 提前结束遍历（break 或异常）时，不等待尚未开始的列举任务
+        executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,187 @@
+import os
+import sys
+import time
+import errno
+import select
+import struct
+import ctypes
+import ctypes.util
+
+import media_walker # 并发目录遍历
+import io_throttle # 查询挂载点的文件系统类型
+
+# --- 配置信息 ---
+# 收到事件后，等待目录安静这么多秒再处理，避免复制大量文件时反复重扫
+WATCH_DEBOUNCE = 2.0
+# 单批事件最多等待的时长（秒）。持续有写入时也会按此间隔处理一次
+WATCH_MAX_BATCH_DELAY = 30.0
+# 网络挂载盘上的文件系统类型前缀：inotify 无法收到远端的变更，改用轮询
+NETWORK_FSTYPE_PREFIXES = ('fuse', 'nfs', 'cifs', 'smb', 'davfs', '9p', 'sshfs', 'afs', 'ceph', 'glusterfs')
+
+# inotify 常量（见 <sys/inotify.h>）
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_ISDIR = 0x40000000
+IN_CLOEXEC = 0o2000000
+
+# 扫描器只关心目录中的名称，文件内容的修改不影响索引
+WATCH_MASK = IN_CREATE | IN_DELETE | IN_MOVED_FROM | IN_MOVED_TO | IN_DELETE_SELF | IN_MOVE_SELF | IN_ONLYDIR
+
+_EVENT_HEADER = struct.Struct('iIII')
+
+def _load_libc():
+    if not sys.platform.startswith('linux'):
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        libc.inotify_init1
+    except (OSError, AttributeError):
+        return None
+    libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+    libc.inotify_rm_watch.argtypes = [ctypes.c_int, ctypes.c_int]
+    return libc
+
+_libc = _load_libc()
+
+def inotify_available():
+    """当前系统是否支持 inotify。"""
+    return _libc is not None
+
+def is_network_mount(path):
+    """path 是否位于网络挂载盘（FUSE/NFS/SMB/WebDAV 等）上。"""
+    fstype = io_throttle.mount_fstype(path)
+    return fstype is not None and fstype.startswith(NETWORK_FSTYPE_PREFIXES)
+
+class InotifyWatcher:
+    """
+    用 inotify 递归监视一个目录树，产出发生变化的 (目录, 名称, 是否为目录)。
+
+    inotify 的监视不会自动覆盖新建的子目录，新目录出现时会为其子树补充监视；
+    监视数量超过系统上限（fs.inotify.max_user_watches）时构造函数抛出 OSError，
+    调用方应回退到轮询。
+    """
+
+    def __init__(self, root, ignore=None, followlinks=False):
+        if _libc is None:
+            raise OSError(errno.ENOSYS, "当前系统不支持 inotify")
+        self.root = os.path.abspath(root)
+        self.ignore = ignore
+        self.followlinks = followlinks
+        self.fd = _libc.inotify_init1(IN_CLOEXEC)
+        if self.fd < 0:
+            e = ctypes.get_errno()
+            raise OSError(e, os.strerror(e))
+        # 监视描述符 -> 目录路径
+        self.paths = {}
+        try:
+            self.add_tree(self.root)
+        except OSError:
+            self.close()
+            raise
+
+    def _is_ignored(self, path, is_dir):
+        if not self.ignore:
+            return False
+        rel = os.path.relpath(path, self.root).replace(os.sep, '/')
+        return self.ignore.is_ignored(rel, is_dir=is_dir)
+
+    def _add_watch(self, path):
+        wd = _libc.inotify_add_watch(self.fd, os.fsencode(path), WATCH_MASK)
+        if wd < 0:
+            e = ctypes.get_errno()
+            if e in (errno.ENOENT, errno.ENOTDIR):
+                # 目录在加入监视前已被删除
+                return
+            raise OSError(e, f"{os.strerror(e)}: {path}")
+        self.paths[wd] = path
+
+    def add_tree(self, top):
+        """为 top 及其所有子目录添加监视，忽略规则与扫描时相同。"""
+        for dirpath, _, _ in media_walker.walk(top, followlinks=self.followlinks, ignore=self.ignore,
+                                                ignore_root=self.root, throttle=False):
+            self._add_watch(dirpath)
+
+    def _remove_tree(self, top):
+        """目录被移出时，移除其子树上的监视（移走的目录仍会以旧路径上报事件）。"""
+        prefix = os.path.join(top, '')
+        for wd, path in list(self.paths.items()):
+            if path == top or path.startswith(prefix):
+                _libc.inotify_rm_watch(self.fd, wd)
+                del self.paths[wd]
+
+    def _read_events(self):
+        data = os.read(self.fd, 64 * 1024)
+        changes = []
+        overflow = False
+        offset = 0
+        while offset + _EVENT_HEADER.size <= len(data):
+            wd, mask, _, name_len = _EVENT_HEADER.unpack_from(data, offset)
+            offset += _EVENT_HEADER.size
+            name = os.fsdecode(data[offset:offset + name_len].rstrip(b'\0'))
+            offset += name_len
+
+            if mask & IN_Q_OVERFLOW:
+                overflow = True
+                continue
+            dirpath = self.paths.get(wd)
+            if mask & IN_IGNORED:
+                self.paths.pop(wd, None)
+                continue
+            if dirpath is None:
+                continue
+            if mask & (IN_DELETE_SELF | IN_MOVE_SELF):
+                if dirpath == self.root:
+                    overflow = True
+                continue
+
+            is_dir = bool(mask & IN_ISDIR)
+            child = os.path.join(dirpath, name)
+            if self._is_ignored(child, is_dir):
+                continue
+            if is_dir:
+                if mask & IN_MOVED_FROM:
+                    self._remove_tree(child)
+                elif mask & (IN_CREATE | IN_MOVED_TO):
+                    try:
+                        self.add_tree(child)
+                    except OSError as e:
+                        print(f"警告: 无法监视新目录 '{child}'：{e}")
+            changes.append((dirpath, name, is_dir))
+        return changes, overflow
+
+    def wait(self, debounce=WATCH_DEBOUNCE, max_delay=WATCH_MAX_BATCH_DELAY):
+        """
+        阻塞直到有变化，并等待目录安静 debounce 秒（最长 max_delay 秒）后返回一批事件。
+
+        Returns:
+            tuple: (changes, overflow)。changes 为去重后的 [(目录, 名称, 是否为目录)]；
+                   overflow 为 True 表示事件队列溢出或根目录被移走，调用方应完整重扫。
+        """
+        changes = {}
+        overflow = False
+        select.select([self.fd], [], [])
+        first_event = time.monotonic()
+        while True:
+            batch, batch_overflow = self._read_events()
+            overflow = overflow or batch_overflow
+            for dirpath, name, is_dir in batch:
+                changes[(dirpath, name)] = is_dir
+            remaining = max_delay - (time.monotonic() - first_event)
+            if remaining <= 0:
+                break
+            ready, _, _ = select.select([self.fd], [], [], min(debounce, remaining))
+            if not ready:
+                break
+        return [(dirpath, name, is_dir) for (dirpath, name), is_dir in changes.items()], overflow
+
+    def close(self):
+        if self.fd >= 0:
+            os.close(self.fd)
+            self.fd = -1
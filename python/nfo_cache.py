@@ -0,0 +1,149 @@
+import os
+import json
+import atexit
+import sqlite3
+import threading
+from nfo_reader import NFO_FIELDS_VERSION, read_nfo_fields # NFO 读取和字段提取
+
+# --- 配置信息 ---
+# 缓存数据库文件名（保存在脚本目录下）。可以用环境变量 MEDIAHUB_NFO_CACHE 指定其他路径，
+# 设置为空字符串则不使用缓存，每次都重新解析。
+NFO_CACHE_FILENAME = "nfo_cache.sqlite3"
+NFO_CACHE_PATH = os.environ.get("MEDIAHUB_NFO_CACHE",
+                                os.path.join(os.path.dirname(os.path.abspath(__file__)), NFO_CACHE_FILENAME))
+# 每写入多少条新解析的结果提交一次事务
+NFO_CACHE_COMMIT_EVERY = 1000
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS nfo (
+    path TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    version INTEGER NOT NULL,
+    fields TEXT NOT NULL
+)
+"""
+
+def normalize_path(path):
+    """绝对路径，Windows 下不区分大小写。"""
+    return os.path.normcase(os.path.abspath(path))
+
+def cache_key(path, wanted=None):
+    """
+    缓存键：规范化路径。只提取部分字段（wanted，见 nfo_reader.extract_nfo_fields）的结果可能不完整，
+    键后附加所需字段单独保存，不会被当作完整结果返回给其他调用方。
+    """
+    key = normalize_path(path)
+    if wanted:
+        key += "?" + ",".join(sorted(wanted))
+    return key
+
+class NfoCache:
+    """
+    以 (规范化路径, 文件大小, 修改时间) 为键、保存在 SQLite 中的 NFO 字段缓存。
+
+    文件大小和修改时间都没有变化时直接返回缓存的字段，只需一次 stat；
+    否则重新解析并更新缓存。下游脚本都通过它读取 NFO，重复运行时只解析发生变化的文件。
+    """
+
+    def __init__(self, path=NFO_CACHE_PATH):
+        self.path = path
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.pending = 0
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.execute(_SCHEMA)
+        self.db.commit()
+
+    def lookup(self, nfo_file_path, wanted=None):
+        """
+        只查询缓存，不解析。wanted 为解析时只需要的字段，与 store 时一致。
+
+        Returns:
+            tuple: (字段, stat)。命中时返回缓存的字段；未命中时字段为 None，之后用 store 写入解析结果；
+                   文件不存在时两者都为 None；无法读取时字段为 {"error": 错误信息}、stat 为 None。
+        """
+        try:
+            st = os.stat(nfo_file_path)
+        except FileNotFoundError:
+            return None, None
+        except OSError as e:
+            return {"error": f"无法读取: {e}"}, None
+
+        key = cache_key(nfo_file_path, wanted)
+        with self.lock:
+            row = self.db.execute("SELECT size, mtime_ns, version, fields FROM nfo WHERE path = ?", (key,)).fetchone()
+        if row is not None and row[0] == st.st_size and row[1] == st.st_mtime_ns and row[2] == NFO_FIELDS_VERSION:
+            self.hits += 1
+            return json.loads(row[3]), st
+        return None, st
+
+    def store(self, nfo_file_path, st, fields, wanted=None):
+        """写入解析结果。st 为解析前 lookup 返回的 stat，文件在解析期间被修改时下次会重新解析。"""
+        key = cache_key(nfo_file_path, wanted)
+        with self.lock:
+            self.misses += 1
+            self.db.execute("INSERT OR REPLACE INTO nfo (path, size, mtime_ns, version, fields) VALUES (?, ?, ?, ?, ?)",
+                            (key, st.st_size, st.st_mtime_ns, NFO_FIELDS_VERSION, json.dumps(fields, ensure_ascii=False)))
+            self.pending += 1
+            if self.pending >= NFO_CACHE_COMMIT_EVERY:
+                self.db.commit()
+                self.pending = 0
+
+    def read(self, nfo_file_path):
+        """
+        返回 NFO 的字段（见 nfo_reader.read_nfo_fields）。文件不存在时返回 None。
+        """
+        fields, st = self.lookup(nfo_file_path)
+        if fields is not None or st is None:
+            return fields
+        fields = read_nfo_fields(nfo_file_path)
+        if fields is not None:
+            self.store(nfo_file_path, st, fields)
+        return fields
+
+    def close(self):
+        with self.lock:
+            if self.db is None:
+                return
+            self.db.commit()
+            self.db.close()
+            self.db = None
+
+    def summary(self):
+        return f"NFO 缓存: 命中 {self.hits}，重新解析 {self.misses}（{self.path}）"
+
+_shared_cache = None
+_shared_lock = threading.Lock()
+
+def get_shared_cache():
+    """
+    返回进程内共享的缓存（首次调用时打开）。缓存不可用（未配置或数据库无法打开）时返回 None。
+    """
+    global _shared_cache
+    if _shared_cache is None and NFO_CACHE_PATH:
+        with _shared_lock:
+            if _shared_cache is None:
+                try:
+                    _shared_cache = NfoCache(NFO_CACHE_PATH)
+                    atexit.register(_shared_cache.close)
+                except sqlite3.Error as e:
+                    print(f"警告: 无法打开 NFO 缓存 '{NFO_CACHE_PATH}'（{e}），将直接解析 NFO。")
+                    _shared_cache = False
+    return _shared_cache or None
+
+def read_nfo(nfo_file_path):
+    """
+    通过进程内共享的缓存读取 NFO 字段。缓存不可用时直接解析。
+    """
+    cache = get_shared_cache()
+    if cache is None:
+        return read_nfo_fields(nfo_file_path)
+    return cache.read(nfo_file_path)
+
+def cache_summary():
+    """共享缓存的命中统计；未使用缓存时返回 None。"""
+    return _shared_cache.summary() if _shared_cache else None
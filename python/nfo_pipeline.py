@@ -0,0 +1,276 @@
+import os
+import fs_trace # 文件系统操作耗时追踪
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from concurrent.futures.process import BrokenProcessPool
+from media_index_io import iter_media_index # 索引读取（支持逐行格式）
+from nfo_cache import get_shared_cache # NFO 字段缓存
+from nfo_reader import read_nfo_fields, nfo_actors, nfo_studios
+
+# --- 配置信息 ---
+# 索引条目 files 中保存 NFO 的键。剧集的 "nfo" 为 [{季目录: [单集NFO, ...]}, ...]，其余为字符串或字符串列表。
+NFO_INDEX_KEYS = ('movie_nfo', 'tvshow_nfo', 'season_nfo', 'nfo')
+# 作为媒体项目（而不是单集 / 季）的 NFO 根标签，标题列表只收录这些 NFO
+ITEM_NFO_ROOTS = ('movie', 'tvshow')
+# 扫描时每处理多少个 NFO 刷新一次控制台进度
+PROGRESS_EVERY = 50
+# 解析 NFO 的进程数。XML 解析受 GIL 限制，多线程没有帮助，因此使用多进程。
+# 可以用环境变量 MEDIAHUB_NFO_WORKERS 指定，设置为 1 则在主进程中逐个解析。
+NFO_PARSE_WORKERS = int(os.environ.get("MEDIAHUB_NFO_WORKERS", "0")) or os.cpu_count() or 1
+# 每个工作单元包含的 NFO 数量：太小时进程间通信开销占比高，太大时负载不均衡
+NFO_PARSE_CHUNK_SIZE = 200
+# 需要解析的 NFO（缓存未命中）少于该数量时直接在主进程中解析，启动进程池反而更慢
+NFO_PARALLEL_MIN = 2000
+
+def index_path_to_local(base_path, *parts):
+    """
+    把索引中的相对路径拼接为本地路径。索引中的路径统一以 '\\' 分隔，非 Windows 系统下需要先转换。
+    """
+    return os.path.normpath(os.path.join(base_path, *(part.replace('\\', os.sep) for part in parts)))
+
+def iter_entry_nfo_paths(media_entry, base_path='.', warn=print):
+    """
+    产出一个索引条目中所有 NFO 文件的本地路径（电影 / 剧集 / 季 / 单集 NFO），不检查文件是否存在。
+
+    Args:
+        media_entry (dict): 索引条目（包含 path 和 files）。
+        base_path (str): 索引中的路径相对的媒体库根目录。
+        warn (callable): 接收警告信息的函数，结构异常的字段会被跳过并报告；为 None 时不报告。
+    """
+    item_path = media_entry.get('path', '')
+    files_info = media_entry.get('files') or []
+    if not files_info and warn:
+        warn(f"警告：'{item_path}' 没有找到 'files' 信息，跳过。")
+
+    for file_entry in files_info:
+        for key in NFO_INDEX_KEYS:
+            nfo_data = file_entry.get(key)
+            if not nfo_data:
+                continue
+            if isinstance(nfo_data, str):
+                yield index_path_to_local(base_path, item_path, nfo_data)
+            elif isinstance(nfo_data, list):
+                for item in nfo_data:
+                    if isinstance(item, str):
+                        if item:
+                            yield index_path_to_local(base_path, item_path, item)
+                    elif isinstance(item, dict):
+                        # 剧集单集 NFO：{季目录: [相对路径, ...]}
+                        for group, rel_paths in item.items():
+                            if not isinstance(rel_paths, list):
+                                if warn:
+                                    warn(f"警告：'{item_path}' 中 '{group}' 的 '{key}' 格式异常（应为列表），跳过。")
+                                continue
+                            for rel_path in rel_paths:
+                                if rel_path:
+                                    yield index_path_to_local(base_path, item_path, rel_path)
+                    elif warn:
+                        warn(f"警告：'{item_path}' 的 '{key}' 中存在未知类型的项目 ({type(item).__name__})，跳过。")
+            elif warn:
+                warn(f"警告：'{item_path}' 的 '{key}' 类型未知 ({type(nfo_data).__name__})，跳过。")
+
+def collect_nfo_paths(index_path, base_path='.', warn=print):
+    """
+    从媒体索引中收集所有 NFO 文件路径（去重并排序）。
+
+    Raises:
+        FileNotFoundError: 索引文件不存在。
+        json.JSONDecodeError: 索引文件内容不是有效的 JSON。
+    """
+    nfo_paths = set()
+    for _, media_entry in iter_media_index(index_path):
+        nfo_paths.update(iter_entry_nfo_paths(media_entry, base_path, warn))
+    return sorted(nfo_paths)
+
+class NfoMetadata:
+    """
+    一次扫描所有 NFO 得到的汇总结果，供人物、制片厂、缺失报告等输出共同使用。
+    """
+
+    def __init__(self):
+        self.nfo_count = 0
+        self.actors = set()         # {(姓名, TMDb ID)}，TMDb ID 可能为 None
+        self.studios = set()
+        self.genres = Counter()
+        self.sets = Counter()
+        self.titles = []            # 电影 / 剧集 NFO 的标题信息
+        self.missing = []           # 不存在的 NFO 路径
+        self.errors = []            # [(路径, 错误信息)]
+
+    def add(self, nfo_path, fields):
+        self.nfo_count += 1
+        if fields is None:
+            self.missing.append(nfo_path)
+            return
+        if "error" in fields:
+            self.errors.append((nfo_path, fields["error"]))
+            return
+        self.actors.update(nfo_actors(fields))
+        self.studios.update(nfo_studios(fields))
+        self.genres.update(fields.get("genre", ()))
+        if fields.get("set"):
+            self.sets[fields["set"]] += 1
+        if fields.get("root") in ITEM_NFO_ROOTS:
+            self.titles.append({
+                "path": nfo_path,
+                "type": fields["root"],
+                "title": fields.get("title"),
+                "originaltitle": fields.get("originaltitle"),
+                "year": fields.get("year"),
+                "set": fields.get("set"),
+            })
+
+    def actor_names(self):
+        return {name for name, _ in self.actors}
+
+    def to_dict(self):
+        """可序列化为 JSON 的结果，列表均已排序，便于比较两次运行的输出。"""
+        return {
+            "nfo_count": self.nfo_count,
+            "people": [{"name": name, "tmdbid": tmdbid}
+                       for name, tmdbid in sorted(self.actors, key=lambda actor: (actor[0], actor[1] or ""))],
+            "studios": sorted(self.studios),
+            "genres": dict(sorted(self.genres.items(), key=lambda kv: (-kv[1], kv[0]))),
+            "sets": dict(sorted(self.sets.items(), key=lambda kv: (-kv[1], kv[0]))),
+            "titles": sorted(self.titles, key=lambda item: item["path"]),
+            "missing": self.missing,
+            "errors": [{"path": path, "error": error} for path, error in self.errors],
+        }
+
+def _parse_chunk(nfo_paths, wanted=None):
+    """解析一组 NFO，返回 [(路径, 字段)]。"""
+    return [(nfo_path, read_nfo_fields(nfo_path, wanted)) for nfo_path in nfo_paths]
+
+def _parse_chunk_in_worker(nfo_paths, wanted):
+    """工作进程中执行：解析一组 NFO，返回 ([(路径, 字段)], 本次的文件系统追踪记录)。"""
+    return _parse_chunk(nfo_paths, wanted), fs_trace.take_worker_records()
+
+def _iter_parsed(nfo_paths, workers, wanted=None):
+    """
+    产出 (路径, 字段)。数量足够多时分块交给进程池解析，结果按完成顺序流回，
+    同一时间最多有 workers * 2 个块在处理中，内存占用与 NFO 总数无关。
+    开启了文件系统追踪时，工作进程中的读取和解析也被记录，随结果送回并入主进程的报告。
+    """
+    if workers <= 1 or len(nfo_paths) < NFO_PARALLEL_MIN:
+        yield from _parse_chunk(nfo_paths, wanted)
+        return
+
+    chunks = iter([nfo_paths[i:i + NFO_PARSE_CHUNK_SIZE] for i in range(0, len(nfo_paths), NFO_PARSE_CHUNK_SIZE)])
+    in_flight = {}
+    try:
+        with ProcessPoolExecutor(max_workers=workers, initializer=fs_trace.init_worker,
+                                 initargs=(fs_trace.worker_settings(),)) as executor:
+            for chunk in chunks:
+                in_flight[executor.submit(_parse_chunk_in_worker, chunk, wanted)] = chunk
+                if len(in_flight) >= workers * 2:
+                    break
+            while in_flight:
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    results, trace_records = future.result()
+                    fs_trace.merge_worker_records(trace_records)
+                    del in_flight[future]
+                    next_chunk = next(chunks, None)
+                    if next_chunk is not None:
+                        in_flight[executor.submit(_parse_chunk_in_worker, next_chunk, wanted)] = next_chunk
+                    yield from results
+    except (BrokenProcessPool, OSError) as e:
+        # 无法创建工作进程或工作进程异常退出：剩余部分在主进程中解析
+        print(f"\n警告: NFO 解析进程池不可用（{e}），剩余的 NFO 将在主进程中解析。")
+        for chunk in list(in_flight.values()) + list(chunks):
+            yield from _parse_chunk(chunk, wanted)
+
+def iter_nfo_fields(nfo_paths, workers=None, wanted=None):
+    """
+    产出每个 NFO 的 (路径, 字段)，字段含义同 read_nfo_fields（文件不存在时为 None）。
+
+    先在主进程中查询 nfo_cache（每个文件一次 stat），缓存未命中的 NFO 再交给进程池并行解析，
+    解析结果由主进程写回缓存。产出顺序不固定：缓存命中的在前，其余按解析完成的顺序。
+
+    Args:
+        nfo_paths (list): NFO 文件路径。
+        workers (int): 解析进程数，默认 NFO_PARSE_WORKERS。
+        wanted (iterable): 只需要的字段（见 nfo_reader.extract_nfo_fields），较大的 NFO 读到这些字段即停止解析。
+            这样得到的字段与完整结果分开缓存。
+    """
+    if workers is None:
+        workers = NFO_PARSE_WORKERS
+    cache = get_shared_cache()
+    if cache is None:
+        to_parse = nfo_paths
+    else:
+        to_parse = []
+        stats = {}
+        for nfo_path in nfo_paths:
+            fields, st = cache.lookup(nfo_path, wanted)
+            if fields is not None or st is None:
+                yield nfo_path, fields
+            else:
+                to_parse.append(nfo_path)
+                stats[nfo_path] = st
+
+    for nfo_path, fields in _iter_parsed(to_parse, workers, wanted):
+        if cache is not None and fields is not None:
+            cache.store(nfo_path, stats[nfo_path], fields, wanted)
+        yield nfo_path, fields
+
+def scan_nfo_files(nfo_paths, progress=False, workers=None):
+    """
+    读取每个 NFO 一次，同时提取演员、制片厂、类型、合集和标题（读取方式见 iter_nfo_fields）。
+
+    Args:
+        nfo_paths (list): NFO 文件路径。
+        progress (bool): 是否在控制台原地显示进度。
+        workers (int): 解析进程数，默认 NFO_PARSE_WORKERS。
+
+    Returns:
+        NfoMetadata: 汇总结果。
+    """
+    metadata = NfoMetadata()
+    total = len(nfo_paths)
+    for done, (nfo_path, fields) in enumerate(iter_nfo_fields(nfo_paths, workers), 1):
+        metadata.add(nfo_path, fields)
+        if progress and (done % PROGRESS_EVERY == 0 or done == total):
+            print(f"Processed {done}/{total} NFOs.", end='\r')
+
+    # 并行解析时结果的顺序不固定，排序后输出与逐个解析时一致
+    metadata.missing.sort()
+    metadata.errors.sort()
+    return metadata
+
+def write_nfo_warnings(metadata, f_report):
+    """把不存在和无法解析的 NFO 写入报告文件。"""
+    for nfo_path in metadata.missing:
+        print(f"Warning: NFO file not found: {nfo_path}", file=f_report)
+    for nfo_path, error in metadata.errors:
+        print(f"Error parsing XML for {nfo_path}: {error}", file=f_report)
+
+def write_missing_report(f_report, label, found_names, existing_names, summary_file, report_file):
+    """
+    写出缺失报告：NFO 中出现但不在汇总文件中的名称。
+    报告格式由 15down_miss_people.py / 16down_miss_studios.py 读取，修改时需同步。
+
+    Args:
+        f_report: 已打开的报告文件。
+        label (str): "people" 或 "studios"。
+        found_names (set): NFO 中出现的名称。
+        existing_names (set): 汇总文件中已有的名称。
+        summary_file (str): 汇总文件名（用于报告文字）。
+        report_file (str): 报告文件名（用于控制台提示）。
+
+    Returns:
+        list: 排序后的缺失名称。
+    """
+    missing = sorted(found_names - existing_names)
+    if missing:
+        print(f"\n--- Missing {label.title()} Report ---", file=f_report)
+        print(f"The following {label} were found in NFO files but are NOT in {summary_file}:", file=f_report)
+        for name in missing:
+            print(f"- {name}", file=f_report)
+        print(f"\nTotal missing {label}: {len(missing)}", file=f_report)
+        print(f"\nFound {len(missing)} missing {label}. See '{report_file}' for details.")
+    else:
+        message = f"\nGood news! All {label} mentioned in NFO files are present in {summary_file}."
+        print(message, file=f_report)
+        print(message)
+    return missing
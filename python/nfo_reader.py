@@ -0,0 +1,175 @@
+import re
+import xml.etree.ElementTree as ET # 用于解析XML (NFO) 文件
+import fs_trace # 文件系统操作耗时追踪
+from encoding_detect import decode_bytes # 编码检测
+
+# --- 配置信息 ---
+# 提取结果的格式版本。修改提取的字段或规则时递增，nfo_cache 中旧版本的缓存会自动失效。
+NFO_FIELDS_VERSION = 5
+# 原样提取文本的顶层标签
+NFO_TEXT_FIELDS = ('title', 'originaltitle', 'sorttitle', 'year', 'premiered', 'rating', 'runtime',
+                   'tmdbid', 'imdbid', 'season', 'episode', 'plot', 'outline')
+# 可以出现多次的顶层标签
+NFO_LIST_FIELDS = ('studio', 'genre', 'tag', 'country', 'director', 'writer', 'credits')
+# 超过该字符数的 NFO 用增量解析器边读边丢弃元素，内存占用与文件大小无关。
+# 普通大小的 NFO 一次性解析更快（CPython 的增量解析器每个元素都要经过 Python 层的事件循环）
+NFO_STREAM_MIN_CHARS = 256 * 1024
+# 增量解析时每次送入解析器的字符数。提前结束时（见 extract_nfo_fields 的 wanted），之后的内容不会被解析
+NFO_FEED_CHUNK = 16 * 1024
+
+_XML_DECLARED_ENCODING = re.compile(rb'^\s*<\?xml[^>]*?encoding\s*=\s*["\']([A-Za-z0-9._-]+)["\']')
+# 需要完整子元素的顶层标签；其余顶层元素（fileinfo、thumb、plot 等）的子元素读完即丢弃
+_SUBTREE_FIELDS = ('actor', 'set', 'ratings')
+
+def _text(elem):
+    if elem is None or elem.text is None:
+        return None
+    return elem.text.strip() or None
+
+def decode_nfo(raw_xml):
+    """
+    确定 NFO 的编码并解码一次（见 encoding_detect.detect_bytes），XML 声明的编码作为提示：
+    BOM > UTF-8 > 声明的编码 > chardet > GBK。
+
+    Returns:
+        tuple: (文本, 编码名)。
+    """
+    match = _XML_DECLARED_ENCODING.match(raw_xml)
+    hint = match.group(1).decode('ascii') if match else None
+    # errors='ignore' 忽略无法解码的字符
+    text, verdict = decode_bytes(raw_xml, hint, errors='ignore')
+    return text, verdict.encoding
+
+def _empty_fields():
+    fields = {"root": None}
+    for tag in NFO_TEXT_FIELDS:
+        fields[tag] = None
+    for tag in NFO_LIST_FIELDS:
+        fields[tag] = []
+    fields["actors"] = []
+    fields["set"] = None
+    return fields
+
+def _collect(fields, seen, elem):
+    """把一个顶层子元素的内容写入 fields。单值字段只取第一次出现的元素。"""
+    tag = elem.tag
+    if tag in NFO_LIST_FIELDS:
+        value = _text(elem)
+        if value and value not in fields[tag]:
+            fields[tag].append(value)
+    elif tag == 'actor':
+        name = _text(elem.find('name'))
+        if name:
+            fields["actors"].append([name, _text(elem.find('tmdbid')), _text(elem.find('role')), _text(elem.find('thumb'))])
+    elif tag in seen:
+        return
+    elif tag in NFO_TEXT_FIELDS:
+        seen.add(tag)
+        fields[tag] = _text(elem)
+    elif tag == 'set':
+        # 合集：Kodi 新格式为 <set><name>...</name></set>，旧格式直接写在 <set> 中
+        seen.add(tag)
+        fields["set"] = _text(elem.find("name")) or _text(elem)
+    elif tag == 'ratings' and 'rating' not in seen:
+        # 新格式评分：<ratings><rating name="tmdb" default="true"><value>7.5</value></rating></ratings>。
+        # 取默认评分（没有时取第一个）；同一文件中的 <rating> 优先，因此不标记为已读到
+        ratings = elem.findall('rating')
+        default = next((r for r in ratings if r.get('default') == 'true'), ratings[0] if ratings else None)
+        if default is not None:
+            fields["rating"] = _text(default.find('value'))
+
+def _extract_streaming(text, wanted=None):
+    fields = _empty_fields()
+    pending = set(wanted) if wanted else None
+    seen = set()
+    parser = ET.XMLPullParser(events=('start', 'end'))
+    root = None
+    depth = 0
+    keep_subtree = False
+    for offset in range(0, len(text), NFO_FEED_CHUNK):
+        parser.feed(text[offset:offset + NFO_FEED_CHUNK])
+        for event, elem in parser.read_events():
+            if event == 'start':
+                depth += 1
+                if depth == 1:
+                    root = elem
+                    fields["root"] = elem.tag
+                elif depth == 2:
+                    keep_subtree = elem.tag in _SUBTREE_FIELDS
+                continue
+
+            depth -= 1
+            if depth == 1:
+                # 顶层子元素读完：提取后从根元素上摘掉
+                _collect(fields, seen, elem)
+                root.clear()
+                if pending is not None and pending <= seen:
+                    # 需要的顶层元素都已读完：剩余内容（通常是巨大的 fileinfo、thumb 等）不再解析
+                    return fields
+            elif depth > 1 and not keep_subtree:
+                elem.clear()
+    parser.close()
+    return fields
+
+def extract_nfo_fields(text, wanted=None):
+    """
+    从 NFO 文本中提取下游脚本使用的字段。
+
+    较大的 NFO（超过 NFO_STREAM_MIN_CHARS）使用增量解析器：
+    每个顶层子元素处理完立即丢弃，不需要的元素（fileinfo、thumb 等）的子元素也随读随丢，
+    不会构建完整的文档树。指定了 wanted 时，增量解析在这些顶层元素都读完后立即停止，不再读取文件的其余部分；
+    普通大小的 NFO 一次性解析本来就很快，仍然提取全部字段。
+
+    Args:
+        text (str): 已解码的 NFO 内容（见 decode_nfo）。
+        wanted (iterable): 调用方只需要的单值字段（NFO_TEXT_FIELDS 中的标签或 "set"）。
+            给出时，其余字段可能不完整；文件中缺少其中某个字段时会解析到文件末尾。默认提取全部字段。
+
+    Returns:
+        dict: {"root": 根标签, "title": ..., "actors": [[姓名, TMDb ID, 角色, 头像], ...],
+               "studio": [...], "genre": [...], "set": 合集名, ...}。缺失的文本字段为 None，列表字段为空列表。
+
+    Raises:
+        ET.ParseError: 无法解析。
+    """
+    if len(text) >= NFO_STREAM_MIN_CHARS:
+        return _extract_streaming(text, wanted)
+    root = ET.fromstring(text)
+    fields = _empty_fields()
+    fields["root"] = root.tag
+    seen = set()
+    for child in root:
+        _collect(fields, seen, child)
+    return fields
+
+def read_nfo_fields(nfo_file_path, wanted=None):
+    """
+    读取并解析一个 NFO 文件。wanted 见 extract_nfo_fields。
+
+    Returns:
+        dict | None: 提取的字段（见 extract_nfo_fields）。文件无法解析时返回 {"error": 错误信息}；
+                     文件不存在时返回 None。
+    """
+    try:
+        with fs_trace.timed("read", nfo_file_path):
+            with open(nfo_file_path, 'rb') as f:
+                raw_xml = f.read()
+    except FileNotFoundError:
+        return None
+    except OSError as e:
+        return {"error": f"无法读取: {e}"}
+
+    try:
+        with fs_trace.timed("parse", nfo_file_path):
+            text, _ = decode_nfo(raw_xml)
+            return extract_nfo_fields(text, wanted)
+    except ET.ParseError as e:
+        return {"error": f"XML 解析失败: {e}"}
+
+def nfo_actors(fields):
+    """字段中的演员：[(姓名, TMDb ID)]。"""
+    return [(actor[0], actor[1]) for actor in fields.get("actors", ())]
+
+def nfo_studios(fields):
+    """字段中的制片厂名称列表。"""
+    return list(fields.get("studio", ()))
@@ -0,0 +1,180 @@
+import os
+import re
+import argparse
+import subprocess
+import unicodedata
+
+# --- 配置信息 ---
+# 随代码提供的汉字拼音表：每行为 "拼音<Tab>汉字..."（不带声调，ü 写作 u），以 # 开头的行为注释。
+# 多音字只取 ICU 给出的最常用读音。用本脚本的 --generate 重新生成（需要 ICU 的 uconv 命令）。
+PINYIN_TABLE_FILENAME = "pinyin_table.txt"
+PINYIN_TABLE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), PINYIN_TABLE_FILENAME)
+# 手工维护的多音字读音修正：[词语] 段按词语给出读音（长安 -> chang an），[姓氏] 段只用于人名开头（曾 -> zeng）
+PINYIN_OVERRIDES_FILENAME = "pinyin_overrides.txt"
+PINYIN_OVERRIDES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), PINYIN_OVERRIDES_FILENAME)
+# 拼音表覆盖的汉字范围：CJK 统一汉字扩展 A 和基本区
+PINYIN_TABLE_RANGES = ((0x3400, 0x4DBF), (0x4E00, 0x9FFF))
+# 生成拼音表时使用的 ICU 转写规则
+UCONV_TRANSLITERATION = 'Han-Latin; Latin-ASCII; Lower'
+# 首字母键短于该长度时不生成（单个字母会匹配到大量项目）
+MIN_INITIALS_LENGTH = 2
+
+_ASCII_WORD = re.compile(r'[a-z]+|[0-9]+')
+_table = None
+_overrides = None
+_longest_phrase = 0
+
+def load_pinyin_table(path=PINYIN_TABLE_PATH):
+    """读取拼音表，返回 {汉字: 拼音}。同一进程中只读取一次。"""
+    global _table
+    if _table is None:
+        table = {}
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                if not line.strip() or line.startswith('#'):
+                    continue
+                syllable, chars = line.rstrip('\n').split('\t')
+                for char in chars:
+                    table[char] = syllable
+        _table = table
+    return _table
+
+def load_pinyin_overrides(path=PINYIN_OVERRIDES_PATH):
+    """
+    读取多音字读音修正，返回 ({词语: [拼音, ...]}, {姓氏: [拼音, ...]})。同一进程中只读取一次。
+    文件不存在时两者都为空（只使用拼音表）。
+    """
+    global _overrides, _longest_phrase
+    if _overrides is None:
+        sections = {"词语": {}, "姓氏": {}}
+        current = None
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    line = line.rstrip('\n')
+                    if not line.strip() or line.startswith('#'):
+                        continue
+                    if line.startswith('[') and line.endswith(']'):
+                        current = sections.get(line[1:-1])
+                        continue
+                    word, syllables = line.split('\t')
+                    syllables = syllables.split()
+                    # 字数与拼音数不一致的条目无法逐字对应，忽略
+                    if current is not None and len(word) == len(syllables):
+                        current[word] = syllables
+        except FileNotFoundError:
+            pass
+        _overrides = (sections["词语"], sections["姓氏"])
+        _longest_phrase = max(map(len, sections["词语"]), default=0)
+    return _overrides
+
+def _char_syllables(chars, person):
+    """chars 中每个字符的拼音（不是汉字时为 None）：先按拼音表逐字取，再用词语和姓氏读音修正覆盖。"""
+    table = load_pinyin_table()
+    phrases, surnames = load_pinyin_overrides()
+    syllables = [table.get(char) for char in chars]
+    start = 0
+    if person:
+        # 复姓（两字）优先
+        for length in (2, 1):
+            surname = surnames.get(chars[:length])
+            if surname:
+                syllables[:length] = surname
+                start = length
+                break
+    i = start
+    while i < len(chars):
+        for length in range(min(_longest_phrase, len(chars) - i), 1, -1):
+            phrase = phrases.get(chars[i:i + length])
+            if phrase:
+                syllables[i:i + length] = phrase
+                i += length
+                break
+        else:
+            i += 1
+    return syllables
+
+def pinyin_keys(text, person=False):
+    """
+    生成文本的全拼键和首字母键，例如 "琅琊榜 (2015)" -> ["langyabang2015", "lyb2015"]。
+    汉字取拼音，英文单词整体保留在全拼中、首字母键只取首字母，数字原样保留，其他字符忽略。
+    多音字按 pinyin_overrides.txt 中的词语读音修正（"长安" -> "changan"）；person 为 True 时文本是人名，
+    开头的姓氏另按姓氏读音修正（"曾志伟" -> "zengzhiwei"）。
+    文本中没有可转写的汉字时返回空列表。
+    """
+    if not text:
+        return []
+    chars = unicodedata.normalize('NFKC', text).lower()
+    full = []
+    initials = []
+    has_han = False
+    ascii_run = []
+
+    def flush_ascii():
+        for word in _ASCII_WORD.findall(''.join(ascii_run)):
+            full.append(word)
+            initials.append(word if word.isdigit() else word[0])
+        ascii_run.clear()
+
+    for char, syllable in zip(chars, _char_syllables(chars, person)):
+        if syllable:
+            flush_ascii()
+            has_han = True
+            full.append(syllable)
+            initials.append(syllable[0])
+        elif char.isascii():
+            ascii_run.append(char)
+        else:
+            flush_ascii()
+    flush_ascii()
+
+    if not has_han:
+        return []
+    keys = [''.join(full)]
+    initials_key = ''.join(initials)
+    if len(initials_key) >= MIN_INITIALS_LENGTH and initials_key != keys[0]:
+        keys.append(initials_key)
+    return keys
+
+def texts_pinyin_keys(texts, person=False):
+    """多段文本（标题、演员、制片厂等）的拼音键，去重并保持顺序。person 为 True 时各段文本都是人名。"""
+    keys = []
+    for text in texts:
+        for key in pinyin_keys(text, person):
+            if key not in keys:
+                keys.append(key)
+    return keys
+
+def generate_table(path=PINYIN_TABLE_PATH):
+    """用 ICU 的 uconv 转写 PINYIN_TABLE_RANGES 中的每个汉字，写出拼音表。返回收录的汉字数量。"""
+    chars = [chr(code) for start, end in PINYIN_TABLE_RANGES for code in range(start, end + 1)]
+    result = subprocess.run(['uconv', '-f', 'utf-8', '-t', 'utf-8', '-x', UCONV_TRANSLITERATION],
+                            input='\n'.join(chars) + '\n', capture_output=True, text=True, check=True)
+    by_syllable = {}
+    for char, syllable in zip(chars, result.stdout.split('\n')):
+        # 没有读音的汉字 uconv 原样输出，跳过
+        if syllable.isascii() and syllable.isalpha():
+            by_syllable.setdefault(syllable, []).append(char)
+
+    with open(path, 'w', encoding='utf-8', newline='\n') as f:
+        f.write(f"# 由 pinyin_keys.py --generate 生成（uconv -x '{UCONV_TRANSLITERATION}'），请勿手动修改\n")
+        for syllable in sorted(by_syllable):
+            f.write(f"{syllable}\t{''.join(by_syllable[syllable])}\n")
+    return sum(len(chars) for chars in by_syllable.values())
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="汉字拼音表工具：生成拼音表，或查看文本的拼音键。")
+    parser.add_argument('--generate', action='store_true', help=f"用 uconv 重新生成 {PINYIN_TABLE_FILENAME}。")
+    parser.add_argument('texts', nargs='*', help="要查看拼音键的文本。")
+    parser.add_argument('--person', action='store_true', help="把文本当作人名（开头按姓氏读音）。")
+    args = parser.parse_args()
+
+    if args.generate:
+        try:
+            count = generate_table()
+        except (OSError, subprocess.CalledProcessError) as e:
+            print(f"错误: 无法运行 uconv（需要安装 ICU）: {e}")
+            raise SystemExit(1)
+        print(f"已写入 {PINYIN_TABLE_PATH}，共 {count} 个汉字。")
+    for text in args.texts:
+        print(f"{text}: {' '.join(pinyin_keys(text, args.person)) or '（没有汉字）'}")
@@ -0,0 +1,197 @@
+import os
+import json
+import time
+import threading
+
+from media_walker import DirListing, scandir_listing
+from media_model import json_default # 媒体条目的 JSON 序列化
+
+SNAPSHOT_VERSION = 1
+# 扫描过程中写入检查点的最小间隔（秒）
+CHECKPOINT_INTERVAL = 120
+
+class ScanSnapshot:
+    """
+    媒体库扫描的目录快照，用于增量扫描和中断后续扫。
+
+    快照记录每个目录的 mtime、条目数和列举结果，以及每个媒体根目录生成的 media_entry：
+    - 再次扫描时，只有 mtime 发生变化的目录才会被重新列举，其余目录直接复用快照中的结果；
+      子树内所有目录都未变化的媒体项目直接复用上次生成的条目。
+    - 扫描过程中会定期写入未完成的检查点。若扫描被中断，下次运行时上次已列举过的目录
+      不再访问文件系统，已完成的媒体项目整棵子树都会被跳过。
+
+    目录的 mtime 只会因直接子项的增删改名而变化，修改文件内容不会影响快照的判断，
+    这与扫描器只关心文件名的行为一致。
+    """
+
+    def __init__(self, path, scan_root, ignore_patterns=()):
+        self.path = path
+        self.scan_root = scan_root
+        self.ignore_patterns = list(ignore_patterns)
+        # 上一次运行留下的数据：相对路径 -> [mtime_ns, 条目数, 子目录列表, 文件列表, 符号链接子目录列表]
+        self.previous_dirs = {}
+        # 相对路径 -> {"type": ..., "entry": ...}
+        self.previous_media = {}
+        # 上一次运行被中断时，该次运行中已列举的目录和已完成的媒体项目
+        self.resume_dirs = set()
+        self.resume_media = set()
+
+        # 本次运行的数据
+        self.dirs = {}
+        self.media = {}
+        self.relisted = set()
+        self.resumed_dirs = set()
+        self.resumed_roots = set()
+        self.lock = threading.Lock()
+        self.last_checkpoint = time.monotonic()
+
+    @classmethod
+    def load(cls, path, scan_root, ignore_patterns=()):
+        """
+        读取快照文件。文件不存在、格式不兼容或扫描根目录不同时，返回一个空快照。
+        忽略规则发生变化时，目录记录仍然有效（记录的是过滤前的列举结果），但媒体条目需要重新生成。
+        """
+        snapshot = cls(path, scan_root, ignore_patterns)
+        if not os.path.exists(path):
+            return snapshot
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (IOError, json.JSONDecodeError) as e:
+            print(f"警告: 无法读取扫描快照 '{path}'，将完整扫描：{e}")
+            return snapshot
+
+        if data.get("version") != SNAPSHOT_VERSION or data.get("scan_root") != scan_root:
+            print(f"信息: 扫描快照 '{path}' 与当前扫描目录不匹配，将完整扫描。")
+            return snapshot
+
+        snapshot.previous_dirs = data.get("dirs", {})
+        if data.get("ignore", []) != snapshot.ignore_patterns:
+            print("信息: 忽略规则已变化，所有媒体条目将重新生成。")
+            return snapshot
+        snapshot.previous_media = data.get("media", {})
+        if not data.get("complete", False):
+            snapshot.resume_dirs = set(data.get("run_dirs", []))
+            snapshot.resume_media = set(data.get("run_media", []))
+            print(f"信息: 检测到未完成的扫描，将从检查点继续（已列举 {len(snapshot.resume_dirs)} 个目录）。")
+        return snapshot
+
+    def _relative(self, path):
+        return os.path.relpath(path, self.scan_root)
+
+    def list_dir(self, path):
+        """
+        供 media_walker.walk 使用的列目录函数：目录未变化时复用快照，否则重新列举。
+        """
+        rel = self._relative(path)
+        record = self.previous_dirs.get(rel)
+
+        if record is not None and rel in self.resume_dirs:
+            # 中断前刚列举过的目录，直接信任检查点，不再访问文件系统。
+            # 其内容可能与更早一次完整扫描时不同，因此按“已变化”处理。
+            with self.lock:
+                self.resumed_dirs.add(rel)
+        else:
+            mtime_ns = os.stat(path).st_mtime_ns
+            if record is None or record[0] != mtime_ns:
+                listing = scandir_listing(path)
+                record = [
+                    mtime_ns,
+                    len(listing.dirnames) + len(listing.filenames),
+                    list(listing.dirnames),
+                    list(listing.filenames),
+                    sorted(listing.symlink_dirnames),
+                ]
+                with self.lock:
+                    self.relisted.add(rel)
+
+        with self.lock:
+            self.dirs[rel] = record
+        # 返回副本，调用方就地裁剪 dirnames 不会影响快照内容
+        return DirListing(list(record[2]), list(record[3]), set(record[4]))
+
+    def is_changed(self, path):
+        """该目录的内容是否可能与上次完整扫描时不同（被重新列举或来自中断前的检查点）。"""
+        rel = self._relative(path)
+        return rel in self.relisted or rel in self.resumed_dirs
+
+    def resumed_media_entry(self, media_root_rel):
+        """返回中断前已完成的媒体项目条目，可直接跳过整棵子树；没有则返回 None。"""
+        if media_root_rel in self.resume_media:
+            return self.previous_media.get(media_root_rel)
+        return None
+
+    def cached_media_entry(self, media_root_rel, media_type):
+        """返回上次扫描生成的同类型媒体条目；没有则返回 None。"""
+        cached = self.previous_media.get(media_root_rel)
+        if cached is not None and cached["type"] == media_type:
+            return cached["entry"]
+        return None
+
+    def record_media(self, media_root_rel, media_type, media_entry):
+        self.media[media_root_rel] = {"type": media_type, "entry": media_entry}
+
+    def record_resumed_media(self, media_root_rel, media_root_dir):
+        """
+        把中断前完成的媒体项目带入本次运行，其子树的目录记录在保存快照时一并保留。
+
+        Args:
+            media_root_rel (str): 媒体条目中的路径（Windows 风格分隔符）。
+            media_root_dir (str): 媒体根目录的绝对路径。
+        """
+        self.media[media_root_rel] = self.previous_media[media_root_rel]
+        self.resumed_roots.add(self._relative(media_root_dir))
+
+    def _resumed_subtree_dirs(self):
+        """上次快照中位于续扫跳过的媒体项目子树内、本次未重新访问的目录记录。"""
+        kept = {}
+        for rel, record in self.previous_dirs.items():
+            if rel in self.dirs:
+                continue
+            parent = os.path.dirname(rel)
+            while parent:
+                if parent in self.resumed_roots:
+                    kept[rel] = record
+                    break
+                parent = os.path.dirname(parent)
+        return kept
+
+    def maybe_checkpoint(self):
+        """距离上次检查点超过 CHECKPOINT_INTERVAL 秒时，写入一个未完成的检查点。"""
+        if time.monotonic() - self.last_checkpoint >= CHECKPOINT_INTERVAL:
+            self.save(complete=False)
+
+    def save(self, complete=True):
+        """
+        写入快照文件（先写临时文件再替换，避免中途退出留下损坏的快照）。
+
+        complete 为 False 时写入检查点：保留上次快照中本次尚未访问到的目录，
+        并记录本次已经列举的目录和已完成的媒体项目，供中断后续扫。
+        """
+        with self.lock:
+            if complete:
+                dirs = {**self._resumed_subtree_dirs(), **self.dirs}
+                media = self.media
+            else:
+                dirs = {**self.previous_dirs, **self.dirs}
+                media = {**self.previous_media, **self.media}
+            data = {
+                "version": SNAPSHOT_VERSION,
+                "scan_root": self.scan_root,
+                "ignore": self.ignore_patterns,
+                "complete": complete,
+                "dirs": dirs,
+                "media": media,
+            }
+            if not complete:
+                data["run_dirs"] = sorted(self.dirs)
+                data["run_media"] = sorted(self.media)
+
+            temp_path = self.path + ".tmp"
+            try:
+                with open(temp_path, 'w', encoding='utf-8') as f:
+                    json.dump(data, f, ensure_ascii=False, separators=(',', ':'), default=json_default)
+                os.replace(temp_path, self.path)
+            except IOError as e:
+                print(f"警告: 无法写入扫描快照 '{self.path}'：{e}")
+            self.last_checkpoint = time.monotonic()
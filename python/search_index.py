@@ -0,0 +1,201 @@
+import os
+import re
+import json
+import unicodedata
+from media_publish import write_compact_json, remove_stale_files
+
+# --- 配置信息 ---
+# 倒排索引的输出子目录名与格式标识，与 js/data.js 中的 SEARCH_DIR 对应
+SEARCH_DIRNAME = "search"
+SEARCH_MANIFEST_FILENAME = "manifest.json"
+SEARCH_FORMAT_NAME = "mediahub-search"
+SEARCH_FORMAT_VERSION = 2
+# 按二元组切分的字符：平假名、片假名、CJK 统一汉字（含扩展 A）、兼容汉字、韩文音节。
+# 修改时需同步 js/data.js 中的 SEARCH_CJK_CHARS
+CJK_CHARS = '\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff\uac00-\ud7af'
+# 非 ASCII 开头的词元按首字符码位右移该位数分片（汉字约 330 个分片），ASCII 字母数字开头的词元按首字符分片
+SHARD_CODEPOINT_BITS = 6
+# 单个分片文件的大小上限（字节）。同一首字符分组（见 shard_key）超过该大小时按词元顺序拆成多个分片，
+# 清单中记录每个分片的起始词元，前端按前缀只加载范围重叠的分片。倒排列表本身超过上限的词元单独占一个分片
+SEARCH_SHARD_MAX_BYTES = 64 * 1024
+# 超过该长度的拉丁词元（哈希、网址片段等）不收录；拼音检索键超过该长度时截断后收录。
+# 修改时需同步 js/data.js 中的 SEARCH_MAX_TOKEN_LENGTH
+MAX_TOKEN_LENGTH = 40
+
+_TOKEN_PATTERN = re.compile(f'([{CJK_CHARS}]+)|([^\\W_{CJK_CHARS}]+)')
+
+def tokenize(text):
+    """
+    把文本切分为词元：先做 NFKC 规范化并转小写（全角字母数字变为半角），
+    中日韩文字按相邻两字切分（只有一个字时保留单字），其他文字按字母数字组成的词切分。
+    规则与 js/data.js 中的 tokenizeSearchText 相同。
+
+    Returns:
+        list: 词元（可能重复）。
+    """
+    tokens = []
+    if not text:
+        return tokens
+    text = unicodedata.normalize('NFKC', text).lower()
+    for cjk_run, word in _TOKEN_PATTERN.findall(text):
+        if cjk_run:
+            if len(cjk_run) == 1:
+                tokens.append(cjk_run)
+            else:
+                tokens.extend(cjk_run[i:i + 2] for i in range(len(cjk_run) - 1))
+        elif len(word) <= MAX_TOKEN_LENGTH:
+            tokens.append(word)
+    return tokens
+
+def shard_key(token):
+    """词元所在的分片名：同一前缀（首字符）的词元在同一分片中，前端按前缀查找时只需加载一个分片。"""
+    first = token[0]
+    if first.isascii() and first.isalnum():
+        return first
+    return f"u{ord(first) >> SHARD_CODEPOINT_BITS:x}"
+
+def token_sort_key(token):
+    """词元的排序键：按 UTF-16 编码单元排序，与 JavaScript 的字符串比较一致（前端据此判断分片的词元范围）。"""
+    return token.encode('utf-16-be')
+
+def shard_file_name(key, part):
+    """分片文件名：分组的第一个分片为 {分组}.json，之后的为 {分组}.{序号}.json。"""
+    return f"{key}.json" if part == 0 else f"{key}.{part}.json"
+
+def shard_names_for(manifest, token, prefix=False):
+    """
+    返回 token（prefix 为 True 时为以 token 开头的全部词元）可能所在的分片文件名，与 js/data.js 中的 searchShardNames 相同。
+    清单中每个分组为 [[起始词元, 词元数], ...]，第 i 个分片包含 [起始词元 i, 起始词元 i+1) 范围内的词元。
+    """
+    parts = manifest["shards"].get(shard_key(token), [])
+    target = token_sort_key(token)
+    names = []
+    for part, (start, _) in enumerate(parts):
+        if part + 1 < len(parts) and token_sort_key(parts[part + 1][0]) <= target:
+            continue
+        start_key = token_sort_key(start)
+        if start_key > target and not (prefix and start_key.startswith(target)):
+            break
+        names.append(shard_file_name(shard_key(token), part))
+    return names
+
+def _json_size(value):
+    return len(json.dumps(value, ensure_ascii=False, separators=(',', ':')).encode('utf-8'))
+
+def item_search_texts(item_path, fields):
+    """
+    一个媒体项目参与检索的文本：目录名、标题、原标题、剧情简介、演员、导演、制片厂和类型。
+
+    Args:
+        item_path (str): 索引中的项目路径。
+        fields (dict): 项目 NFO 的字段（见 read_nfo_fields），没有或无法解析时只使用目录名。
+    """
+    texts = [item_path.replace('\\', '/').split('/')[-1]]
+    if fields and "error" not in fields:
+        texts += [fields.get("title"), fields.get("originaltitle"), fields.get("plot") or fields.get("outline")]
+        texts += [actor[0].split('-tmdb-')[0] for actor in fields.get("actors", ())]
+        texts += fields.get("director", []) + fields.get("studio", []) + fields.get("genre", [])
+    return [text for text in texts if text]
+
+def encode_postings(item_ids):
+    """把升序的项目 ID 列表差分编码：第一个为 ID 本身，之后为与前一个的差值。"""
+    deltas = []
+    previous = 0
+    for item_id in item_ids:
+        deltas.append(item_id - previous)
+        previous = item_id
+    return deltas
+
+class SearchIndexBuilder:
+    """
+    逐个加入媒体项目，生成按词元前缀分片的倒排索引（词元 -> 项目 ID 列表）。
+    项目需按 ID 升序加入，倒排列表因此天然有序，不需要再排序。
+    """
+
+    def __init__(self):
+        self.postings = {}
+        self.item_count = 0
+
+    def add(self, item_id, texts, keys=()):
+        """加入一个项目：texts 经 tokenize 切分为词元，keys 为已经规范化的检索键，截断到 MAX_TOKEN_LENGTH 后直接加入。"""
+        self.item_count += 1
+        tokens = set()
+        for text in texts:
+            tokens.update(tokenize(text))
+        tokens.update(key[:MAX_TOKEN_LENGTH] for key in keys)
+        for token in tokens:
+            item_ids = self.postings.get(token)
+            if item_ids is None:
+                self.postings[token] = [item_id]
+            elif item_ids[-1] != item_id:
+                item_ids.append(item_id)
+
+    def add_item(self, item_id, item_path, fields, meta, pinyin):
+        """
+        加入一个媒体项目，检索文本见 item_search_texts。
+        拼音检索键 pinyin（见 media_publish.item_pinyin_keys）不经切分直接加入，前端按前缀查找即可实现拼音搜索。
+        长标题的全拼键可能超过 MAX_TOKEN_LENGTH，只收录前 MAX_TOKEN_LENGTH 个字符（前端查找时同样截断）。
+        """
+        self.add(item_id, item_search_texts(item_path, fields), pinyin)
+
+    def _split_shards(self):
+        """
+        按首字符分组，组内按 token_sort_key 排序，超过 SEARCH_SHARD_MAX_BYTES 时拆分。
+
+        Returns:
+            tuple: ({文件名: {词元: 差分编码的 ID 列表}}, {分组: [[起始词元, 词元数], ...]})，
+                   每个分组第一个分片的起始词元为空字符串。
+        """
+        groups = {}
+        for token in sorted(self.postings, key=token_sort_key):
+            groups.setdefault(shard_key(token), []).append(token)
+
+        files = {}
+        ranges = {}
+        for key, tokens in groups.items():
+            parts = ranges[key] = []
+            shard = {}
+            start = ""
+            size = 2    # {}
+            for token in tokens:
+                postings = encode_postings(self.postings[token])
+                entry_size = _json_size(token) + 1 + _json_size(postings)
+                if shard and size + 1 + entry_size > SEARCH_SHARD_MAX_BYTES:
+                    files[shard_file_name(key, len(parts))] = shard
+                    parts.append([start, len(shard)])
+                    shard = {}
+                    start = token
+                    size = 2
+                size += entry_size + (1 if shard else 0)
+                shard[token] = postings
+            files[shard_file_name(key, len(parts))] = shard
+            parts.append([start, len(shard)])
+        return files, ranges
+
+    def write(self, search_dir):
+        """
+        写出分片文件（见 _split_shards，内容为 {词元: 差分编码的 ID 列表}）和清单文件。
+        内容未变化的文件不重写，已不存在的分片被删除。
+
+        Returns:
+            dict: 统计 {"tokens", "shards", "written", "unchanged", "removed"}。
+        """
+        files, ranges = self._split_shards()
+        stats = {"tokens": len(self.postings), "shards": len(files), "written": 0, "unchanged": 0}
+        keep_names = {SEARCH_MANIFEST_FILENAME}
+        for name, shard in files.items():
+            keep_names.add(name)
+            stats["written" if write_compact_json(os.path.join(search_dir, name), shard) else "unchanged"] += 1
+
+        manifest = {
+            "format": SEARCH_FORMAT_NAME,
+            "version": SEARCH_FORMAT_VERSION,
+            "items": self.item_count,
+            "tokens": len(self.postings),
+            "shard_codepoint_bits": SHARD_CODEPOINT_BITS,
+            "max_shard_bytes": SEARCH_SHARD_MAX_BYTES,
+            "shards": dict(sorted(ranges.items())),
+        }
+        write_compact_json(os.path.join(search_dir, SEARCH_MANIFEST_FILENAME), manifest)
+        stats["removed"] = remove_stale_files(search_dir, keep_names)
+        return stats
@@ -0,0 +1,161 @@
+import os
+import zlib
+import heapq
+import random
+from media_publish import write_compact_json, remove_stale_files
+
+# --- 配置信息 ---
+# 相似作品列表的输出子目录名与格式标识，与 js/data.js 中的 SIMILAR_DIR 对应
+SIMILAR_DIRNAME = "similar"
+SIMILAR_MANIFEST_FILENAME = "manifest.json"
+SIMILAR_FORMAT_NAME = "mediahub-similar"
+SIMILAR_FORMAT_VERSION = 1
+# MinHash 签名长度，分为 LSH_BANDS 段，每段 LSH_BAND_ROWS 个值完全相同的两个项目成为候选。
+# 32 段 x 2 行时，Jaccard 相似度 0.3 的两个项目成为候选的概率约 95%，0.1 时约 27%
+MINHASH_PERMUTATIONS = 64
+LSH_BAND_ROWS = 2
+LSH_BANDS = MINHASH_PERMUTATIONS // LSH_BAND_ROWS
+# 哈希函数 (a * x + b) mod p 的参数由固定种子生成，每次运行结果相同
+MINHASH_SEED = 20240101
+MERSENNE_PRIME = (1 << 31) - 1
+# 成员超过该数量的桶只说明项目共有某个常见特征（例如同一类型），不产生候选，避免候选对数随项目数平方增长
+MAX_BUCKET_SIZE = 100
+# 只取排名靠前的演员：长长的演员表会稀释主要演员的相似度
+MAX_ACTORS = 10
+# 特征少于该数量的项目不参与计算（只有一个类型的项目和任何同类型项目都"相似"）
+MIN_FEATURES = 2
+# 每个项目保留的相似作品数和最低 Jaccard 相似度
+SIMILAR_COUNT = 12
+MIN_SIMILARITY = 0.1
+# 每个分片文件包含的连续项目 ID 数量，前端打开详情页时只加载一个分片
+SIMILAR_SHARD_SIZE = 500
+
+def item_features(fields, meta):
+    """
+    项目用于计算相似度的特征集合：演员（前 MAX_ACTORS 位）、导演、类型和制片厂，各加前缀区分。
+    演员、类型和制片厂取自 meta（见 build_item_meta），导演取自 NFO 字段。
+    """
+    features = set()
+    if not fields or "error" in fields:
+        return frozenset(features)
+    features.update(f"a:{name}" for name in meta.get("actors", [])[:MAX_ACTORS])
+    features.update(f"d:{name}" for name in fields.get("director", ()))
+    features.update(f"g:{name}" for name in meta.get("genre", ()))
+    features.update(f"s:{name}" for name in meta.get("studio", ()))
+    return frozenset(features)
+
+def jaccard(a, b):
+    # 并集大小由交集推算，不需要构造并集
+    common = len(a & b)
+    return common / (len(a) + len(b) - common)
+
+def _offer(heap, entry):
+    """把 (相似度, -相似项目 ID) 加入项目的最小堆，堆中最多 SIMILAR_COUNT 项，相同的项不重复加入。"""
+    if len(heap) < SIMILAR_COUNT:
+        if entry not in heap:
+            heapq.heappush(heap, entry)
+    elif entry > heap[0] and entry not in heap:
+        heapq.heapreplace(heap, entry)
+
+class SimilarIndexBuilder:
+    """
+    逐个加入媒体项目，用 MinHash 签名和 LSH 分段找出每个项目最相似的作品（按特征集合的 Jaccard 相似度）。
+    只比较至少有一段签名相同的候选对，计算量与项目数近似成线性关系，不需要两两比较。
+
+    每个特征的哈希值向量只计算一次并缓存，项目签名为其特征向量逐位取最小值（内置 min 逐列计算），
+    不依赖 NumPy 也足够快。
+    """
+
+    def __init__(self):
+        rng = random.Random(MINHASH_SEED)
+        self.hash_params = [(rng.randrange(1, MERSENNE_PRIME), rng.randrange(MERSENNE_PRIME))
+                            for _ in range(MINHASH_PERMUTATIONS)]
+        self.feature_vectors = {}   # {特征: 各哈希函数下的值}
+        self.features = {}          # {项目 ID: 特征集合}
+        self.signatures = {}        # {项目 ID: MinHash 签名}
+        self.item_count = 0
+
+    def _feature_vector(self, feature):
+        vector = self.feature_vectors.get(feature)
+        if vector is None:
+            x = zlib.crc32(feature.encode('utf-8')) % MERSENNE_PRIME
+            vector = [(a * x + b) % MERSENNE_PRIME for a, b in self.hash_params]
+            self.feature_vectors[feature] = vector
+        return vector
+
+    def add_item(self, item_id, item_path, fields, meta, pinyin):
+        """加入一个媒体项目，特征见 item_features（不使用拼音检索键）。特征少于 MIN_FEATURES 的项目只计入项目总数。"""
+        self.item_count += 1
+        features = item_features(fields, meta)
+        if len(features) < MIN_FEATURES:
+            return
+        self.features[item_id] = features
+        self.signatures[item_id] = tuple(map(min, zip(*(self._feature_vector(f) for f in features))))
+
+    def _score_bucket(self, members, heaps):
+        """同一个桶中的项目两两精确打分，不低于 MIN_SIMILARITY 的加入双方的最小堆（见 _offer）。"""
+        features = self.features
+        for i, item_id in enumerate(members):
+            item_features = features[item_id]
+            for other_id in members[i + 1:]:
+                score = jaccard(item_features, features[other_id])
+                if score >= MIN_SIMILARITY:
+                    _offer(heaps[item_id], (score, -other_id))
+                    _offer(heaps[other_id], (score, -item_id))
+
+    def neighbours(self):
+        """
+        计算每个项目的相似作品：逐段分桶，桶中的项目对随即按 Jaccard 相似度精确打分，
+        每个项目用最小堆保留不低于 MIN_SIMILARITY 的前 SIMILAR_COUNT 个。
+        不保存候选集合，除当前一段的桶以外，内存只与 项目数 x SIMILAR_COUNT 成正比。
+
+        多段签名相同的项目对会被重复打分，结果不受影响：已在堆中的不再加入；
+        未进入堆或被挤出的，堆的门槛只升不降，再次打分同样进不了堆。
+
+        Returns:
+            dict: {项目 ID: [相似项目 ID，按相似度从高到低]}，没有相似作品的项目不包含在内。
+        """
+        heaps = {item_id: [] for item_id in self.signatures}
+        for band in range(LSH_BANDS):
+            start = band * LSH_BAND_ROWS
+            buckets = {}
+            for item_id, signature in self.signatures.items():
+                buckets.setdefault(signature[start:start + LSH_BAND_ROWS], []).append(item_id)
+            for members in buckets.values():
+                if 1 < len(members) <= MAX_BUCKET_SIZE:
+                    self._score_bucket(members, heaps)
+        return {item_id: [-negative_id for _, negative_id in sorted(heaps[item_id], reverse=True)]
+                for item_id in sorted(heaps) if heaps[item_id]}
+
+    def write(self, similar_dir):
+        """
+        写出分片文件（{ID // SIMILAR_SHARD_SIZE}.json，内容为 {项目 ID: 相似项目 ID 列表}）和清单文件。
+        内容未变化的文件不重写，已不存在的分片被删除。
+
+        Returns:
+            dict: 统计 {"items", "with_similar", "shards", "written", "unchanged", "removed"}。
+        """
+        shards = {}
+        neighbours = self.neighbours()
+        for item_id in sorted(neighbours):
+            shards.setdefault(item_id // SIMILAR_SHARD_SIZE, {})[str(item_id)] = neighbours[item_id]
+
+        stats = {"items": len(self.signatures), "with_similar": len(neighbours), "shards": len(shards),
+                 "written": 0, "unchanged": 0}
+        keep_names = {SIMILAR_MANIFEST_FILENAME}
+        for shard_id, shard in shards.items():
+            name = f"{shard_id}.json"
+            keep_names.add(name)
+            stats["written" if write_compact_json(os.path.join(similar_dir, name), shard) else "unchanged"] += 1
+
+        manifest = {
+            "format": SIMILAR_FORMAT_NAME,
+            "version": SIMILAR_FORMAT_VERSION,
+            "items": self.item_count,
+            "with_similar": len(neighbours),
+            "shard_size": SIMILAR_SHARD_SIZE,
+            "shards": sorted(shards),
+        }
+        write_compact_json(os.path.join(similar_dir, SIMILAR_MANIFEST_FILENAME), manifest)
+        stats["removed"] = remove_stale_files(similar_dir, keep_names)
+        return stats